@@ -4,22 +4,189 @@ from dash import dcc, html, Input, Output, State, callback_context
 import dash_bootstrap_components as dbc
 import plotly.graph_objs as go
 import datetime
+import json
+import os
 import pandas as pd
 import logging
 
 from data_fetcher import DataFetcher
-from strategies import WickFillStrategy  # Currently available strategy.
+from data_store import CandleStore
 from backtester import backtest_strategy
-from plot_utils import create_candlestick_figure, add_trade_markers
-from strategy_settings import STRATEGY_SETTINGS
+from dataset_cache import DatasetCache, dataset_key
+from job_queue import DONE, FAILED, FINISHED_STATES, PENDING, JobQueue, report_progress
+from result_cache import BacktestResultCache, backtest_key
+from equity import compute_equity_curve, time_based_metrics
+from plot_utils import create_candlestick_figure, add_trade_markers, update_visible_range
+from profiling import profiler, stage, timed
+from resampler import Resampler
+from strategy_registry import registry
 from layout import create_layout
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize the data fetcher.
-data_fetcher_instance = DataFetcher()
+# Data fetcher backed by the local candle store, created on first use (its
+# exchange client is itself only built when data must be downloaded).
+data_fetcher_instance = None
+
+
+def get_data_fetcher() -> DataFetcher:
+    global data_fetcher_instance
+    if data_fetcher_instance is None:
+        data_fetcher_instance = DataFetcher(store=CandleStore(os.getenv("CANDLE_STORE_DIR", "data/candles")))
+    return data_fetcher_instance
+
+# Higher timeframes are resampled locally from stored base candles, so only
+# BASE_TIMEFRAME bars are ever downloaded; set BASE_TIMEFRAME="" to fetch
+# every timeframe from the exchange instead.
+BASE_TIMEFRAME = os.getenv("BASE_TIMEFRAME", "1m")
+resampler_instance = None
+
+
+def get_resampler() -> Resampler:
+    global resampler_instance
+    if resampler_instance is None:
+        resampler_instance = Resampler(get_data_fetcher().store, base_timeframe=BASE_TIMEFRAME)
+    return resampler_instance
+
+# Backtest results are memoized per (dataset, strategy, params); set
+# BACKTEST_CACHE_DIR to keep them on disk across restarts.
+result_cache = BacktestResultCache(disk_dir=os.getenv("BACKTEST_CACHE_DIR"))
+
+# Loaded frames stay on the server; the browser-side store only holds their key.
+dataset_cache = DatasetCache()
+
+
+@timed('load_dataset')
+def load_dataset(key: dict, sync: bool = True) -> pd.DataFrame:
+    """
+    Load the OHLCV frame identified by a dataset key via the candle store,
+    syncing missing bars from the exchange first unless sync is False.
+    """
+    try:
+        if BASE_TIMEFRAME and key['timeframe'] != BASE_TIMEFRAME:
+            if sync:
+                get_data_fetcher().sync(key['symbol'], BASE_TIMEFRAME, since=key['since'], until=key['until'])
+            return get_resampler().read(key['symbol'], key['timeframe'], key['since'], key['until'])
+        return get_data_fetcher().load_range(
+            symbol=key['symbol'],
+            timeframe=key['timeframe'],
+            since=key['since'],
+            until=key['until'],
+            sync=sync
+        )
+    except Exception as e:
+        logger.error("Error fetching historical data: %s", e)
+        return pd.DataFrame()
+
+
+def read_stored_dataset(key: dict) -> pd.DataFrame:
+    """
+    Dataset from the candle store as the server has already synced it; job
+    workers use this so only the server talks to the exchange.
+    """
+    return load_dataset(key, sync=False)
+
+# "Run Strategy" backtests run on a pool of long-lived worker processes so
+# they never block a Dash worker; JOB_WORKERS sets the pool size (all cores
+# by default). Each worker imports this module once and keeps its own
+# dataset cache and resampler across jobs.
+job_queue_instance = None
+
+
+def get_job_queue() -> JobQueue:
+    global job_queue_instance
+    if job_queue_instance is None:
+        job_queue_instance = JobQueue(max_finished=32)
+    return job_queue_instance
+
+
+BACKTEST_SETTINGS = dict(initial_capital=10000.0, fee_rate=0.001, slippage_rate=0.001)
+
+
+def run_dashboard_backtest(key: dict, strategy_name: str, settings: dict,
+                           profile_mode: tuple = (False, False)) -> dict:
+    """
+    Job body of "Run Strategy" (runs in a job worker): read the dataset the
+    server has synced (never the exchange), run the backtest unless a cached
+    result exists, and compute bar metrics.
+
+    profile_mode is the dashboard profiler's (enabled, cprofile); the stage
+    timings recorded here are returned for the dashboard to merge.
+    """
+    profiler.reset()
+    if profile_mode[0]:
+        profiler.enable(cprofile=profile_mode[1])
+    report_progress(0.05, "Loading data")
+    df = dataset_cache.get_or_load(key, read_stored_dataset)
+    if df.empty:
+        raise ValueError("No data available for the selected range.")
+    strategy_class = registry.get(strategy_name)
+    cache_key = backtest_key(strategy_class, df, settings, **BACKTEST_SETTINGS)
+    result = result_cache.get(cache_key)
+    if result is None:
+        report_progress(0.3, "Running strategy")
+        result = backtest_strategy(strategy_class, df, settings, **BACKTEST_SETTINGS)
+    performance, trade_df = result
+    report_progress(0.9, "Computing metrics")
+    with stage('equity_metrics') as span:
+        bar_metrics = time_based_metrics(compute_equity_curve(trade_df, df), key.get('timeframe'))
+        span['rows'] = len(df)
+    return {'cache_key': cache_key, 'performance': performance, 'trades': trade_df, 'bar_metrics': bar_metrics,
+            'profile': profiler.report() if profiler.enabled else None}
+
+
+def performance_table(performance: dict, bar_metrics: dict):
+    # Build a dark-themed table for performance metrics, narrower and aligned left/up.
+    return dbc.Table(
+        [
+            html.Tbody([
+                html.Tr([html.Td("Total Trades"), html.Td(performance.get('total_trades', 0))]),
+                html.Tr([html.Td("Win Rate"), html.Td(f"{performance.get('win_rate', 0):.2%}")]),
+                html.Tr([html.Td("Total Net Profit"), html.Td(f"{performance.get('total_net_profit', 0):.2f}")]),
+                html.Tr([html.Td("Max Drawdown"), html.Td(f"{performance.get('max_drawdown', 0):.2%}")]),
+                html.Tr([html.Td("Sharpe Ratio"), html.Td(f"{performance.get('sharpe_ratio', 0):.2f}")]),
+                html.Tr([html.Td("Sharpe (annualized)"), html.Td(f"{bar_metrics.get('sharpe_ratio_annualized', 0):.2f}")]),
+                html.Tr([html.Td("Sortino Ratio"), html.Td(f"{bar_metrics.get('sortino_ratio', 0):.2f}")]),
+                html.Tr([html.Td("Calmar Ratio"), html.Td(f"{bar_metrics.get('calmar_ratio', 0):.2f}")]),
+                html.Tr([html.Td("Time Under Water"), html.Td(f"{bar_metrics.get('time_under_water', 0):.2%}")]),
+                html.Tr([html.Td("Exposure"), html.Td(f"{bar_metrics.get('exposure', 0):.2%}")]),
+                html.Tr([html.Td("Final Capital"), html.Td(f"{performance.get('final_capital', 0):.2f}")])
+            ])
+        ],
+        bordered=True,
+        dark=True,
+        hover=True,
+        responsive=True,
+        striped=True,
+        style={"marginTop": "5px", "marginLeft": "20px", "maxWidth": "600px"}
+    )
+
+
+def render_backtest(current_fig, df: pd.DataFrame, performance: dict, trade_df: pd.DataFrame, bar_metrics: dict):
+    """
+    Chart with trade markers and the metrics table for a finished backtest.
+    """
+    updated_fig = add_trade_markers(go.Figure(current_fig), trade_df, df)
+    updated_fig.update_layout(
+        paper_bgcolor="#2c2f33",
+        plot_bgcolor="#2c2f33",
+        font=dict(color="white")
+    )
+    return updated_fig, performance_table(performance, bar_metrics)
+
+
+def job_status_text(job: dict) -> str:
+    if job['status'] == FAILED:
+        # The last traceback line names the exception.
+        lines = (job['error'] or "").strip().splitlines()
+        return f"Backtest failed: {lines[-1] if lines else 'unknown error'}"
+    if job['status'] in FINISHED_STATES:
+        return f"Backtest {job['status']}."
+    if job['status'] == PENDING:
+        return "Backtest queued..."
+    return f"Backtest running: {job['message'] or 'starting'} ({job['progress']:.0%})"
 
 # Use the DARKLY theme for a modern dark look.
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.DARKLY])
@@ -28,72 +195,110 @@ app.layout = create_layout()
 
 # Combined callback:
 # - When any common parameter changes (or on initial load), load/update the chart.
-# - When "Run Strategy" is clicked, overlay strategy results.
+# - When "Run Strategy" is clicked, submit the backtest as a job (or show a
+#   cached result); job polling overlays the results once the job is done.
+# - When the chart is zoomed or panned, re-aggregate candles for the visible range.
 @app.callback(
     [Output("candlestick-chart", "figure"),
      Output("historical-data-store", "data"),
-     Output("performance-metrics", "children")],
+     Output("performance-metrics", "children"),
+     Output("job-store", "data"),
+     Output("job-poll", "disabled"),
+     Output("job-status", "children")],
     [Input("symbol-dropdown", "value"),
      Input("start-date-picker", "date"),
      Input("end-date-picker", "date"),
      Input("timeframe-dropdown", "value"),
      Input("strategy-dropdown", "value"),
-     Input("run-strategy-button", "n_clicks")],
+     Input("run-strategy-button", "n_clicks"),
+     Input("candlestick-chart", "relayoutData"),
+     Input("job-poll", "n_intervals"),
+     Input("cancel-job-button", "n_clicks")],
     [State("historical-data-store", "data"),
-     State("candlestick-chart", "figure")]
+     State("candlestick-chart", "figure"),
+     State("job-store", "data")]
 )
-def update_dashboard(symbol, start_date, end_date, timeframe, strategy_name, run_clicks, stored_data, current_fig):
+@timed('update_dashboard', rows=None)
+def update_dashboard(symbol, start_date, end_date, timeframe, strategy_name, run_clicks, relayout_data,
+                     poll_intervals, cancel_clicks, stored_data, current_fig, job_data):
+    outputs = update_chart(symbol, start_date, end_date, timeframe, strategy_name, relayout_data, stored_data,
+                           current_fig, job_data)
+    # Branches returning only the chart outputs leave the job outputs unchanged.
+    return outputs if len(outputs) == 6 else (*outputs, dash.no_update, dash.no_update, dash.no_update)
+
+
+def update_chart(symbol, start_date, end_date, timeframe, strategy_name, relayout_data, stored_data, current_fig,
+                 job_data):
     ctx = callback_context
     trigger_id = ctx.triggered[0]['prop_id'].split('.')[0] if ctx.triggered else None
     logger.info("Triggered by: %s", trigger_id)
 
+    # Zoom/pan: redraw the candles at the level of detail for the new x-range.
+    if trigger_id == "candlestick-chart":
+        if stored_data is None or not relayout_data or not any(k.startswith('xaxis') for k in relayout_data):
+            return dash.no_update, dash.no_update, dash.no_update
+        df = dataset_cache.get_or_load(stored_data, load_dataset)
+        if df.empty:
+            return dash.no_update, dash.no_update, dash.no_update
+        return update_visible_range(current_fig, df, relayout_data), stored_data, dash.no_update
+
+    # Job polling: render the results once the submitted backtest has finished.
+    if trigger_id == "job-poll":
+        if not job_data:
+            return dash.no_update, dash.no_update, dash.no_update, None, True, ""
+        job = get_job_queue().status(job_data['job_id'])
+        if job is None:
+            return dash.no_update, dash.no_update, dash.no_update, None, True, "Backtest result expired."
+        if job['status'] not in FINISHED_STATES:
+            return dash.no_update, dash.no_update, dash.no_update, job_data, False, job_status_text(job)
+        if job['status'] != DONE:
+            return dash.no_update, dash.no_update, dash.no_update, None, True, job_status_text(job)
+        result = get_job_queue().result(job_data['job_id'])
+        # Stages that ran in the worker show up in the profiling panel; pop so a
+        # job shared by several clients is merged once.
+        worker_profile = result.pop('profile', None)
+        if worker_profile:
+            profiler.merge(worker_profile)
+        result_cache.put(result['cache_key'], (result['performance'], result['trades']))
+        if job_data['dataset'] != stored_data:
+            # The chart moved on to another dataset while the job ran.
+            return dash.no_update, dash.no_update, dash.no_update, None, True, "Backtest finished for another dataset."
+        df = dataset_cache.get_or_load(stored_data, load_dataset)
+        fig, table = render_backtest(current_fig, df, result['performance'], result['trades'], result['bar_metrics'])
+        return fig, stored_data, table, None, True, ""
+
+    if trigger_id == "cancel-job-button":
+        if job_data:
+            get_job_queue().cancel(job_data['job_id'])
+        return dash.no_update, dash.no_update, dash.no_update, None, True, "Backtest cancelled." if job_data else ""
+
     # If the "Run Strategy" button was clicked:
     if trigger_id == "run-strategy-button":
         if stored_data is None:
             return current_fig, None, "Please wait for the chart to load."
-        df = pd.read_json(stored_data, orient='split')
-        settings = STRATEGY_SETTINGS.get(strategy_name, {})
-        strategy_class = None
-        if strategy_name == "WickFillStrategy":
-            strategy_class = WickFillStrategy
+        strategy_class = registry.get(strategy_name)
         if strategy_class is None:
             return current_fig, stored_data, "Selected strategy not implemented."
-        performance, trade_df = backtest_strategy(
-            strategy_class, df, settings,
-            initial_capital=10000.0,
-            fee_rate=0.001,
-            slippage_rate=0.001
-        )
-        updated_fig = add_trade_markers(
-            go.Figure(current_fig),
-            trade_df.to_dict('records') if not trade_df.empty else [],
-            df
-        )
-        updated_fig.update_layout(
-            paper_bgcolor="#2c2f33",
-            plot_bgcolor="#2c2f33",
-            font=dict(color="white")
-        )
-        # Build a dark-themed table for performance metrics, narrower and aligned left/up.
-        perf_table = dbc.Table(
-            [
-                html.Tbody([
-                    html.Tr([html.Td("Total Trades"), html.Td(performance.get('total_trades', 0))]),
-                    html.Tr([html.Td("Win Rate"), html.Td(f"{performance.get('win_rate', 0):.2%}")]),
-                    html.Tr([html.Td("Total Net Profit"), html.Td(f"{performance.get('total_net_profit', 0):.2f}")]),
-                    html.Tr([html.Td("Max Drawdown"), html.Td(f"{performance.get('max_drawdown', 0):.2%}")]),
-                    html.Tr([html.Td("Sharpe Ratio"), html.Td(f"{performance.get('sharpe_ratio', 0):.2f}")]),
-                    html.Tr([html.Td("Final Capital"), html.Td(f"{performance.get('final_capital', 0):.2f}")])
-                ])
-            ],
-            bordered=True,
-            dark=True,
-            hover=True,
-            responsive=True,
-            striped=True,
-            style={"marginTop": "5px", "marginLeft": "20px", "maxWidth": "600px"}
-        )
-        return updated_fig, stored_data, perf_table
+        settings = registry.default_settings(strategy_name)
+        # A result already computed for this dataset is shown without a job.
+        df = dataset_cache.get(stored_data)
+        cached = None
+        if df is not None and not df.empty:
+            cached = result_cache.get(backtest_key(strategy_class, df, settings, **BACKTEST_SETTINGS))
+        if cached is not None:
+            performance, trade_df = cached
+            with stage('equity_metrics') as span:
+                bar_metrics = time_based_metrics(compute_equity_curve(trade_df, df), stored_data.get('timeframe'))
+                span['rows'] = len(df)
+            fig, table = render_backtest(current_fig, df, performance, trade_df, bar_metrics)
+            return fig, stored_data, table, None, True, ""
+        # Identical requests (same dataset, strategy and settings) share one job.
+        job_key = (json.dumps(stored_data, sort_keys=True), strategy_name,
+                   json.dumps(settings, sort_keys=True, default=str))
+        job_id = get_job_queue().submit(run_dashboard_backtest, stored_data, strategy_name, settings,
+                                        (profiler.enabled, profiler.cprofile), key=job_key)
+        return (dash.no_update, dash.no_update, dash.no_update, {'job_id': job_id, 'dataset': stored_data}, False,
+                job_status_text(get_job_queue().status(job_id)))
 
     # Otherwise (on initial load or parameter change), load/update the chart.
     try:
@@ -104,25 +309,15 @@ def update_dashboard(symbol, start_date, end_date, timeframe, strategy_name, run
         start_ms = None
     try:
         end_dt = datetime.datetime.fromisoformat(end_date)
+        end_ms = int(end_dt.timestamp() * 1000)
     except Exception as e:
         logger.error("Error parsing end_date: %s", e)
         end_dt = None
+        end_ms = None
 
-    try:
-        df = data_fetcher_instance.fetch_historical_data(
-            symbol=symbol,
-            timeframe=timeframe,
-            since=start_ms,
-            limit=1000,
-            use_cache=False
-        )
-    except Exception as e:
-        logger.error("Error fetching historical data: %s", e)
-        df = pd.DataFrame()
-
-    logger.info("Fetched %d rows of data for %s", len(df), symbol)
-    if end_dt is not None and not df.empty:
-        df = df[(df.index >= start_dt) & (df.index <= end_dt)]
+    key = dataset_key(symbol, timeframe, start_ms, end_ms)
+    df = dataset_cache.get_or_load(key, load_dataset)
+    logger.info("Loaded %d rows of data for %s", len(df), symbol)
     if df.empty:
         fig = go.Figure()
         fig.update_layout(
@@ -138,8 +333,33 @@ def update_dashboard(symbol, start_date, end_date, timeframe, strategy_name, run
         plot_bgcolor="#2c2f33",
         font=dict(color="white")
     )
-    json_data = df.to_json(date_format='iso', orient='split')
-    return fig, json_data, ""
+    return fig, key, ""
+
+# Stage timings from the profiling layer (BACKTEST_PROFILE=1, or =cprofile for call profiles),
+# refreshed whenever the chart or metrics change.
+@app.callback(
+    Output("profiling-report", "children"),
+    [Input("candlestick-chart", "figure"),
+     Input("performance-metrics", "children")]
+)
+def update_profiling_report(_figure, _metrics):
+    if not profiler.enabled:
+        return ""
+    report = profiler.report()
+    rows = [html.Tr([html.Td(s['stage']), html.Td(s['calls']), html.Td(f"{s['last_s'] * 1000:.1f}"),
+                     html.Td(f"{s['mean_s'] * 1000:.1f}"), html.Td(f"{s['total_s']:.2f}"), html.Td(s['rows'])])
+            for s in report['stages']]
+    header = html.Thead(html.Tr([html.Th(label) for label in
+                                 ("Stage", "Calls", "Last (ms)", "Mean (ms)", "Total (s)", "Rows")]))
+    children = [
+        html.H6("Profiling", style={"color": "#aaa"}),
+        dbc.Table([header, html.Tbody(rows)], bordered=True, dark=True, hover=True, responsive=True,
+                  striped=True, size="sm", style={"maxWidth": "800px"}),
+    ]
+    children += [html.Details([html.Summary(f"cProfile: {name}"),
+                               html.Pre(text, style={"color": "white", "fontSize": "0.75rem"})])
+                 for name, text in report['profiles'].items()]
+    return children
 
 if __name__ == '__main__':
     app.run_server(debug=True)
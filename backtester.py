@@ -4,8 +4,83 @@ import numpy as np
 import logging
 from typing import Tuple, Dict, Any
 
+from profiling import timed
+from trade_log import SIDE_LONG, TradeLog
+
 logger = logging.getLogger(__name__)
 
+def compute_accounting(sides: np.ndarray, entry_price: np.ndarray, exit_price: np.ndarray,
+                       initial_capital: float = 10000.0, fee_rate: float = 0.001,
+                       slippage_rate: float = 0.001) -> Dict[str, np.ndarray]:
+    """
+    Apply slippage and fees to a batch of trades given as arrays.
+
+    sides holds 1 for longs and -1 for shorts. Returns per-trade arrays
+    (effective prices, profit, fee, net profit, return and running capital).
+    """
+    sides = np.asarray(sides)
+    entry_price = np.asarray(entry_price, dtype=np.float64)
+    exit_price = np.asarray(exit_price, dtype=np.float64)
+    is_long = sides == SIDE_LONG
+
+    effective_entry = np.where(is_long, entry_price * (1 + slippage_rate), entry_price * (1 - slippage_rate))
+    effective_exit = np.where(is_long, exit_price * (1 - slippage_rate), exit_price * (1 + slippage_rate))
+    profit = np.where(is_long, effective_exit - effective_entry, effective_entry - effective_exit)
+    fee = fee_rate * (effective_entry + effective_exit)
+    net_profit = profit - fee
+    return_pct = net_profit / effective_entry
+    # cumsum adds sequentially, so capital matches trade-by-trade compounding exactly.
+    capital = np.cumsum(np.concatenate([[initial_capital], net_profit]))[1:]
+    return {
+        'effective_entry': effective_entry,
+        'effective_exit': effective_exit,
+        'profit': profit,
+        'fee': fee,
+        'net_profit': net_profit,
+        'return_pct': return_pct,
+        'capital': capital,
+    }
+
+
+def compute_metrics(net_profit: np.ndarray, return_pct: np.ndarray, capital: np.ndarray,
+                    initial_capital: float = 10000.0) -> Dict[str, Any]:
+    """
+    Summary metrics (win rate, drawdown, Sharpe, ...) from accounting arrays.
+    """
+    total_trades = len(net_profit)
+    if total_trades == 0:
+        return {}
+    equity = np.concatenate([[initial_capital], capital])
+    running_max = np.maximum.accumulate(equity)
+    max_drawdown = ((equity - running_max) / running_max).min()
+
+    # Same formulas as pandas' Series.mean()/std() so results are unchanged.
+    mean_return = return_pct.sum() / total_trades
+    std_return = np.sqrt(((mean_return - return_pct) ** 2).sum() / (total_trades - 1)) if total_trades > 1 else np.nan
+    sharpe_ratio = mean_return / std_return * np.sqrt(total_trades) if std_return > 0 else 0
+
+    final_capital = capital[-1]
+    return {
+        'total_trades': total_trades,
+        'win_rate': int((net_profit > 0).sum()) / total_trades,
+        'total_net_profit': final_capital - initial_capital,
+        'max_drawdown': max_drawdown,
+        'sharpe_ratio': sharpe_ratio,
+        'final_capital': final_capital,
+    }
+
+
+def compute_performance(sides: np.ndarray, entry_price: np.ndarray, exit_price: np.ndarray,
+                        initial_capital: float = 10000.0, fee_rate: float = 0.001,
+                        slippage_rate: float = 0.001) -> Dict[str, Any]:
+    """
+    Metrics only, straight from trade arrays; used where no trade table is needed (e.g. sweeps).
+    """
+    accounts = compute_accounting(sides, entry_price, exit_price, initial_capital, fee_rate, slippage_rate)
+    return compute_metrics(accounts['net_profit'], accounts['return_pct'], accounts['capital'], initial_capital)
+
+
+@timed('run_backtest')
 def run_backtest(strategy_instance, initial_capital: float = 10000.0,
                  fee_rate: float = 0.001, slippage_rate: float = 0.001) -> Tuple[Dict[str, Any], pd.DataFrame]:
     """
@@ -17,72 +92,23 @@ def run_backtest(strategy_instance, initial_capital: float = 10000.0,
         logger.warning("No trades executed by the strategy.")
         return {}, pd.DataFrame()
 
-    results = []
-    capital = initial_capital
-    cumulative_profit = [capital]
-
-    for trade in trades:
-        trade_type = trade.get('trade_type')
-        entry_price = trade.get('entry_price')
-        exit_price = trade.get('exit_price')
-
-        if trade_type == 'long':
-            effective_entry = entry_price * (1 + slippage_rate)
-            effective_exit = exit_price * (1 - slippage_rate)
-            profit = effective_exit - effective_entry
-        elif trade_type == 'short':
-            effective_entry = entry_price * (1 - slippage_rate)
-            effective_exit = exit_price * (1 + slippage_rate)
-            profit = effective_entry - effective_exit
-        else:
-            continue
-
-        fee = fee_rate * (effective_entry + effective_exit)
-        net_profit = profit - fee
-        ret_pct = net_profit / effective_entry
-
-        capital += net_profit
-        cumulative_profit.append(capital)
-
-        results.append({
-            'trade_type': trade_type,
-            'entry_time': trade.get('entry_time'),
-            'exit_time': trade.get('exit_time'),
-            'entry_price': entry_price,
-            'exit_price': exit_price,
-            'effective_entry': effective_entry,
-            'effective_exit': effective_exit,
-            'profit': profit,
-            'fee': fee,
-            'net_profit': net_profit,
-            'return_pct': ret_pct,
-            'capital': capital,
-            'stop_loss': trade.get('stop_loss'),
-            'take_profit': trade.get('take_profit'),
-        })
-
-    results_df = pd.DataFrame(results)
-    total_trades = len(results_df)
-    wins = results_df[results_df['net_profit'] > 0].shape[0]
-    win_rate = wins / total_trades if total_trades > 0 else 0
-    total_net_profit = capital - initial_capital
-
-    cumulative_profit_series = pd.Series(cumulative_profit)
-    running_max = cumulative_profit_series.cummax()
-    drawdown = (cumulative_profit_series - running_max) / running_max
-    max_drawdown = drawdown.min()
-
-    returns = results_df['return_pct']
-    sharpe_ratio = returns.mean() / returns.std() * np.sqrt(len(returns)) if returns.std() > 0 else 0
-
-    performance = {
-        'total_trades': total_trades,
-        'win_rate': win_rate,
-        'total_net_profit': total_net_profit,
-        'max_drawdown': max_drawdown,
-        'sharpe_ratio': sharpe_ratio,
-        'final_capital': capital,
-    }
+    log = TradeLog.from_records(trades)
+    if not log:
+        return {}, pd.DataFrame()
+
+    accounts = compute_accounting(log.side, log.entry_price, log.exit_price, initial_capital, fee_rate, slippage_rate)
+    results_df = pd.DataFrame({
+        'trade_type': np.where(log.side == SIDE_LONG, 'long', 'short').astype(object),
+        'entry_time': log.entry_time.view(log.time_dtype),
+        'exit_time': log.exit_time.view(log.time_dtype),
+        'entry_price': log.entry_price,
+        'exit_price': log.exit_price,
+        **accounts,
+        'stop_loss': log.stop_loss,
+        'take_profit': log.take_profit,
+    })
+    performance = compute_metrics(accounts['net_profit'], accounts['return_pct'], accounts['capital'],
+                                  initial_capital)
 
     logger.info("Backtesting Performance: %s", performance)
     return performance, results_df
@@ -96,3 +122,20 @@ def backtest_strategy(strategy_class, data, strategy_params: dict, initial_capit
     strategy_instance.run()
     performance, trade_df = run_backtest(strategy_instance, initial_capital, fee_rate, slippage_rate)
     return performance, trade_df
+
+def evaluate_strategy(strategy_class, data, strategy_params: dict, initial_capital: float = 10000.0,
+                      fee_rate: float = 0.001, slippage_rate: float = 0.001) -> Dict[str, Any]:
+    """
+    Run a strategy and return only its performance metrics, skipping the trade table.
+    """
+    strategy_instance = strategy_class(data, **strategy_params)
+    strategy_instance.run()
+    log = TradeLog.from_records(strategy_instance.trades)
+    return compute_performance(log.side, log.entry_price, log.exit_price, initial_capital, fee_rate, slippage_rate)
+
+
+if __name__ == '__main__':
+    # python -m backtester run|sweep|fetch JOB_FILE: headless batch runs (see cli.py).
+    import sys
+    from cli import main
+    sys.exit(main())
@@ -0,0 +1,44 @@
+# benchmarks/conftest.py
+import os
+
+import pytest
+
+from benchmarks.harness import (DEFAULT_BASELINE_PATH, DEFAULT_HISTORY_PATH, append_history,
+                                compare_to_baseline, load_baseline, save_baseline)
+
+# Results collected by the bench_results fixture during the session.
+_RESULTS = []
+_REGRESSIONS = []
+
+
+@pytest.fixture
+def bench_results():
+    return _RESULTS
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not _RESULTS:
+        return
+    history_path = os.getenv('BENCH_HISTORY', DEFAULT_HISTORY_PATH)
+    baseline_path = os.getenv('BENCH_BASELINE', DEFAULT_BASELINE_PATH)
+    append_history(_RESULTS, history_path)
+    _REGRESSIONS.extend(compare_to_baseline(_RESULTS, load_baseline(baseline_path),
+                                            float(os.getenv('BENCH_TOLERANCE', '0.25'))))
+    if os.getenv('BENCH_SAVE_BASELINE') == '1':
+        save_baseline(_RESULTS, baseline_path)
+    if _REGRESSIONS and os.getenv('BENCH_STRICT') == '1':
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _RESULTS:
+        return
+    terminalreporter.section('benchmarks')
+    for record in _RESULTS:
+        trades = f"  {record['trades_per_sec']:>12,.0f} trades/s" if record.get('trades_per_sec') else ''
+        memory = f"  {record['peak_memory_mb']:8.1f} MB" if record.get('peak_memory_mb') is not None else ''
+        terminalreporter.write_line(
+            f"{record['stage']:<20} {record['dataset']:<12} {record['n_bars']:>9,} bars "
+            f"{record['seconds']:8.3f}s {record['bars_per_sec']:>14,.0f} bars/s{memory}{trades}")
+    for regression in _REGRESSIONS:
+        terminalreporter.write_line(f"REGRESSION {regression}", red=True)
@@ -0,0 +1,134 @@
+# benchmarks/harness.py
+import datetime
+import gc
+import json
+import logging
+import os
+import platform
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HISTORY_PATH = os.path.join(BENCH_DIR, 'results', 'history.jsonl')
+# The baseline is tracked in git so regression checks compare against a shared reference.
+DEFAULT_BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+
+
+def measure(fn: Callable[[], Any], repeat: int = 1, trace_memory: bool = True) -> Tuple[Any, float, Optional[int]]:
+    """
+    Run fn() `repeat` times and return (last result, best wall time in seconds,
+    peak traced memory in bytes). Memory is traced in a separate run so the
+    tracemalloc overhead does not distort the timings.
+    """
+    best = float('inf')
+    result = None
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    peak = None
+    if trace_memory:
+        result = None
+        gc.collect()
+        tracemalloc.start()
+        try:
+            result = fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, best, peak
+
+
+def bench_record(stage: str, dataset: str, n_bars: int, seconds: float, peak_bytes: Optional[int],
+                 n_trades: Optional[int] = None, **extra) -> Dict[str, Any]:
+    """
+    One result row: stage timing plus bars/sec and trades/sec throughput.
+    """
+    record = {
+        'stage': stage,
+        'dataset': dataset,
+        'n_bars': n_bars,
+        'seconds': seconds,
+        'bars_per_sec': n_bars / seconds if seconds > 0 else None,
+        'peak_memory_mb': peak_bytes / 2 ** 20 if peak_bytes is not None else None,
+    }
+    if n_trades is not None:
+        record['n_trades'] = n_trades
+        record['trades_per_sec'] = n_trades / seconds if seconds > 0 else None
+    record.update(extra)
+    return record
+
+
+def record_key(record: Dict[str, Any]) -> Tuple[str, str, int]:
+    return record['stage'], record['dataset'], record['n_bars']
+
+
+def run_metadata() -> Dict[str, Any]:
+    import numpy as np
+    import pandas as pd
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'node': platform.node(),
+    }
+
+
+def append_history(records: List[Dict[str, Any]], path: str = DEFAULT_HISTORY_PATH) -> None:
+    """
+    Append one JSON line per record, tagged with the run's metadata.
+    """
+    if not records:
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    meta = run_metadata()
+    with open(path, 'a') as f:
+        for record in records:
+            f.write(json.dumps({**meta, **record}) + '\n')
+
+
+def load_baseline(path: str = DEFAULT_BASELINE_PATH) -> Dict[Tuple[str, str, int], Dict[str, Any]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {record_key(record): record for record in json.load(f)['results']}
+
+
+def save_baseline(records: List[Dict[str, Any]], path: str = DEFAULT_BASELINE_PATH) -> None:
+    """
+    Merge records into the baseline file (newer results replace older ones).
+    """
+    merged = load_baseline(path)
+    merged.update({record_key(record): record for record in records})
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({**run_metadata(), 'results': list(merged.values())}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def compare_to_baseline(records: List[Dict[str, Any]], baseline: Dict[Tuple[str, str, int], Dict[str, Any]],
+                        tolerance: float = 0.25) -> List[str]:
+    """
+    Regressions against the baseline: stages whose wall time grew, or whose
+    peak memory grew, by more than `tolerance` (a fraction).
+    """
+    regressions = []
+    for record in records:
+        base = baseline.get(record_key(record))
+        if base is None:
+            continue
+        label = "%s/%s/%d" % record_key(record)
+        if base['seconds'] > 0 and record['seconds'] > base['seconds'] * (1 + tolerance):
+            regressions.append(f"{label}: {record['seconds']:.3f}s vs baseline {base['seconds']:.3f}s")
+        if base.get('peak_memory_mb') and record.get('peak_memory_mb') \
+                and record['peak_memory_mb'] > base['peak_memory_mb'] * (1 + tolerance):
+            regressions.append(f"{label}: {record['peak_memory_mb']:.1f}MB vs baseline "
+                               f"{base['peak_memory_mb']:.1f}MB peak memory")
+    return regressions
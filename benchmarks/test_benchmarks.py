@@ -0,0 +1,133 @@
+# benchmarks/test_benchmarks.py
+"""
+Stage benchmarks over deterministic synthetic data. They are not part of the
+default test run (pytest.ini's testpaths); run them explicitly:
+
+    python -m pytest benchmarks -q
+    BENCH_SIZES=10000,100000,1000000,5000000 python -m pytest benchmarks -q
+
+Environment variables:
+    BENCH_SIZES          comma-separated bar counts (default 10000)
+    BENCH_DATASETS       subset of random_walk,range_bound,trending (default all)
+    BENCH_REPEAT         timed runs per stage, best is kept (default 1)
+    BENCH_HISTORY        JSONL history file (default benchmarks/results/history.jsonl)
+    BENCH_BASELINE       baseline file (default benchmarks/baseline.json, tracked in git)
+    BENCH_SAVE_BASELINE  set to 1 to store this run as the baseline
+    BENCH_TOLERANCE      allowed slowdown / memory growth vs baseline (default 0.25)
+    BENCH_STRICT         set to 1 to fail the session on regressions
+"""
+import functools
+import os
+
+import numpy as np
+import pytest
+
+from backtester import run_backtest
+from benchmarks.harness import bench_record, measure
+from feature_cache import default_cache
+from strategies import WickFillStrategy
+from strategy_registry import registry
+from synthetic import GENERATORS, FakeAsyncExchange, FakeExchange
+
+SIZES = [int(size) for size in os.getenv('BENCH_SIZES', '10000').split(',') if size]
+DATASETS = [name for name in os.getenv('BENCH_DATASETS', ','.join(GENERATORS)).split(',') if name]
+REPEAT = int(os.getenv('BENCH_REPEAT', '1'))
+SETTINGS = registry.default_settings('WickFillStrategy')
+
+CASES = [pytest.param(name, size, id=f"{name}-{size}") for name in DATASETS for size in SIZES]
+
+
+@functools.lru_cache(maxsize=1)
+def dataset(name: str, n_bars: int):
+    return GENERATORS[name](n_bars, seed=42)
+
+
+@functools.lru_cache(maxsize=1)
+def strategy(name: str, n_bars: int) -> WickFillStrategy:
+    instance = WickFillStrategy(dataset(name, n_bars), **SETTINGS)
+    instance.run()
+    return instance
+
+
+def run_strategy(data):
+    # Cold run: features are recomputed rather than served from the cache.
+    default_cache.clear()
+    instance = WickFillStrategy(data, **SETTINGS)
+    instance.run()
+    return instance.trades
+
+
+@pytest.mark.parametrize('name, n_bars', CASES)
+def test_strategy_run(name, n_bars, bench_results):
+    data = dataset(name, n_bars)
+    trades, seconds, peak = measure(lambda: run_strategy(data), REPEAT)
+    assert len(trades) == len(strategy(name, n_bars).trades)
+    bench_results.append(bench_record('strategy_run', name, n_bars, seconds, peak, len(trades)))
+
+
+@pytest.mark.parametrize('name, n_bars', CASES)
+def test_run_backtest(name, n_bars, bench_results):
+    instance = strategy(name, n_bars)
+    (performance, trade_df), seconds, peak = measure(lambda: run_backtest(instance), REPEAT)
+    assert len(trade_df) == len(instance.trades)
+    if len(trade_df):
+        assert np.isfinite(performance['final_capital'])
+    bench_results.append(bench_record('run_backtest', name, n_bars, seconds, peak, len(trade_df)))
+
+
+@pytest.mark.parametrize('name, n_bars', CASES)
+def test_candlestick_figure(name, n_bars, bench_results):
+    plot_utils = pytest.importorskip('plot_utils')
+    data = dataset(name, n_bars)
+    trades = strategy(name, n_bars).trades
+
+    def build():
+        fig = plot_utils.create_candlestick_figure(data)
+        return plot_utils.add_trade_markers(fig, trades, data)
+
+    fig, seconds, peak = measure(build, REPEAT)
+    assert len(fig.data) >= 1
+    bench_results.append(bench_record('candlestick_figure', name, n_bars, seconds, peak, len(trades)))
+
+
+@pytest.mark.parametrize('name, n_bars', CASES)
+def test_fetch_range(name, n_bars, bench_results):
+    from data_fetcher import DataFetcher
+    data = dataset(name, n_bars)
+    exchange = FakeExchange(data)
+    fetcher = DataFetcher(exchange=exchange)
+    since, until = int(exchange.timestamps[0]), int(exchange.timestamps[-1])
+    df, seconds, peak = measure(lambda: fetcher.fetch_range('BTC/USDT', '1m', since, until), REPEAT)
+    assert len(df) == n_bars
+    bench_results.append(bench_record('fetch_range', name, n_bars, seconds, peak, pages=exchange.calls))
+
+
+@pytest.mark.parametrize('name', DATASETS)
+def test_monitor_ticks(name, bench_results):
+    from data_fetcher import DataFetcher
+    from monitor import LiveMonitor, SimulatedClock
+    from strategies import iter_candles
+    n_symbols, window, ticks = 10, 500, 200
+    frames = {f"SYM{k}/USDT": GENERATORS[name](window + ticks + 1, seed=k) for k in range(n_symbols)}
+    first = next(iter(frames))
+    # Start mid-way through the first live bar, with `window` closed bars behind it.
+    start_ms = int(frames[first].index[window].value // 10 ** 6) + 500
+
+    def monitor():
+        clock = SimulatedClock(start_ms)
+        fetcher = DataFetcher(async_exchange=FakeAsyncExchange(frames, clock))
+        instance = LiveMonitor(fetcher, [{'symbol': symbol, 'timeframe': '1m'} for symbol in frames], clock=clock,
+                               window=window, settle_ms=0, history=ticks * n_symbols)
+        instance.run(max_ticks=ticks)
+        return instance
+
+    instance, seconds, peak = measure(monitor, REPEAT)
+    assert instance.ticks == ticks
+    # Live events match streaming the same bars in one pass.
+    reference = WickFillStrategy(frames[first], **SETTINGS)
+    expected = [event['event'] for candle in iter_candles(frames[first].iloc[:window + ticks])
+                for event in reference.on_bar(candle) if candle['Timestamp'] >= frames[first].index[window]]
+    assert [event['event'] for event in instance.events if event['symbol'] == first] == expected
+    report = instance.latency_report()
+    bench_results.append(bench_record('monitor_ticks', name, ticks * n_symbols, seconds, peak, len(instance.events),
+                                      fetch_to_signal_ms_p95=float(report['fetch_to_signal_ms_p95'].max())))
@@ -0,0 +1,333 @@
+# cli.py
+"""
+Headless batch runner: python -m backtester {run,sweep,fetch} JOB_FILE [options]
+
+A job file is JSON with optional "defaults" merged into every entry of
+"jobs". Each job names a strategy, params, timeframe, since/until (ISO dates
+or ms) and either "symbol"/"symbols" (read from the candle store) or "data"
+(a local CSV or Parquet file). "symbols" x "timeframes" lists are expanded
+into one job per pair. Sweep jobs add "param_ranges" and optionally
+"method", "n_samples", "metric" and "seed". "intrabar_timeframe" (e.g. "1m")
+resolves bars hitting both stop and target from that timeframe's stored candles.
+"monitor" evaluates each job's strategy live on every newly closed candle of
+its symbol/timeframe and streams the signals to OUTPUT/signals.csv.
+
+    {
+      "defaults": {"strategy": "WickFillStrategy", "timeframe": "1h",
+                   "since": "2023-01-01", "until": "2023-06-01"},
+      "jobs": [{"symbols": ["BTC/USDT", "ETH/USDT"], "params": {"range_factor": 2.5}},
+               {"data": "candles/sol_1h.csv", "symbol": "SOL/USDT"}]
+    }
+"""
+import argparse
+import csv
+import itertools
+import json
+import logging
+import multiprocessing as mp
+import os
+import re
+import sys
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+BACKTEST_KEYS = ('initial_capital', 'fee_rate', 'slippage_rate')
+
+
+def to_ms(value) -> Optional[int]:
+    """
+    Convert an ISO date string or epoch milliseconds to UTC epoch milliseconds.
+    """
+    if value is None or isinstance(value, int):
+        return value
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('UTC')
+    return int(ts.timestamp() * 1000)
+
+
+def load_jobs(path: str) -> List[Dict[str, Any]]:
+    """
+    Read a job file and expand it into a flat list of job dicts, each with a unique 'job_id'.
+    """
+    with open(path) as f:
+        spec = json.load(f)
+    if isinstance(spec, list):
+        spec = {'jobs': spec}
+    defaults = spec.get('defaults', {})
+    jobs = []
+    for entry in spec.get('jobs', []):
+        job = {**defaults, **entry, 'params': {**defaults.get('params', {}), **entry.get('params', {})}}
+        symbols = job.pop('symbols', None) or [job.get('symbol')]
+        timeframes = job.pop('timeframes', None) or [job.get('timeframe', '1h')]
+        for symbol, timeframe in itertools.product(symbols, timeframes):
+            jobs.append({**job, 'symbol': symbol, 'timeframe': timeframe})
+    for k, job in enumerate(jobs):
+        label = '_'.join(str(part) for part in (job.get('strategy'), job.get('symbol'), job['timeframe']))
+        job['job_id'] = f"{k:04d}_{re.sub(r'[^A-Za-z0-9.-]+', '-', label)}"
+    return jobs
+
+
+def read_frame(path: str, since: Optional[int] = None, until: Optional[int] = None) -> pd.DataFrame:
+    """
+    Load OHLCV candles from a CSV or Parquet file indexed (or with a column) named Timestamp.
+    """
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    if 'Timestamp' in df.columns:
+        stamps = df['Timestamp']
+        unit = 'ms' if pd.api.types.is_numeric_dtype(stamps) else None
+        df = df.set_index(pd.to_datetime(stamps, unit=unit)).drop(columns='Timestamp')
+    df.index.name = 'Timestamp'
+    df = df.sort_index()
+    if since is not None:
+        df = df[df.index >= pd.Timestamp(since, unit='ms')]
+    if until is not None:
+        df = df[df.index <= pd.Timestamp(until, unit='ms')]
+    return df
+
+
+def load_job_data(job: dict, store_dir: str, sync: bool = False) -> pd.DataFrame:
+    since, until = to_ms(job.get('since')), to_ms(job.get('until'))
+    if job.get('data'):
+        return read_frame(job['data'], since, until)
+    from data_store import CandleStore
+    store = CandleStore(store_dir)
+    if sync:
+        from data_fetcher import DataFetcher
+        return DataFetcher(store=store).load_range(job['symbol'], job['timeframe'], since, until)
+    return store.read(job['symbol'], job['timeframe'], since, until)
+
+
+def resolve_format(fmt: str) -> str:
+    """
+    'parquet' when requested (or for 'auto' when a Parquet engine is installed), else 'csv'.
+    """
+    if fmt != 'auto':
+        return fmt
+    for engine in ('pyarrow', 'fastparquet'):
+        try:
+            __import__(engine)
+            return 'parquet'
+        except ImportError:
+            continue
+    return 'csv'
+
+
+def write_frame(df: pd.DataFrame, path_base: str, fmt: str) -> str:
+    path = f"{path_base}.{fmt}"
+    tmp_path = path + '.tmp'
+    if fmt == 'parquet':
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+class MetricsWriter:
+    """
+    Appends one CSV row per finished job, widening the header when new metric
+    columns appear, so results reach disk as soon as each job completes.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.columns: List[str] = []
+        if os.path.exists(path):
+            os.remove(path)
+
+    def write(self, row: Dict[str, Any]) -> None:
+        new_columns = [key for key in row if key not in self.columns]
+        if new_columns and self.columns:
+            # Rewrite with the wider header; rows already written keep empty cells.
+            existing = pd.read_csv(self.path)
+            self.columns += new_columns
+            existing.reindex(columns=self.columns).to_csv(self.path, index=False)
+        elif new_columns:
+            self.columns = new_columns
+            with open(self.path, 'w', newline='') as f:
+                csv.writer(f).writerow(self.columns)
+        with open(self.path, 'a', newline='') as f:
+            csv.DictWriter(f, fieldnames=self.columns).writerow(row)
+
+
+def _job_row(job: dict) -> Dict[str, Any]:
+    return {'job_id': job['job_id'], 'strategy': job.get('strategy'), 'symbol': job.get('symbol'),
+            'timeframe': job['timeframe'], 'since': job.get('since'), 'until': job.get('until'),
+            'params': json.dumps(job.get('params', {}), sort_keys=True)}
+
+
+def run_job(job: dict, store_dir: str, output_dir: str, fmt: str, sync: bool = False) -> Dict[str, Any]:
+    """
+    Backtest one job and write its trade log; returns the job's metrics row.
+    Runs inside a worker process, so only the small metrics dict travels back.
+    """
+    from backtester import backtest_strategy
+    from equity import compute_equity_curve, time_based_metrics
+    from strategy_registry import registry
+
+    row = _job_row(job)
+    try:
+        strategy_class = registry.get(job.get('strategy'))
+        if strategy_class is None:
+            raise ValueError(f"Unknown strategy: {job.get('strategy')}")
+        data = load_job_data(job, store_dir, sync)
+        if data.empty:
+            raise ValueError("No data for the requested range.")
+        params = {**registry.default_settings(job['strategy']), **job.get('params', {})}
+        if job.get('intrabar_timeframe'):
+            from data_store import CandleStore
+            from intrabar import IntrabarResolver
+            params['intrabar'] = IntrabarResolver.from_store(CandleStore(store_dir), job['symbol'],
+                                                             job['intrabar_timeframe'], job['timeframe'])
+        backtest_kwargs = {key: job[key] for key in BACKTEST_KEYS if key in job}
+        performance, trade_df = backtest_strategy(strategy_class, data, params, **backtest_kwargs)
+        bar_metrics = time_based_metrics(compute_equity_curve(trade_df, data, **backtest_kwargs), job['timeframe'])
+        trades_path = write_frame(trade_df, os.path.join(output_dir, 'trades', job['job_id']), fmt)
+        row.update(bars=len(data), **performance, **bar_metrics, trades_file=trades_path, error='')
+    except Exception as e:
+        logger.error("Job %s failed: %s", job['job_id'], e)
+        row['error'] = str(e)
+    return row
+
+
+def _run_job_args(args: tuple) -> Dict[str, Any]:
+    return run_job(*args)
+
+
+def command_run(jobs: List[dict], args) -> int:
+    os.makedirs(os.path.join(args.output, 'trades'), exist_ok=True)
+    fmt = resolve_format(args.format)
+    writer = MetricsWriter(os.path.join(args.output, 'metrics.csv'))
+    tasks = [(job, args.store, args.output, fmt, args.sync) for job in jobs]
+    n_workers = min(args.workers or os.cpu_count() or 1, max(1, len(tasks)))
+    failed = 0
+
+    def record(row):
+        nonlocal failed
+        writer.write(row)
+        failed += bool(row.get('error'))
+        logger.info("Finished %s%s", row['job_id'], f" (error: {row['error']})" if row.get('error') else "")
+
+    if n_workers == 1:
+        for task in tasks:
+            record(_run_job_args(task))
+    else:
+        # One job per task and fresh workers every few jobs keep memory bounded
+        # by the largest dataset a worker holds at once.
+        with mp.Pool(n_workers, maxtasksperchild=args.max_tasks_per_child) as pool:
+            for row in pool.imap_unordered(_run_job_args, tasks):
+                record(row)
+    logger.info("Ran %d jobs (%d failed); metrics in %s", len(jobs), failed, writer.path)
+    return 1 if failed else 0
+
+
+def command_sweep(jobs: List[dict], args) -> int:
+    from optimizer import optimize
+    from strategy_registry import registry
+
+    os.makedirs(os.path.join(args.output, 'sweeps'), exist_ok=True)
+    fmt = resolve_format(args.format)
+    failed = 0
+    sweep_jobs = [job for job in jobs if job.get('param_ranges')]
+    if not sweep_jobs:
+        logger.error("No jobs with param_ranges to sweep.")
+        return 1
+    for job in sweep_jobs:
+        strategy_class = registry.get(job.get('strategy'))
+        data = load_job_data(job, args.store, args.sync) if strategy_class is not None else pd.DataFrame()
+        if strategy_class is None or data.empty:
+            logger.error("Skipping sweep %s: unknown strategy or no data.", job['job_id'])
+            failed += 1
+            continue
+        base_params = {**registry.default_settings(job['strategy']), **job.get('params', {})}
+        results = optimize(strategy_class, data, job['param_ranges'], method=job.get('method', 'grid'),
+                           n_samples=job.get('n_samples', 100), base_params=base_params,
+                           metric=job.get('metric', 'sharpe_ratio'), n_workers=args.workers,
+                           checkpoint_path=os.path.join(args.output, 'sweeps', f"{job['job_id']}.jsonl"),
+                           seed=job.get('seed'), **{key: job[key] for key in BACKTEST_KEYS if key in job})
+        path = write_frame(results, os.path.join(args.output, 'sweeps', job['job_id']), fmt)
+        logger.info("Sweep %s: %d combinations written to %s", job['job_id'], len(results), path)
+    return 1 if failed else 0
+
+
+def command_fetch(jobs: List[dict], args) -> int:
+    from data_fetcher import DataFetcher
+    from data_store import CandleStore
+
+    fetcher = DataFetcher(store=CandleStore(args.store))
+    series = {(job['symbol'], job['timeframe']): job for job in jobs if not job.get('data')}
+    failed = 0
+    for (symbol, timeframe), job in series.items():
+        try:
+            written = fetcher.sync(symbol, timeframe, since=to_ms(job.get('since')), until=to_ms(job.get('until')))
+            logger.info("Synced %s %s: %d bars written.", symbol, timeframe, written)
+        except Exception as e:
+            logger.error("Fetching %s %s failed: %s", symbol, timeframe, e)
+            failed += 1
+    return 1 if failed else 0
+
+
+def command_monitor(jobs: List[dict], args) -> int:
+    from data_fetcher import DataFetcher
+    from monitor import LiveMonitor
+
+    writer = MetricsWriter(os.path.join(args.output, 'signals.csv'))
+
+    def record(event):
+        writer.write(event)
+        logger.info("%s %s %s: %s (%.1f ms after fetch)", event['symbol'], event['timeframe'], event['strategy'],
+                    event['event'], event['fetch_to_signal_ms'])
+
+    monitor = LiveMonitor(DataFetcher(), [job for job in jobs if not job.get('data')], window=args.window,
+                          on_event=record)
+    try:
+        monitor.run()
+    except KeyboardInterrupt:
+        logger.info("Monitor stopped.")
+    finally:
+        report = monitor.latency_report()
+        if not report.empty:
+            report.to_csv(os.path.join(args.output, 'latency.csv'))
+    return 0
+
+
+COMMANDS = {'run': command_run, 'sweep': command_sweep, 'fetch': command_fetch, 'monitor': command_monitor}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m backtester', description="Headless batch backtests.")
+    parser.add_argument('command', choices=sorted(COMMANDS))
+    parser.add_argument('job_file', help="JSON job file")
+    parser.add_argument('-o', '--output', default='results', help="output directory (default: results)")
+    parser.add_argument('--store', default=os.getenv("CANDLE_STORE_DIR", "data/candles"),
+                        help="candle store directory")
+    parser.add_argument('--sync', action='store_true',
+                        help="download missing bars from the exchange before running")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--format', choices=('auto', 'parquet', 'csv'), default='auto',
+                        help="trade log / sweep output format (default: parquet when available)")
+    parser.add_argument('--max-tasks-per-child', type=int, default=8,
+                        help="jobs per worker process before it is replaced")
+    parser.add_argument('--window', type=int, default=500, help="bars kept per symbol by the live monitor")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    jobs = load_jobs(args.job_file)
+    if not jobs:
+        logger.error("No jobs in %s", args.job_file)
+        return 1
+    os.makedirs(args.output, exist_ok=True)
+    return COMMANDS[args.command](jobs, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,27 +1,95 @@
 # data_fetcher.py
-import ccxt
+import asyncio
 import pandas as pd
 import datetime
 import time
 import os
 import logging
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data_store import (CandleStore, CANDLE_DTYPE, dedupe_records, find_gaps, ohlcv_to_records,
+                        records_to_frame, subtract_ranges, timeframe_to_ms)
+from profiling import timed
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# Default start of history (2023-01-01T00:00:00Z) when no `since` is given.
+DEFAULT_SINCE_MS = 1672531200000
+
+class RateLimiter:
+    """
+    Thread-safe request spacer: successive wait() calls return at least
+    `interval` seconds apart, so pipelined requests stay within the exchange limit.
+    """
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """
+        Reserve the next request slot and return how long to wait for it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        return slot - now
+
+    def wait(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
 class DataFetcher:
     """
     Fetches historical and live OHLCV data from an exchange.
     """
-    def __init__(self, exchange_id: str = 'binance', max_retries: int = 5, backoff_factor: float = 1.5):
+    def __init__(self, exchange_id: str = 'binance', max_retries: int = 5, backoff_factor: float = 1.5,
+                 store: Optional[CandleStore] = None, exchange=None, max_workers: int = 4,
+                 async_exchange=None):
         self.exchange_id = exchange_id
         self.max_retries = max_retries
         self.backoff_factor = backoff_factor
-        self.exchange = self.initialize_exchange()
+        # An exchange object (e.g. a fake ccxt exchange) may be injected for offline use;
+        # otherwise the ccxt client is only imported and built on first use.
+        self._exchange = None
+        self.async_exchange = async_exchange
+        self.store = store
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(0.0)
         self.cache = {}
+        # Requests that exhausted their retries; sync() only records confirmed
+        # empty ranges when none failed while it ran.
+        self.failed_requests = 0
+        self._failures_lock = threading.Lock()
+        if exchange is not None:
+            self.exchange = exchange
 
-    def initialize_exchange(self) -> ccxt.Exchange:
+    @property
+    def exchange(self):
+        if self._exchange is None:
+            self.exchange = self.initialize_exchange()
+        return self._exchange
+
+    @exchange.setter
+    def exchange(self, exchange) -> None:
+        self._exchange = exchange
+        self.rate_limiter.interval = getattr(exchange, 'rateLimit', 0) / 1000
+
+    def initialize_exchange(self):
+        import ccxt
         if self.exchange_id == 'binance':
             api_key = os.getenv("BINANCE_API_KEY")
             secret = os.getenv("BINANCE_API_SECRET")
@@ -35,18 +103,41 @@ class DataFetcher:
         else:
             raise ValueError(f"Exchange {self.exchange_id} is not supported yet.")
 
+    def initialize_async_exchange(self):
+        """
+        Build a ccxt.async_support client for the concurrent fetch path.
+        """
+        import ccxt.async_support as ccxt_async
+        if self.exchange_id == 'binance':
+            return ccxt_async.binance({
+                'enableRateLimit': True,
+                'apiKey': os.getenv("BINANCE_API_KEY"),
+                'secret': os.getenv("BINANCE_API_SECRET"),
+            })
+        raise ValueError(f"Exchange {self.exchange_id} is not supported yet.")
+
+    @timed('DataFetcher.fetch_historical_data')
     def fetch_historical_data(self, symbol: str = "BTC/USDT", timeframe: str = "1h",
-                                since: Optional[int] = None, limit: int = 500, use_cache: bool = True) -> pd.DataFrame:
+                                since: Optional[int] = None, limit: int = 500, use_cache: bool = True,
+                                until: Optional[int] = None) -> pd.DataFrame:
         """
         Fetch historical OHLCV data and return it as a pandas DataFrame.
+
+        When `until` is given the whole [since, until] range is downloaded in
+        pages of `limit` bars; otherwise a single page is fetched.
         """
-        cache_key = (symbol, timeframe, since, limit)
+        cache_key = (symbol, timeframe, since, limit, until)
         if use_cache and cache_key in self.cache:
             logger.info("Using cached data for %s", cache_key)
             return self.cache[cache_key]
         
         if since is None:
-            since = self.exchange.parse8601('2023-01-01T00:00:00Z')
+            since = DEFAULT_SINCE_MS
+        if until is not None:
+            df = self.fetch_range(symbol, timeframe, since, until, limit=limit)
+            if not df.empty:
+                self.cache[cache_key] = df
+            return df
         try:
             since_readable = datetime.datetime.fromtimestamp(since / 1000).strftime('%Y-%m-%d %H:%M:%S')
             logger.info("Fetching historical data for %s since %s", symbol, since_readable)
@@ -111,3 +202,310 @@ class DataFetcher:
                     return {}
                 time.sleep(delay)
                 delay *= self.backoff_factor
+
+    def _fetch_ohlcv_with_retry(self, symbol: str, timeframe: str, since: Optional[int], limit: int) -> list:
+        """
+        Call fetch_ohlcv with exponential backoff. Returns the raw rows, or an
+        empty list once retries are exhausted.
+        """
+        attempt = 0
+        delay = 1
+        while attempt < self.max_retries:
+            try:
+                exchange = self.exchange  # built before waiting so its rate limit applies
+                self.rate_limiter.wait()
+                return exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+            except Exception as e:
+                attempt += 1
+                logger.error("Attempt %d: Error fetching OHLCV for %s: %s", attempt, symbol, e)
+                if attempt >= self.max_retries:
+                    logger.error("Max retries reached for %s.", symbol)
+                    with self._failures_lock:
+                        self.failed_requests += 1
+                    return []
+                time.sleep(delay)
+                delay *= self.backoff_factor
+
+    def _now_ms(self) -> int:
+        if hasattr(self.exchange, 'milliseconds'):
+            return self.exchange.milliseconds()
+        return int(time.time() * 1000)
+
+    def _fetch_page(self, symbol: str, timeframe: str, start: int, end: int, limit: int) -> list:
+        """
+        Fetch all bars in [start, end). Exchanges that return fewer bars than
+        requested are followed up from the last bar received.
+        """
+        tf_ms = timeframe_to_ms(timeframe)
+        rows = []
+        since = start
+        while since < end:
+            ohlcv = self._fetch_ohlcv_with_retry(symbol, timeframe, since, limit)
+            if not ohlcv:
+                break
+            rows.extend(ohlcv)
+            next_since = ohlcv[-1][0] + tf_ms
+            if next_since <= since:
+                break
+            since = next_since
+        return rows
+
+    def fetch_range_records(self, symbol: str, timeframe: str, since: int, until: Optional[int] = None,
+                            limit: int = 1000) -> np.ndarray:
+        """
+        Download every bar in [since, until] as a structured candle array.
+
+        The range is split into exchange-sized pages that are requested
+        concurrently, spaced by the exchange rate limit. Overlapping bars are
+        deduplicated and missing bars are logged.
+        """
+        if until is None:
+            until = self._now_ms()
+        page_span = limit * timeframe_to_ms(timeframe)
+        starts = list(range(since, until + 1, page_span))
+        if not starts:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+
+        def fetch(start):
+            return self._fetch_page(symbol, timeframe, start, min(start + page_span, until + 1), limit)
+
+        logger.info("Fetching %d pages of %s %s data.", len(starts), symbol, timeframe)
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as pool:
+            pages = list(pool.map(fetch, starts))
+        return self._finalize_pages(pages, symbol, timeframe, since, until)
+
+    def _finalize_pages(self, pages: list, symbol: str, timeframe: str, since: int, until: int) -> np.ndarray:
+        """
+        Merge fetched pages into one deduplicated candle array clipped to
+        [since, until], logging any missing bars.
+        """
+        records = dedupe_records(ohlcv_to_records([row for page in pages for row in page]))
+        ts = records['Timestamp']
+        records = records[(ts >= since) & (ts <= until)]
+        gaps = find_gaps(records['Timestamp'], timeframe_to_ms(timeframe))
+        if gaps:
+            logger.warning("Detected %d gaps in %s %s data, first at %s.", len(gaps), symbol, timeframe,
+                           pd.to_datetime(gaps[0][0], unit='ms'))
+        return records
+
+    def fetch_range(self, symbol: str = "BTC/USDT", timeframe: str = "1h", since: Optional[int] = None,
+                    until: Optional[int] = None, limit: int = 1000) -> pd.DataFrame:
+        """
+        Fetch every bar in [since, until] and return it as a DataFrame.
+
+        Missing bars are reported as (first_missing_ms, last_missing_ms) pairs
+        in df.attrs['gaps'].
+        """
+        if since is None:
+            since = DEFAULT_SINCE_MS
+        records = self.fetch_range_records(symbol, timeframe, since, until, limit)
+        df = records_to_frame(records)
+        df.attrs['gaps'] = find_gaps(records['Timestamp'], timeframe_to_ms(timeframe))
+        logger.info("Fetched %d rows of data for %s.", len(df), symbol)
+        return df
+
+    def _missing_ranges(self, symbol: str, timeframe: str, since: int, until: int, now: int) -> list:
+        """
+        [start, end] ranges of [since, until] not covered by the store: bars
+        before the first stored bar, holes inside the stored span and the
+        tail after the last stored bar (from the last bar itself while it
+        may still be forming). Ranges the store has confirmed empty are left out.
+        """
+        first_ts = self.store.first_timestamp(symbol, timeframe)
+        last_ts = self.store.last_timestamp(symbol, timeframe)
+        tf_ms = timeframe_to_ms(timeframe)
+        ranges = []
+        if first_ts is None:
+            ranges.append((since, until))
+        else:
+            if since < first_ts:
+                ranges.append((since, min(first_ts - 1, until)))
+            lo, hi = max(since, first_ts), min(until, last_ts)
+            if lo <= hi:
+                ts = self.store.read_records(symbol, timeframe, lo, hi)['Timestamp']
+                if not len(ts):
+                    ranges.append((lo, hi))
+                else:
+                    if ts[0] - lo >= tf_ms:
+                        ranges.append((lo, int(ts[0]) - 1))
+                    ranges.extend(find_gaps(ts, tf_ms))
+                    if hi - ts[-1] >= tf_ms:
+                        ranges.append((int(ts[-1]) + tf_ms, hi))
+            tail_start = last_ts if last_ts + tf_ms > now else last_ts + tf_ms
+            if max(since, tail_start) <= until:
+                ranges.append((max(since, tail_start), until))
+        empty = self.store.empty_ranges(symbol, timeframe)
+        return [piece for start, end in ranges for piece in subtract_ranges(start, end, empty)]
+
+    @staticmethod
+    def _empty_parts(records: np.ndarray, start: int, end: int, tf_ms: int) -> list:
+        """
+        Parts of [start, end] not covered by the periods of the fetched bars.
+        """
+        ts = records['Timestamp']
+        if not len(ts):
+            return [(start, end)]
+        parts = [(start, int(ts[0]) - 1)]
+        parts += [(int(a) + tf_ms, int(b) - 1) for a, b in zip(ts[:-1], ts[1:]) if b - a > tf_ms]
+        parts.append((int(ts[-1]) + tf_ms, end))
+        return [(a, b) for a, b in parts if a <= b]
+
+    def sync(self, symbol: str = "BTC/USDT", timeframe: str = "1h", since: Optional[int] = None,
+             until: Optional[int] = None, limit: int = 1000) -> int:
+        """
+        Bring the local candle store up to date for symbol/timeframe over [since, until].
+
+        Only bars missing from the store are requested: those before the
+        first stored bar, holes left by earlier disjoint loads, and bars after
+        the last stored one (which is re-fetched only while it may still be
+        forming). Closed stretches the exchange returned no bars for are
+        recorded in the store and not requested again. Returns the number of
+        bars written.
+        """
+        if self.store is None:
+            raise ValueError("DataFetcher.sync() requires a CandleStore.")
+        if since is None:
+            since = DEFAULT_SINCE_MS
+        now = self._now_ms()
+        if until is None:
+            until = now
+        if since > until:
+            return 0
+        tf_ms = timeframe_to_ms(timeframe)
+        # Bars opening after now - tf_ms may still be forming, or not exist yet.
+        closed_until = now - tf_ms
+        written = 0
+        for start, end in self._missing_ranges(symbol, timeframe, since, until, now):
+            failed = self.failed_requests
+            records = self.fetch_range_records(symbol, timeframe, start, end, limit)
+            written += self.store.write(symbol, timeframe, records)
+            if self.failed_requests == failed and start <= closed_until:
+                self.store.add_empty_ranges(symbol, timeframe,
+                                            self._empty_parts(records, start, min(end, closed_until), tf_ms))
+        return written
+
+    def load_range(self, symbol: str = "BTC/USDT", timeframe: str = "1h", since: Optional[int] = None,
+                   until: Optional[int] = None, sync: bool = True) -> pd.DataFrame:
+        """
+        Return OHLCV data for [since, until] from the local store, syncing new
+        bars from the exchange first when sync is True.
+        """
+        if self.store is None:
+            raise ValueError("DataFetcher.load_range() requires a CandleStore.")
+        if sync:
+            self.sync(symbol, timeframe, since=since, until=until)
+        df = self.store.read(symbol, timeframe, since, until)
+        logger.info("Loaded %d rows of data for %s from the candle store.", len(df), symbol)
+        return df
+
+    async def _fetch_ohlcv_with_retry_async(self, exchange, symbol: str, timeframe: str,
+                                            since: Optional[int], limit: int) -> list:
+        """
+        Async counterpart of _fetch_ohlcv_with_retry(); shares the same rate-limit budget.
+        """
+        attempt = 0
+        delay = 1
+        while attempt < self.max_retries:
+            try:
+                await self.rate_limiter.wait_async()
+                return await exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+            except Exception as e:
+                attempt += 1
+                logger.error("Attempt %d: Error fetching OHLCV for %s: %s", attempt, symbol, e)
+                if attempt >= self.max_retries:
+                    logger.error("Max retries reached for %s.", symbol)
+                    with self._failures_lock:
+                        self.failed_requests += 1
+                    return []
+                await asyncio.sleep(delay)
+                delay *= self.backoff_factor
+
+    async def _fetch_page_async(self, exchange, semaphore: asyncio.Semaphore, symbol: str, timeframe: str,
+                                start: int, end: int, limit: int) -> list:
+        tf_ms = timeframe_to_ms(timeframe)
+        rows = []
+        since = start
+        async with semaphore:
+            while since < end:
+                ohlcv = await self._fetch_ohlcv_with_retry_async(exchange, symbol, timeframe, since, limit)
+                if not ohlcv:
+                    break
+                rows.extend(ohlcv)
+                next_since = ohlcv[-1][0] + tf_ms
+                if next_since <= since:
+                    break
+                since = next_since
+        return rows
+
+    async def _fetch_range_records_async(self, exchange, semaphore: asyncio.Semaphore, symbol: str,
+                                         timeframe: str, since: int, until: int, limit: int) -> np.ndarray:
+        page_span = limit * timeframe_to_ms(timeframe)
+        pages = await asyncio.gather(*[
+            self._fetch_page_async(exchange, semaphore, symbol, timeframe, start,
+                                   min(start + page_span, until + 1), limit)
+            for start in range(since, until + 1, page_span)
+        ])
+        return self._finalize_pages(pages, symbol, timeframe, since, until)
+
+    async def fetch_ranges_async(self, ranges: Dict[Tuple[str, str], Tuple[int, int]], limit: int = 1000,
+                                 max_concurrency: int = 10) -> Dict[Tuple[str, str], np.ndarray]:
+        """
+        Download a different [since, until] range per (symbol, timeframe)
+        pair concurrently, as structured candle arrays keyed by pair.
+
+        All pages share one rate-limit budget and at most `max_concurrency`
+        requests are in flight. self.async_exchange is used when set (and
+        left open); otherwise a client is built and closed for this call.
+        """
+        exchange = self.async_exchange
+        owns_exchange = exchange is None
+        if owns_exchange:
+            exchange = self.initialize_async_exchange()
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        pairs = list(ranges)
+        try:
+            results = await asyncio.gather(*[
+                self._fetch_range_records_async(exchange, semaphore, symbol, timeframe, *ranges[(symbol, timeframe)],
+                                                limit)
+                for symbol, timeframe in pairs
+            ])
+        finally:
+            if owns_exchange:
+                await exchange.close()
+        return dict(zip(pairs, results))
+
+    async def fetch_many_async(self, symbols: Sequence[str], timeframes: Sequence[str] = ("1h",),
+                               since: Optional[int] = None, until: Optional[int] = None, limit: int = 1000,
+                               max_concurrency: int = 10) -> Dict[Tuple[str, str], pd.DataFrame]:
+        """
+        Download [since, until] for every symbol/timeframe pair concurrently.
+
+        All pages of all pairs share one rate-limit budget and at most
+        `max_concurrency` requests are in flight. Returns a dict keyed by
+        (symbol, timeframe).
+        """
+        if since is None:
+            since = DEFAULT_SINCE_MS
+        if until is None:
+            until = self._now_ms()
+        ranges = {(symbol, timeframe): (since, until) for symbol in symbols for timeframe in timeframes}
+        results = await self.fetch_ranges_async(ranges, limit, max_concurrency)
+        frames = {pair: records_to_frame(records) for pair, records in results.items()}
+        logger.info("Fetched %d symbol/timeframe pairs concurrently.", len(frames))
+        return frames
+
+    def fetch_many(self, symbols: Sequence[str], timeframes: Sequence[str] = ("1h",),
+                   since: Optional[int] = None, until: Optional[int] = None, limit: int = 1000,
+                   max_concurrency: int = 10, as_frame: bool = False):
+        """
+        Synchronous wrapper around fetch_many_async().
+
+        Returns a dict of DataFrames keyed by (symbol, timeframe), or a single
+        frame indexed by (Symbol, Timeframe, Timestamp) when as_frame is True.
+        """
+        frames = asyncio.run(self.fetch_many_async(symbols, timeframes, since, until, limit, max_concurrency))
+        if not as_frame:
+            return frames
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, names=['Symbol', 'Timeframe'])
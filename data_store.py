@@ -0,0 +1,286 @@
+# data_store.py
+import numpy as np
+import pandas as pd
+import os
+import logging
+import contextlib
+import json
+import tempfile
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+CANDLE_DTYPE = np.dtype([('Timestamp', '<i8')] + [(col, '<f8') for col in OHLCV_COLUMNS])
+
+_TIMEFRAME_UNITS_MS = {
+    's': 1000,
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000,
+    'M': 30 * 24 * 60 * 60 * 1000,
+}
+
+
+def timeframe_to_ms(timeframe: str) -> int:
+    """
+    Convert a ccxt timeframe string such as '5m', '1h' or '1d' to milliseconds.
+    """
+    try:
+        return int(timeframe[:-1]) * _TIMEFRAME_UNITS_MS[timeframe[-1]]
+    except (KeyError, ValueError):
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+
+
+def dedupe_records(records: np.ndarray) -> np.ndarray:
+    """
+    Sort candles by timestamp and drop duplicates, keeping the last copy seen.
+    """
+    if len(records) == 0:
+        return records
+    reversed_records = records[::-1]
+    _, keep = np.unique(reversed_records['Timestamp'], return_index=True)
+    return reversed_records[keep]
+
+
+def find_gaps(timestamps: np.ndarray, timeframe_ms: int) -> list:
+    """
+    Return (first_missing_ms, last_missing_ms) pairs for runs of missing bars
+    in a sorted timestamp array.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if len(timestamps) < 2:
+        return []
+    steps = np.diff(timestamps)
+    gap_at = np.flatnonzero(steps > timeframe_ms)
+    return [(int(timestamps[k] + timeframe_ms), int(timestamps[k + 1] - timeframe_ms)) for k in gap_at]
+
+
+def merge_ranges(ranges) -> list:
+    """
+    Sort inclusive [start, end] ranges and merge the overlapping or touching ones.
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(r) for r in merged]
+
+
+def subtract_ranges(start: int, end: int, ranges) -> list:
+    """
+    Parts of the inclusive range [start, end] not covered by the sorted,
+    merged inclusive ranges.
+    """
+    pieces = []
+    for lo, hi in ranges:
+        if hi < start or lo > end:
+            continue
+        if lo > start:
+            pieces.append((start, lo - 1))
+        start = hi + 1
+        if start > end:
+            return pieces
+    pieces.append((start, end))
+    return pieces
+
+
+def ohlcv_to_records(ohlcv) -> np.ndarray:
+    """
+    Convert raw ccxt OHLCV rows ([ms, open, high, low, close, volume]) into a
+    structured candle array sorted by timestamp.
+    """
+    records = np.empty(len(ohlcv), dtype=CANDLE_DTYPE)
+    if len(ohlcv):
+        rows = np.asarray(ohlcv, dtype=np.float64)
+        records['Timestamp'] = rows[:, 0].astype(np.int64)
+        for k, col in enumerate(OHLCV_COLUMNS, start=1):
+            records[col] = rows[:, k]
+        records = records[np.argsort(records['Timestamp'], kind='stable')]
+    return records
+
+
+def records_to_frame(records: np.ndarray) -> pd.DataFrame:
+    """
+    Build a DataFrame shaped like DataFetcher.fetch_historical_data() output.
+    """
+    df = pd.DataFrame({col: records[col] for col in OHLCV_COLUMNS},
+                      index=pd.to_datetime(records['Timestamp'], unit='ms'))
+    df.index.name = 'Timestamp'
+    return df
+
+
+class CandleStore:
+    """
+    Local columnar OHLCV store.
+
+    Candles are kept as memory-mapped NumPy files partitioned by
+    symbol / timeframe / month, e.g. ``<root>/BTC-USDT/1h/2023-01.npy``.
+    Time ranges the exchange confirmed to have no bars are kept next to the
+    partitions in ``empty_ranges.json``, so syncs do not request them again.
+    """
+    def __init__(self, root_dir: str = "data/candles") -> None:
+        self.root_dir = root_dir
+
+    def _series_dir(self, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.root_dir, symbol.replace('/', '-'), timeframe)
+
+    def _partitions(self, symbol: str, timeframe: str) -> list:
+        series_dir = self._series_dir(symbol, timeframe)
+        if not os.path.isdir(series_dir):
+            return []
+        # Partitions are <YYYY-MM>.npy; temp files from interrupted writes end in .partial.
+        return sorted(name[:-4] for name in os.listdir(series_dir) if name.endswith('.npy') and '.' not in name[:-4])
+
+    def _load_partition(self, symbol: str, timeframe: str, month: str) -> np.ndarray:
+        path = os.path.join(self._series_dir(symbol, timeframe), f"{month}.npy")
+        return np.load(path, mmap_mode='r')
+
+    def write(self, symbol: str, timeframe: str, ohlcv) -> int:
+        """
+        Merge raw OHLCV rows (or a structured candle array) into the store.
+
+        Incoming bars replace stored bars with the same timestamp, so a candle
+        that was still forming when first saved is refreshed on the next sync.
+        Returns the number of bars written.
+        """
+        records = ohlcv if isinstance(ohlcv, np.ndarray) and ohlcv.dtype == CANDLE_DTYPE else ohlcv_to_records(ohlcv)
+        if len(records) == 0:
+            return 0
+        series_dir = self._series_dir(symbol, timeframe)
+        os.makedirs(series_dir, exist_ok=True)
+        months = records['Timestamp'].astype('datetime64[ms]').astype('datetime64[M]')
+        # Other processes (sync workers, the dashboard and its jobs) may write
+        # the same series: the read-merge-replace of each month runs under the lock.
+        with self.series_lock(symbol, timeframe):
+            existing = set(self._partitions(symbol, timeframe))
+            for month in np.unique(months):
+                name = str(month)
+                incoming = records[months == month]
+                if name in existing:
+                    stored = np.array(self._load_partition(symbol, timeframe, name))
+                    incoming = dedupe_records(np.concatenate([stored, incoming]))
+                # A unique temp name that does not end in .npy, so a crash never leaves a stray partition.
+                with tempfile.NamedTemporaryFile(dir=series_dir, suffix='.partial', delete=False) as f:
+                    tmp_path = f.name
+                    np.save(f, incoming)
+                try:
+                    os.replace(tmp_path, os.path.join(series_dir, f"{name}.npy"))
+                except OSError:
+                    os.remove(tmp_path)
+                    raise
+        logger.info("Stored %d bars for %s %s.", len(records), symbol, timeframe)
+        return len(records)
+
+    @contextlib.contextmanager
+    def series_lock(self, symbol: str, timeframe: str):
+        """
+        Exclusive inter-process lock on one symbol/timeframe series.
+        """
+        series_dir = self._series_dir(symbol, timeframe)
+        os.makedirs(series_dir, exist_ok=True)
+        with open(os.path.join(series_dir, ".lock"), 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def empty_ranges(self, symbol: str, timeframe: str) -> list:
+        """
+        Sorted [start_ms, end_ms] ranges confirmed to hold no bars.
+        """
+        path = os.path.join(self._series_dir(symbol, timeframe), "empty_ranges.json")
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [tuple(r) for r in json.load(f)]
+
+    def add_empty_ranges(self, symbol: str, timeframe: str, ranges) -> None:
+        """
+        Record [start_ms, end_ms] ranges that are confirmed to hold no bars.
+        """
+        ranges = [(int(start), int(end)) for start, end in ranges if start <= end]
+        if not ranges:
+            return
+        series_dir = self._series_dir(symbol, timeframe)
+        with self.series_lock(symbol, timeframe):
+            merged = merge_ranges(self.empty_ranges(symbol, timeframe) + ranges)
+            with tempfile.NamedTemporaryFile('w', dir=series_dir, suffix='.partial', delete=False) as f:
+                json.dump(merged, f)
+            os.replace(f.name, os.path.join(series_dir, "empty_ranges.json"))
+
+    def partition_versions(self, symbol: str, timeframe: str) -> dict:
+        """
+        {month: (inode, mtime_ns, size)} for every stored partition; a write
+        changes the entry of each partition it touches.
+        """
+        series_dir = self._series_dir(symbol, timeframe)
+        versions = {}
+        for month in self._partitions(symbol, timeframe):
+            st = os.stat(os.path.join(series_dir, f"{month}.npy"))
+            versions[month] = (st.st_ino, st.st_mtime_ns, st.st_size)
+        return versions
+
+    def first_timestamp(self, symbol: str, timeframe: str) -> Optional[int]:
+        """
+        Return the earliest stored timestamp (ms) or None when nothing is stored.
+        """
+        partitions = self._partitions(symbol, timeframe)
+        if not partitions:
+            return None
+        return int(self._load_partition(symbol, timeframe, partitions[0])['Timestamp'][0])
+
+    def last_timestamp(self, symbol: str, timeframe: str) -> Optional[int]:
+        """
+        Return the latest stored timestamp (ms) or None when nothing is stored.
+        """
+        partitions = self._partitions(symbol, timeframe)
+        if not partitions:
+            return None
+        return int(self._load_partition(symbol, timeframe, partitions[-1])['Timestamp'][-1])
+
+    def read_records(self, symbol: str, timeframe: str, start_ms: Optional[int] = None,
+                     end_ms: Optional[int] = None) -> np.ndarray:
+        """
+        Return stored candles with start_ms <= Timestamp <= end_ms as a structured array.
+        """
+        first_month = str(np.datetime64(start_ms, 'ms').astype('datetime64[M]')) if start_ms is not None else None
+        last_month = str(np.datetime64(end_ms, 'ms').astype('datetime64[M]')) if end_ms is not None else None
+        chunks = []
+        for month in self._partitions(symbol, timeframe):
+            if (first_month and month < first_month) or (last_month and month > last_month):
+                continue
+            part = self._load_partition(symbol, timeframe, month)
+            ts = part['Timestamp']
+            lo = np.searchsorted(ts, start_ms, side='left') if start_ms is not None else 0
+            hi = np.searchsorted(ts, end_ms, side='right') if end_ms is not None else len(ts)
+            if hi > lo:
+                chunks.append(part[lo:hi])
+        if not chunks:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return np.concatenate(chunks)
+
+    def read(self, symbol: str, timeframe: str, start_ms: Optional[int] = None,
+             end_ms: Optional[int] = None) -> pd.DataFrame:
+        """
+        Return stored candles in [start_ms, end_ms] as an OHLCV DataFrame.
+        """
+        return records_to_frame(self.read_records(symbol, timeframe, start_ms, end_ms))
@@ -0,0 +1,74 @@
+# dataset_cache.py
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def dataset_key(symbol: str, timeframe: str, since: Optional[int], until: Optional[int]) -> dict:
+    """
+    Small JSON-serializable key identifying a dataset; this is what the
+    dashboard keeps in its dcc.Store instead of the data itself.
+    """
+    return {'symbol': symbol, 'timeframe': timeframe, 'since': since, 'until': until}
+
+
+def _cache_key(key: dict) -> tuple:
+    return (key['symbol'], key['timeframe'], key['since'], key['until'])
+
+
+class DatasetCache:
+    """
+    Server-side LRU cache of OHLCV DataFrames keyed by dataset_key(),
+    bounded by entry count and total memory.
+    """
+    def __init__(self, max_items: int = 32, max_bytes: int = 1024 * 1024 * 1024) -> None:
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key: dict, df: pd.DataFrame) -> dict:
+        """
+        Cache df under key and return the key for the client-side store.
+        """
+        cache_key = _cache_key(key)
+        size = int(df.memory_usage(index=True, deep=False).sum())
+        with self._lock:
+            if cache_key in self._entries:
+                self.current_bytes -= int(self._entries.pop(cache_key).memory_usage(index=True).sum())
+            self._entries[cache_key] = df
+            self.current_bytes += size
+            while self._entries and (len(self._entries) > self.max_items or self.current_bytes > self.max_bytes):
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= int(evicted.memory_usage(index=True).sum())
+                logger.info("Evicted dataset %s from the server-side cache.", evicted_key)
+                if evicted_key == cache_key:
+                    break
+        return key
+
+    def get(self, key: Optional[dict]) -> Optional[pd.DataFrame]:
+        if key is None:
+            return None
+        cache_key = _cache_key(key)
+        with self._lock:
+            df = self._entries.get(cache_key)
+            if df is not None:
+                self._entries.move_to_end(cache_key)
+            return df
+
+    def get_or_load(self, key: dict, loader: Callable[[dict], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Return the cached frame for key, or load it with loader(key) and cache it.
+        """
+        df = self.get(key)
+        if df is None:
+            df = loader(key)
+            if not df.empty:
+                self.put(key, df)
+        return df
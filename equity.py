@@ -0,0 +1,132 @@
+# equity.py
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtester import compute_accounting
+from data_store import timeframe_to_ms
+from trade_log import TradeLog
+
+logger = logging.getLogger(__name__)
+
+_YEAR_MS = 365 * 24 * 60 * 60 * 1000
+
+
+def _bar_positions(index: pd.DatetimeIndex, ticks: np.ndarray, time_dtype: np.dtype) -> np.ndarray:
+    times = ticks.view(time_dtype).astype(index.values.dtype)
+    return np.clip(index.searchsorted(times), 0, len(index) - 1)
+
+
+def compute_equity_curve(trades, data: pd.DataFrame, initial_capital: float = 10000.0,
+                         fee_rate: float = 0.001, slippage_rate: float = 0.001) -> pd.DataFrame:
+    """
+    Mark-to-market equity for every bar of data, using the same one-unit
+    accounting as run_backtest().
+
+    Open positions are valued at each bar's Close against their effective
+    entry price; a trade's net profit (after slippage and fees) is realized on
+    its exit bar, so the last value equals run_backtest()'s final capital.
+    Built from difference arrays and cumulative sums with no per-bar loop.
+    Returns a frame with 'equity', 'realized', 'position' (net open side) and
+    'open_trades' columns.
+    """
+    log = TradeLog.from_records(trades)
+    n = len(data)
+    close = data['Close'].to_numpy(dtype=np.float64)
+    if len(log) and n:
+        accounts = compute_accounting(log.side, log.entry_price, log.exit_price, initial_capital,
+                                      fee_rate, slippage_rate)
+        curve = mark_to_market(close, _bar_positions(data.index, log.entry_time, log.time_dtype),
+                               _bar_positions(data.index, log.exit_time, log.time_dtype),
+                               log.side.astype(np.float64), accounts['effective_entry'],
+                               accounts['net_profit'], initial_capital)
+    else:
+        empty = np.empty(0)
+        curve = mark_to_market(close, empty, empty, empty, empty, empty, initial_capital)
+    return pd.DataFrame(curve, index=data.index)
+
+
+def mark_to_market(close: np.ndarray, entry_idx: np.ndarray, exit_idx: np.ndarray, units: np.ndarray,
+                   effective_entry: np.ndarray, net_profit: np.ndarray,
+                   initial_capital: float = 0.0) -> Dict[str, np.ndarray]:
+    """
+    Per-bar equity arrays for trades held over [entry_idx, exit_idx) bars of
+    one instrument; units is the signed quantity (side * size) of each trade
+    and net_profit is realized on its exit bar.
+    """
+    n = len(close)
+    realized_delta = np.zeros(n)
+    units_delta = np.zeros(n)
+    basis_delta = np.zeros(n)
+    open_delta = np.zeros(n, dtype=np.int64)
+    entry_idx = np.asarray(entry_idx, dtype=np.int64)
+    exit_idx = np.asarray(exit_idx, dtype=np.int64)
+    np.add.at(realized_delta, exit_idx, net_profit)
+    # Open on [entry_idx, exit_idx): add at entry, remove at exit.
+    np.add.at(units_delta, entry_idx, units)
+    np.add.at(units_delta, exit_idx, -units)
+    np.add.at(basis_delta, entry_idx, units * effective_entry)
+    np.add.at(basis_delta, exit_idx, -units * effective_entry)
+    np.add.at(open_delta, entry_idx, 1)
+    np.add.at(open_delta, exit_idx, -1)
+
+    realized = initial_capital + np.cumsum(realized_delta)
+    position = np.cumsum(units_delta)
+    open_trades = np.cumsum(open_delta)
+    # Open PnL = sum over open trades of units * (close - effective_entry);
+    # forced to zero when flat so cumsum rounding never leaks into equity.
+    unrealized = np.where(open_trades > 0, position * close - np.cumsum(basis_delta), 0.0)
+    return {'equity': realized + unrealized, 'realized': realized, 'position': position,
+            'open_trades': open_trades}
+
+
+def periods_per_year(index: pd.DatetimeIndex, timeframe: Optional[str] = None) -> float:
+    """
+    Number of bars per year for the candle timeframe (inferred from the index when not given).
+    """
+    if timeframe is not None:
+        return _YEAR_MS / timeframe_to_ms(timeframe)
+    if len(index) < 2:
+        return 1.0
+    step_ms = np.median(np.diff(index.values).astype('timedelta64[ms]').astype(np.int64))
+    return _YEAR_MS / step_ms if step_ms > 0 else 1.0
+
+
+def time_based_metrics(equity_curve: pd.DataFrame, timeframe: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Annualized risk metrics from a per-bar equity curve: Sharpe, Sortino,
+    CAGR, Calmar, max drawdown, time under water and exposure.
+    """
+    equity = equity_curve['equity'].to_numpy(dtype=np.float64)
+    n = len(equity)
+    if n < 2:
+        return {}
+    ppy = periods_per_year(equity_curve.index, timeframe)
+    returns = np.diff(equity) / equity[:-1]
+    mean_return = returns.mean()
+    std_return = returns.std(ddof=1)
+    downside = np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2))
+
+    running_max = np.maximum.accumulate(equity)
+    drawdown = (equity - running_max) / running_max
+    max_drawdown = drawdown.min()
+    underwater = equity < running_max
+    # Bars since the last equity peak; its maximum is the longest drawdown.
+    last_peak = np.maximum.accumulate(np.where(underwater, 0, np.arange(n)))
+    longest_drawdown_bars = int((np.arange(n) - last_peak).max())
+
+    growth = equity[-1] / equity[0]
+    cagr = growth ** (ppy / (n - 1)) - 1 if growth > 0 else -1.0
+    return {
+        'annualized_return': cagr,
+        'annualized_volatility': std_return * np.sqrt(ppy),
+        'sharpe_ratio_annualized': mean_return / std_return * np.sqrt(ppy) if std_return > 0 else 0,
+        'sortino_ratio': mean_return / downside * np.sqrt(ppy) if downside > 0 else 0,
+        'calmar_ratio': cagr / abs(max_drawdown) if max_drawdown < 0 else 0,
+        'max_drawdown_mtm': max_drawdown,
+        'time_under_water': underwater.mean(),
+        'longest_drawdown_bars': longest_drawdown_bars,
+        'exposure': (equity_curve['open_trades'].to_numpy() > 0).mean(),
+    }
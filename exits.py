@@ -0,0 +1,100 @@
+# exits.py
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import logging
+from typing import Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Exit reason codes returned by resolve_exits().
+EXIT_TIME = 0
+EXIT_STOP = 1
+EXIT_TARGET = 2
+
+# Upper bound on the number of window cells materialized per chunk.
+_MAX_CHUNK_CELLS = 4_000_000
+
+
+def resolve_exits(high: np.ndarray, low: np.ndarray, close: np.ndarray, entry_idx: np.ndarray,
+                  sides: np.ndarray, stop_loss: np.ndarray, take_profit: np.ndarray,
+                  max_holding_period: int,
+                  intrabar: Optional[Callable[..., np.ndarray]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Resolve stop-loss / take-profit exits for a batch of entries.
+
+    Each entry is scanned over the bars [entry_idx, entry_idx + max_holding_period).
+    Longs (side 1) stop out when Low <= stop_loss and take profit when
+    High >= take_profit; shorts (side -1) the other way round. When both levels
+    are touched on the same bar the stop-loss wins, unless `intrabar` is given:
+    it is then called once with (bar_idx, sides, stop_loss, take_profit) for
+    all such ambiguous exits and returns True where the target was hit first.
+    Entries with no hit exit at the Close of the last bar of the holding window
+    (clamped to the end of the data).
+
+    Returns (exit_idx, exit_price, exit_reason) arrays aligned with the entries;
+    exit_reason holds EXIT_STOP, EXIT_TARGET or EXIT_TIME.
+    """
+    high = np.ascontiguousarray(high, dtype=np.float64)
+    low = np.ascontiguousarray(low, dtype=np.float64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    entry_idx = np.asarray(entry_idx, dtype=np.int64)
+    sides = np.asarray(sides)
+    stop_loss = np.asarray(stop_loss, dtype=np.float64)
+    take_profit = np.asarray(take_profit, dtype=np.float64)
+
+    m = len(entry_idx)
+    n = len(high)
+    exit_idx = np.minimum(entry_idx + max_holding_period - 1, n - 1)
+    exit_price = close[exit_idx] if m else np.empty(0, dtype=np.float64)
+    exit_reason = np.full(m, EXIT_TIME, dtype=np.int8)
+    if m == 0 or max_holding_period <= 0:
+        return exit_idx, exit_price, exit_reason
+
+    # Pad with NaN so every window has full length; NaN never compares true.
+    pad = np.full(max_holding_period - 1, np.nan)
+    high_windows = sliding_window_view(np.concatenate([high, pad]), max_holding_period)
+    low_windows = sliding_window_view(np.concatenate([low, pad]), max_holding_period)
+
+    is_long = sides == 1
+    ambiguous = []
+    chunk = max(1, _MAX_CHUNK_CELLS // max_holding_period)
+    for start in range(0, m, chunk):
+        sl = slice(start, start + chunk)
+        rows = entry_idx[sl]
+        highs = high_windows[rows]
+        lows = low_windows[rows]
+        long_rows = is_long[sl, None]
+        stop = stop_loss[sl, None]
+        target = take_profit[sl, None]
+        stop_hit = np.where(long_rows, lows <= stop, highs >= stop)
+        target_hit = np.where(long_rows, highs >= target, lows <= target)
+        any_hit = stop_hit | target_hit
+
+        first = any_hit.argmax(axis=1)
+        row_pos = np.arange(len(rows))
+        found = any_hit[row_pos, first]
+        stopped = found & stop_hit[row_pos, first]
+        targeted = found & ~stopped
+
+        chunk_idx = exit_idx[sl]
+        chunk_price = exit_price[sl]
+        chunk_reason = exit_reason[sl]
+        chunk_idx[found] = rows[found] + first[found]
+        chunk_price[stopped] = stop_loss[sl][stopped]
+        chunk_price[targeted] = take_profit[sl][targeted]
+        chunk_reason[stopped] = EXIT_STOP
+        chunk_reason[targeted] = EXIT_TARGET
+        if intrabar is not None:
+            ambiguous.append(start + np.flatnonzero(stopped & target_hit[row_pos, first]))
+
+    if ambiguous:
+        ambiguous = np.concatenate(ambiguous)
+        if len(ambiguous):
+            target_first = ambiguous[intrabar(exit_idx[ambiguous], sides[ambiguous], stop_loss[ambiguous],
+                                              take_profit[ambiguous])]
+            exit_price[target_first] = take_profit[target_first]
+            exit_reason[target_first] = EXIT_TARGET
+            logger.info("Intrabar resolution: %d of %d ambiguous exits hit the target first.",
+                        len(target_first), len(ambiguous))
+
+    return exit_idx, exit_price, exit_reason
@@ -0,0 +1,183 @@
+# feature_cache.py
+import hashlib
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+logger = logging.getLogger(__name__)
+
+# id(DataFrame) -> (weakref, fingerprint); avoids rehashing the same frame.
+_FINGERPRINTS: Dict[int, tuple] = {}
+
+
+def dataset_fingerprint(data: pd.DataFrame) -> str:
+    """
+    Content hash of an OHLCV DataFrame (index, columns and values).
+
+    The hash is memoized per frame object, so frames must not be mutated in
+    place after their first use.
+    """
+    memo = _FINGERPRINTS.get(id(data))
+    if memo is not None and memo[0]() is data:
+        return memo[1]
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(list(data.columns)).encode())
+    digest.update(np.ascontiguousarray(data.index.values).view(np.uint8))
+    for col in data.columns:
+        digest.update(np.ascontiguousarray(data[col].to_numpy()).view(np.uint8))
+    fingerprint = digest.hexdigest()
+    key = id(data)
+    _FINGERPRINTS[key] = (weakref.ref(data, lambda _ref: _FINGERPRINTS.pop(key, None)), fingerprint)
+    return fingerprint
+
+
+def _column(data: pd.DataFrame, name: str) -> np.ndarray:
+    return data[name].to_numpy(dtype=np.float64)
+
+
+def _trailing(values: np.ndarray, window: int, reducer: str) -> np.ndarray:
+    """
+    out[i] = reducer(values[i - window:i]); NaN where fewer than `window` prior bars exist.
+    """
+    out = np.full(len(values), np.nan)
+    if window > 0 and len(values) > window:
+        views = sliding_window_view(values, window)[:len(values) - window]
+        out[window:] = getattr(views, reducer)(axis=1)
+    return out
+
+
+def _candle_range(data, cache):
+    return _column(data, 'High') - _column(data, 'Low')
+
+
+def _body(data, cache):
+    return np.abs(_column(data, 'Close') - _column(data, 'Open'))
+
+
+def _upper_wick(data, cache):
+    return _column(data, 'High') - np.maximum(_column(data, 'Open'), _column(data, 'Close'))
+
+
+def _lower_wick(data, cache):
+    return np.minimum(_column(data, 'Open'), _column(data, 'Close')) - _column(data, 'Low')
+
+
+def _rolling_high(data, cache, window: int):
+    return _trailing(_column(data, 'High'), window, 'max')
+
+
+def _rolling_low(data, cache, window: int):
+    return _trailing(_column(data, 'Low'), window, 'min')
+
+
+def _rolling_range(data, cache, window: int):
+    return cache.get(data, 'rolling_high', window=window) - cache.get(data, 'rolling_low', window=window)
+
+
+def _rolling_mean_range(data, cache, window: int):
+    return _trailing(cache.get(data, 'candle_range'), window, 'mean')
+
+
+# Feature name -> builder(data, cache, **params). Rolling features at bar i
+# cover the `window` bars before i, matching WickFillStrategy's range check.
+FEATURES: Dict[str, Callable] = {
+    'candle_range': _candle_range,
+    'body': _body,
+    'upper_wick': _upper_wick,
+    'lower_wick': _lower_wick,
+    'rolling_high': _rolling_high,
+    'rolling_low': _rolling_low,
+    'rolling_range': _rolling_range,
+    'rolling_mean_range': _rolling_mean_range,
+}
+
+
+class FeatureCache:
+    """
+    LRU cache of precomputed feature arrays keyed by
+    (dataset fingerprint, feature name, params), bounded by a memory budget.
+    """
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, data: pd.DataFrame, name: str, **params) -> np.ndarray:
+        """
+        Return feature `name` for data, computing and caching it on a miss.
+        Returned arrays are read-only and shared between callers.
+        """
+        key = self._key(data, name, params)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        self.misses += 1
+        values = np.asarray(FEATURES[name](data, self, **params))
+        values.setflags(write=False)
+        self._store(key, values)
+        return values
+
+    def put(self, data: pd.DataFrame, name: str, values: np.ndarray, **params) -> None:
+        """
+        Store a precomputed feature array for data, e.g. a slice of the same
+        feature computed on a longer series that data is a window of.
+        """
+        values = np.asarray(values)
+        if len(values) != len(data):
+            raise ValueError(f"Feature {name} has {len(values)} values for {len(data)} bars.")
+        values.setflags(write=False)
+        self._store(self._key(data, name, params), values)
+
+    @staticmethod
+    def _key(data: pd.DataFrame, name: str, params: dict) -> tuple:
+        if name not in FEATURES:
+            raise KeyError(f"Unknown feature: {name}")
+        return dataset_fingerprint(data), name, tuple(sorted(params.items()))
+
+    def _store(self, key: tuple, values: np.ndarray) -> None:
+        with self._lock:
+            if key in self._entries:
+                return
+            if values.nbytes > self.max_bytes:
+                return
+            self._entries[key] = values
+            self.current_bytes += values.nbytes
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+# Process-wide cache shared by all strategies (and by each sweep worker).
+default_cache = FeatureCache()
+
+
+def get_feature(data: pd.DataFrame, name: str, cache: Optional[FeatureCache] = None, **params) -> np.ndarray:
+    """
+    Fetch a feature array from `cache` (the process-wide cache by default).
+    """
+    return (cache or default_cache).get(data, name, **params)
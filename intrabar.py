@@ -0,0 +1,153 @@
+# intrabar.py
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from data_store import CANDLE_DTYPE, OHLCV_COLUMNS, timeframe_to_ms
+from resampler import bucket_end, bucket_start
+
+logger = logging.getLogger(__name__)
+
+
+def _frame_to_records(df: pd.DataFrame) -> np.ndarray:
+    records = np.empty(len(df), dtype=CANDLE_DTYPE)
+    records['Timestamp'] = df.index.values.astype('datetime64[ms]').astype(np.int64)
+    for col in OHLCV_COLUMNS:
+        records[col] = df[col].to_numpy(dtype=np.float64) if col in df else np.nan
+    return records
+
+
+class IntrabarResolver:
+    """
+    Decides whether the stop-loss or the take-profit was hit first on bars
+    that touch both, using lower-timeframe candles for those bars only.
+
+    loader(start_ms, end_ms) returns the lower-timeframe candles opening in
+    [start_ms, end_ms) as a structured candle array or OHLCV DataFrame. Nearby
+    ambiguous bars are loaded together, and the candles of every bar looked
+    up are kept in an LRU cache, so repeated backtests (e.g. sweeps) reuse
+    them. Bars that stay ambiguous at the lower timeframe, or have no lower
+    candles, keep the conservative stop-loss outcome.
+    """
+    def __init__(self, loader: Callable[[int, int], object], timeframe: str, max_cached_bars: int = 50_000,
+                 merge_gap_bars: int = 4) -> None:
+        self.loader = loader
+        self.timeframe = timeframe
+        # Nominal bar length, only used to decide which bars to load together;
+        # bar boundaries come from resampler.bucket_start/bucket_end, so '1M'
+        # bars follow calendar months.
+        self.bar_ms = timeframe_to_ms(timeframe)
+        self.max_cached_bars = max_cached_bars
+        # Ambiguous bars at most this many bars apart are loaded in one request.
+        self.merge_gap_bars = merge_gap_bars
+        self.loads = 0
+        self.hits = 0
+        self.misses = 0
+        self._bars: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, lower: pd.DataFrame, timeframe: str, **kwargs) -> "IntrabarResolver":
+        """
+        Resolver slicing an in-memory lower-timeframe DataFrame.
+        """
+        records = _frame_to_records(lower.sort_index())
+        ts = records['Timestamp']
+
+        def loader(start_ms, end_ms):
+            return records[np.searchsorted(ts, start_ms):np.searchsorted(ts, end_ms)]
+        return cls(loader, timeframe, **kwargs)
+
+    @classmethod
+    def from_store(cls, store, symbol: str, lower_timeframe: str, timeframe: str, **kwargs) -> "IntrabarResolver":
+        """
+        Resolver reading lower-timeframe candles from a CandleStore (memory-mapped, no network).
+        """
+        return cls(lambda start_ms, end_ms: store.read_records(symbol, lower_timeframe, start_ms, end_ms - 1),
+                   timeframe, **kwargs)
+
+    @classmethod
+    def from_fetcher(cls, fetcher, symbol: str, lower_timeframe: str, timeframe: str,
+                     **kwargs) -> "IntrabarResolver":
+        """
+        Resolver downloading only the needed lower-timeframe ranges through a DataFetcher.
+        """
+        return cls(lambda start_ms, end_ms: fetcher.fetch_range_records(symbol, lower_timeframe, start_ms, end_ms - 1),
+                   timeframe, **kwargs)
+
+    def _load(self, bar_starts: np.ndarray) -> None:
+        """
+        Fetch lower candles for uncached bars, merging nearby bars into one request.
+        """
+        with self._lock:
+            missing = [ts for ts in np.unique(bar_starts).tolist() if ts not in self._bars]
+        if not missing:
+            return
+        groups: List[List[int]] = []
+        for ts in missing:
+            if groups and ts - groups[-1][-1] <= self.merge_gap_bars * self.bar_ms:
+                groups[-1].append(ts)
+            else:
+                groups.append([ts])
+        fetched: Dict[int, np.ndarray] = {}
+        for group in groups:
+            candles = self.loader(group[0], int(bucket_end([group[-1]], self.timeframe)[0]))
+            if isinstance(candles, pd.DataFrame):
+                candles = _frame_to_records(candles)
+            self.loads += 1
+            # Open time of the bar each lower candle belongs to.
+            owner = bucket_start(candles['Timestamp'], self.timeframe)
+            lo = np.searchsorted(owner, group, side='left')
+            hi = np.searchsorted(owner, group, side='right')
+            for ts, start, stop in zip(group, lo.tolist(), hi.tolist()):
+                fetched[ts] = np.ascontiguousarray(candles[start:stop])
+        with self._lock:
+            for ts, candles in fetched.items():
+                self._bars[ts] = candles
+                self._bars.move_to_end(ts)
+            while len(self._bars) > self.max_cached_bars:
+                self._bars.popitem(last=False)
+
+    def target_first(self, bar_starts: np.ndarray, sides: np.ndarray, stop_loss: np.ndarray,
+                     take_profit: np.ndarray) -> np.ndarray:
+        """
+        For each ambiguous bar (open time in ms), True when the lower-timeframe
+        candles reach take_profit before stop_loss.
+        """
+        bar_starts = np.asarray(bar_starts, dtype=np.int64)
+        m = len(bar_starts)
+        if m == 0:
+            return np.zeros(0, dtype=bool)
+        with self._lock:
+            cached = sum(ts in self._bars for ts in bar_starts.tolist())
+        self.hits += cached
+        self.misses += m - cached
+        self._load(bar_starts)
+        with self._lock:
+            # Bars evicted while loading a huge batch simply resolve to the stop.
+            per_bar = [self._bars.get(ts, np.empty(0, dtype=CANDLE_DTYPE)) for ts in bar_starts.tolist()]
+
+        # Flatten every bar's lower candles and find each bar's first hit at once.
+        counts = np.array([len(candles) for candles in per_bar])
+        lower = np.concatenate(per_bar) if counts.sum() else np.empty(0, dtype=CANDLE_DTYPE)
+        owner = np.repeat(np.arange(m), counts)
+        is_long = np.repeat(np.asarray(sides) == 1, counts)
+        stop = np.repeat(np.asarray(stop_loss, dtype=np.float64), counts)
+        target = np.repeat(np.asarray(take_profit, dtype=np.float64), counts)
+        stop_hit = np.where(is_long, lower['Low'] <= stop, lower['High'] >= stop)
+        target_hit = np.where(is_long, lower['High'] >= target, lower['Low'] <= target)
+
+        first = np.full(m, len(lower), dtype=np.int64)
+        hit_pos = np.flatnonzero(stop_hit | target_hit)
+        np.minimum.at(first, owner[hit_pos], hit_pos)
+        resolved = first < len(lower)
+        result = np.zeros(m, dtype=bool)
+        result[resolved] = target_hit[first[resolved]] & ~stop_hit[first[resolved]]
+        return result
+
+    def stats(self) -> dict:
+        return {'cached_bars': len(self._bars), 'loads': self.loads, 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,347 @@
+# job_queue.py
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+_PRIVATE_FIELDS = ('result', 'call', 'cancel_requested', 'pending_outcome')
+
+# Pipe to the parent while running inside a job worker; None elsewhere.
+_progress_conn = None
+
+
+def report_progress(fraction: float, message: str = "") -> None:
+    """
+    Report progress (0..1) of the current job; a no-op outside job workers,
+    so job functions also run unchanged in-process.
+    """
+    if _progress_conn is not None:
+        try:
+            _progress_conn.send(('progress', (float(fraction), message)))
+        except (OSError, ValueError):
+            pass
+
+
+def _worker_main(conn) -> None:
+    # Long-lived worker: runs (fn, args, kwargs) calls until told to stop
+    # (None) or the parent goes away, so module-level caches survive jobs.
+    global _progress_conn
+    _progress_conn = conn
+    while True:
+        try:
+            call = conn.recv()
+        except (EOFError, OSError):
+            return
+        if call is None:
+            return
+        fn, args, kwargs = call
+        try:
+            reply = ('done', fn(*args, **kwargs))
+        except BaseException:
+            reply = ('error', traceback.format_exc())
+        try:
+            conn.send(reply)
+        except Exception:
+            conn.send(('error', traceback.format_exc()))
+
+
+class JobQueue:
+    """
+    Runs submitted functions on a pool of long-lived worker processes (at
+    most max_workers) and tracks their status, progress and results by job id.
+
+    Workers run one job at a time and are kept between jobs, so whatever a
+    job function caches at module level (loaded datasets, resampled candles)
+    is reused by later jobs on the same worker. A running job is cancelled
+    by terminating its worker, which is then replaced; the other workers are
+    unaffected. Submitting a job with the same key as a pending or running
+    job returns the existing job id instead of starting a duplicate.
+    Finished jobs are kept (up to max_finished) until their results are
+    collected.
+
+    Workers are started with 'spawn' by default: they are launched from the
+    monitor thread, and forking a multi-threaded server can deadlock the
+    child on a lock held by another thread (e.g. a logging handler).
+    """
+    def __init__(self, max_workers: Optional[int] = None, max_finished: int = 100,
+                 mp_context: Optional[str] = 'spawn') -> None:
+        self.max_workers = max_workers or int(os.getenv("JOB_WORKERS", 0)) or os.cpu_count() or 1
+        self.max_finished = max_finished
+        self._context = mp.get_context(mp_context)
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._active_keys: Dict[Hashable, str] = {}
+        self._pending: deque = deque()
+        # Worker processes; each is a dict with 'process', 'conn' and the 'job' it runs (or None).
+        self._workers: List[Dict[str, Any]] = []
+        self._running: Dict[str, Dict[str, Any]] = {}
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self._wake_recv, self._wake_send = mp.Pipe(duplex=False)
+        self._monitor: Optional[threading.Thread] = None
+        self._closed = False
+
+    def submit(self, fn: Callable, *args, key: Optional[Hashable] = None, **kwargs) -> str:
+        """
+        Queue fn(*args, **kwargs) and return its job id (the id of the
+        already active job when one with the same key is pending or running).
+        fn, its arguments and its result must be picklable.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("JobQueue is shut down.")
+            if key is not None and key in self._active_keys:
+                job_id = self._active_keys[key]
+                logger.info("Job %s is already queued; not submitting a duplicate.", job_id)
+                return job_id
+            job_id = f"{next(self._counter)}-{uuid.uuid4().hex[:8]}"
+            self._jobs[job_id] = {
+                'id': job_id, 'key': key, 'status': PENDING, 'progress': 0.0, 'message': "",
+                'submitted': time.time(), 'started': None, 'finished': None,
+                'result': None, 'error': None, 'cancel_requested': False,
+                'call': (fn, args, kwargs),
+            }
+            if key is not None:
+                self._active_keys[key] = job_id
+            self._pending.append(job_id)
+            self._ensure_monitor()
+        self._wake()
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Snapshot of a job (without its result), or None for unknown ids.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {name: value for name, value in job.items() if name not in _PRIVATE_FIELDS}
+
+    def result(self, job_id: str, pop: bool = False) -> Any:
+        """
+        Result of a finished job; with pop=True the job is forgotten.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] != DONE:
+                return None
+            if pop:
+                del self._jobs[job_id]
+            return job['result']
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a pending job, or terminate (and replace) the worker running
+        it. Returns False when the job is unknown or already finished.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] in FINISHED_STATES:
+                return False
+            if job['status'] == PENDING:
+                self._pending.remove(job_id)
+                self._finish(job, CANCELLED)
+                return True
+            job['cancel_requested'] = True
+            process = self._running[job_id]['process']
+        process.terminate()
+        self._wake()
+        return True
+
+    def wait(self, job_id: str, timeout: Optional[float] = None, poll_interval: float = 0.05) -> Optional[str]:
+        """
+        Block until the job finishes (or timeout) and return its status.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.status(job_id)
+            if job is None or job['status'] in FINISHED_STATES:
+                return job and job['status']
+            if deadline is not None and time.monotonic() >= deadline:
+                return job['status']
+            time.sleep(poll_interval)
+
+    def shutdown(self, cancel_running: bool = True) -> None:
+        """
+        Cancel pending jobs, terminate (or, with cancel_running=False, wait
+        for) the running ones and stop the workers.
+        """
+        with self._lock:
+            self._closed = True
+            for job_id in list(self._pending):
+                self._finish(self._jobs[job_id], CANCELLED)
+            self._pending.clear()
+            running = list(self._running.items())
+            if cancel_running:
+                for job_id, _worker in running:
+                    self._jobs[job_id]['cancel_requested'] = True
+        if cancel_running:
+            for _job_id, worker in running:
+                worker['process'].terminate()
+        self._wake()
+        # The monitor stops the idle workers and exits once every running job has finished.
+        if self._monitor is not None:
+            self._monitor.join()
+
+    def _wake(self) -> None:
+        try:
+            self._wake_send.send_bytes(b'')
+        except OSError:
+            pass
+
+    def _ensure_monitor(self) -> None:
+        if self._monitor is None or not self._monitor.is_alive():
+            self._monitor = threading.Thread(target=self._monitor_loop, name="job-queue-monitor", daemon=True)
+            self._monitor.start()
+
+    def _finish(self, job: Dict[str, Any], status: str, result: Any = None, error: Optional[str] = None) -> None:
+        # Callers hold self._lock.
+        job.update(status=status, result=result, error=error, finished=time.time(), call=None)
+        if status == DONE:
+            job['progress'] = 1.0
+        if self._active_keys.get(job['key']) == job['id']:
+            del self._active_keys[job['key']]
+        finished = [job_id for job_id, other in self._jobs.items() if other['status'] in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+        logger.info("Job %s %s.", job['id'], status)
+
+    def _start_worker(self) -> Dict[str, Any]:
+        # Callers hold self._lock.
+        conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, args=(child_conn,),
+                                        name=f"job-worker-{len(self._workers) + 1}", daemon=True)
+        try:
+            process.start()
+        finally:
+            child_conn.close()
+        worker = {'process': process, 'conn': conn, 'job': None}
+        self._workers.append(worker)
+        return worker
+
+    def _start_pending(self) -> None:
+        # Callers hold self._lock.
+        while self._pending:
+            worker = next((w for w in self._workers if w['job'] is None), None)
+            if worker is None:
+                if len(self._workers) >= self.max_workers:
+                    return
+                try:
+                    worker = self._start_worker()
+                except Exception:
+                    self._finish(self._jobs[self._pending.popleft()], FAILED, error=traceback.format_exc())
+                    continue
+            job_id = self._pending.popleft()
+            job = self._jobs[job_id]
+            try:
+                # The call is pickled before anything is written, so a failure leaves the pipe clean.
+                worker['conn'].send(job['call'])
+            except Exception:
+                self._finish(job, FAILED, error=traceback.format_exc())
+                continue
+            worker['job'] = job_id
+            job.update(status=RUNNING, started=time.time())
+            self._running[job_id] = worker
+
+    def _drain(self, worker: Dict[str, Any]) -> None:
+        # Apply every message the worker has sent so far.
+        conn = worker['conn']
+        while True:
+            try:
+                if not conn.poll():
+                    return
+                kind, payload = conn.recv()
+            except (EOFError, OSError):
+                return
+            with self._lock:
+                job_id = worker['job']
+                job = self._jobs.get(job_id)
+                if kind == 'progress':
+                    if job is not None and job['status'] == RUNNING:
+                        job['progress'], job['message'] = payload
+                    continue
+                worker['job'] = None
+                self._running.pop(job_id, None)
+                if job is not None and job['status'] == RUNNING:
+                    if kind == 'done':
+                        self._finish(job, DONE, payload)
+                    else:
+                        self._finish(job, FAILED, error=payload)
+
+    def _reap(self, worker: Dict[str, Any]) -> None:
+        # The worker process exited: finish its job and replace it.
+        self._drain(worker)
+        worker['process'].join()
+        worker['conn'].close()
+        with self._lock:
+            self._workers.remove(worker)
+            job_id = worker['job']
+            if job_id is None:
+                return
+            del self._running[job_id]
+            job = self._jobs[job_id]
+            if job['cancel_requested']:
+                self._finish(job, CANCELLED)
+            else:
+                self._finish(job, FAILED, error=f"Worker exited with code {worker['process'].exitcode}.")
+            if not self._closed:
+                try:
+                    self._start_worker()
+                except Exception:
+                    logger.exception("Could not replace a job worker.")
+
+    def _stop_workers(self) -> None:
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            try:
+                worker['conn'].send(None)
+            except OSError:
+                pass
+        for worker in workers:
+            worker['process'].join(timeout=5)
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+                worker['process'].join()
+            worker['conn'].close()
+
+    def _monitor_loop(self) -> None:
+        while True:
+            with self._lock:
+                self._start_pending()
+                if self._closed and not self._running:
+                    break
+                workers = list(self._workers)
+            waitables = {self._wake_recv: None}
+            for worker in workers:
+                waitables[worker['conn']] = worker
+                waitables[worker['process'].sentinel] = worker
+            for ready in wait(list(waitables), timeout=1.0):
+                if ready is self._wake_recv:
+                    while self._wake_recv.poll():
+                        self._wake_recv.recv_bytes()
+                    continue
+                worker = waitables[ready]
+                if not any(worker is other for other in self._workers):
+                    continue
+                if ready is worker['conn']:
+                    self._drain(worker)
+                if not worker['process'].is_alive():
+                    self._reap(worker)
+        self._stop_workers()
@@ -3,9 +3,13 @@ import dash
 from dash import dcc, html
 import dash_bootstrap_components as dbc
 
+from strategy_registry import registry
+
 def create_layout():
     return dbc.Container([
-        dcc.Store(id="historical-data-store"),  # Stores fetched historical data (JSON)
+        dcc.Store(id="historical-data-store"),  # Key of the server-side cached dataset
+        dcc.Store(id="job-store"),  # Id of the running backtest job
+        dcc.Interval(id="job-poll", interval=500, disabled=True),
         dbc.Row([
             dbc.Col(
                 html.H5(
@@ -75,15 +79,16 @@ def create_layout():
                         html.Label("Strategy", style={"color": "white"}),
                         dcc.Dropdown(
                             id="strategy-dropdown",
-                            options=[
-                                {'label': 'WickFill Strategy', 'value': 'WickFillStrategy'},
-                            ],
+                            options=registry.options(),
                             value="WickFillStrategy",
                             clearable=False,
                             style={"backgroundColor": "#2c2f33", "color": "white"}
                         ),
                         html.Br(),
-                        dbc.Button("Run Strategy", id="run-strategy-button", color="secondary", n_clicks=0)
+                        dbc.Button("Run Strategy", id="run-strategy-button", color="secondary", n_clicks=0),
+                        dbc.Button("Cancel", id="cancel-job-button", color="secondary", outline=True, n_clicks=0,
+                                   style={"marginLeft": "10px"}),
+                        html.Div(id="job-status", style={"color": "#aaa", "marginTop": "10px"})
                     ],
                     style={
                         "backgroundColor": "#23272a",
@@ -109,7 +114,8 @@ def create_layout():
                         }
                     }
                 ),
-                html.Div(id="performance-metrics", className="mt-4", style={"textAlign": "left", "marginLeft": "20px"})
+                html.Div(id="performance-metrics", className="mt-4", style={"textAlign": "left", "marginLeft": "20px"}),
+                html.Div(id="profiling-report", className="mt-4", style={"textAlign": "left", "marginLeft": "20px"})
             ], width=8)
         ])
     ], fluid=True, style={
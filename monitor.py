@@ -0,0 +1,286 @@
+# monitor.py
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_store import CANDLE_DTYPE, records_to_frame, timeframe_to_ms
+from resampler import bucket_end, bucket_start
+from strategies import Strategy, iter_candles
+from strategy_registry import registry
+from trade_log import TradeLog
+
+logger = logging.getLogger(__name__)
+
+
+class SystemClock:
+    """
+    Wall-clock time for live monitoring.
+    """
+    def time_ms(self) -> int:
+        return int(time.time() * 1000)
+
+    async def sleep_until(self, timestamp_ms: int) -> None:
+        delay = (timestamp_ms - self.time_ms()) / 1000
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def perf_counter(self) -> float:
+        return time.perf_counter()
+
+
+class SimulatedClock(SystemClock):
+    """
+    Clock for tests and replays: sleeping jumps straight to the wake-up time.
+    Latencies are still measured with the real perf_counter().
+    """
+    def __init__(self, start_ms: int) -> None:
+        self.now_ms = int(start_ms)
+
+    def time_ms(self) -> int:
+        return self.now_ms
+
+    def advance(self, ms: int) -> None:
+        self.now_ms += int(ms)
+
+    async def sleep_until(self, timestamp_ms: int) -> None:
+        self.now_ms = max(self.now_ms, int(timestamp_ms))
+        await asyncio.sleep(0)
+
+
+def last_closed_open(timeframe: str, now_ms: int) -> int:
+    """
+    Open time (ms) of the latest `timeframe` candle that had closed at now_ms.
+    """
+    current = int(bucket_start([now_ms], timeframe)[0])
+    return int(bucket_start([current - 1], timeframe)[0])
+
+
+def _candle(record: tuple) -> dict:
+    # record is one CANDLE_DTYPE row as a tuple.
+    timestamp, open_price, high, low, close, volume = record
+    return {'Timestamp': pd.Timestamp(timestamp, unit='ms'), 'Open': open_price, 'High': high, 'Low': low,
+            'Close': close, 'Volume': volume}
+
+
+def _streams(strategy_class) -> bool:
+    return strategy_class.on_bar is not Strategy.on_bar
+
+
+class LiveMonitor:
+    """
+    Watches symbol/timeframe pairs and evaluates strategies on every newly
+    closed candle.
+
+    watches are dicts with 'symbol', 'timeframe', 'strategy' (registry name,
+    default WickFillStrategy) and optional 'params' (the CLI job format).
+    The monitor wakes settle_ms after each candle-close boundary of its
+    timeframes, fetches the new bars of every due pair in one concurrent
+    batch (DataFetcher.fetch_ranges_async), and feeds them to the strategies
+    through on_bar(); strategies without on_bar() are re-run on the rolling
+    window of the last `window` bars instead. Every strategy event is
+    emitted with its fetch-to-signal latency; per-pair latencies are kept
+    for latency_report().
+
+    Pass a SimulatedClock and a fake async exchange (via the fetcher) to run
+    it offline.
+    """
+    def __init__(self, fetcher, watches: Sequence[Dict[str, Any]], clock: Optional[SystemClock] = None,
+                 window: int = 500, settle_ms: int = 2000, max_concurrency: int = 10,
+                 on_event: Optional[Callable[[dict], None]] = None, history: int = 1000) -> None:
+        self.fetcher = fetcher
+        self.clock = clock or SystemClock()
+        self.window = window
+        self.settle_ms = settle_ms
+        self.max_concurrency = max_concurrency
+        self.on_event = on_event
+        self.events: deque = deque(maxlen=history)
+        self.ticks = 0
+        self._stopped = False
+        # (symbol, timeframe) -> [(strategy name, class, settings)]; _strategies adds the live instance.
+        self._watches: Dict[Tuple[str, str], List[tuple]] = {}
+        for watch in watches:
+            name = watch.get('strategy') or 'WickFillStrategy'
+            strategy_class = registry.get(name)
+            if strategy_class is None:
+                raise ValueError(f"Unknown strategy: {name}")
+            settings = {**registry.default_settings(name), **watch.get('params', {})}
+            self._watches.setdefault((watch['symbol'], watch['timeframe']), []).append(
+                (name, strategy_class, settings))
+        self._bars: Dict[Tuple[str, str], deque] = {}
+        self._strategies: Dict[Tuple[str, str], List[tuple]] = {}
+        self._latency: Dict[Tuple[str, str], deque] = {pair: deque(maxlen=history) for pair in self._watches}
+
+    @property
+    def pairs(self) -> List[Tuple[str, str]]:
+        return list(self._watches)
+
+    def window_frame(self, symbol: str, timeframe: str) -> pd.DataFrame:
+        """
+        The rolling window of closed candles currently held for a pair.
+        """
+        bars = self._bars.get((symbol, timeframe))
+        records = np.array(list(bars), dtype=CANDLE_DTYPE) if bars else np.empty(0, dtype=CANDLE_DTYPE)
+        return records_to_frame(records)
+
+    def next_close(self, now_ms: int) -> int:
+        """
+        Earliest candle-close boundary of any watched timeframe after now_ms.
+        """
+        return min(int(bucket_end(bucket_start([now_ms], tf), tf)[0]) for tf in {tf for _, tf in self._watches})
+
+    async def _fetch(self, pairs: Sequence[Tuple[str, str]], now_ms: int) -> Dict[Tuple[str, str], np.ndarray]:
+        ranges = {}
+        for pair in pairs:
+            bars = self._bars.get(pair)
+            until = last_closed_open(pair[1], now_ms)
+            since = bars[-1][0] + 1 if bars else until - (self.window - 1) * timeframe_to_ms(pair[1])
+            ranges[pair] = (since, until)
+        return await self.fetcher.fetch_ranges_async(ranges, max_concurrency=self.max_concurrency)
+
+    def _start_pair(self, pair: Tuple[str, str], records: np.ndarray) -> None:
+        # Prime each strategy with the warm-up window; events from history are not emitted.
+        if not len(records):
+            logger.warning("No %s %s candles to warm up from; retrying next tick.", *pair)
+            return
+        self._bars[pair] = deque(records[-self.window:].tolist(), maxlen=self.window)
+        frame = self.window_frame(*pair)
+        strategies = []
+        for name, strategy_class, settings in self._watches[pair]:
+            instance = strategy_class(frame, **settings) if _streams(strategy_class) else None
+            if instance is not None:
+                for candle in iter_candles(frame):
+                    instance.on_bar(candle)
+            strategies.append((name, strategy_class, settings, instance))
+        self._strategies[pair] = strategies
+
+    def _evaluate(self, pair: Tuple[str, str], records: np.ndarray) -> List[dict]:
+        bars = self._bars[pair]
+        events = []
+        for record in records.tolist():
+            bars.append(record)
+            candle = None
+            for name, strategy_class, settings, instance in self._strategies[pair]:
+                if instance is not None:
+                    candle = candle or _candle(record)
+                    produced = instance.on_bar(candle)
+                else:
+                    produced = self._rerun(pair, strategy_class, settings)
+                events.extend({'strategy': name, **event} for event in produced)
+        return events
+
+    def _rerun(self, pair: Tuple[str, str], strategy_class, settings: dict) -> List[dict]:
+        # Batch-only strategies: report trades entered on the newest bar of the window.
+        frame = self.window_frame(*pair)
+        instance = strategy_class(frame, **settings)
+        instance.run()
+        trades = TradeLog.from_records(instance.trades).to_frame()
+        if trades.empty:
+            return []
+        latest = trades[pd.to_datetime(trades['entry_time']) == frame.index[-1]]
+        return [{'event': 'entry', **trade} for trade in latest.to_dict('records')]
+
+    async def warm_up(self) -> None:
+        """
+        Load the last `window` closed candles of every pair and prime the strategies.
+        """
+        now_ms = self.clock.time_ms()
+        fetched = await self._fetch(self.pairs, now_ms)
+        for pair, records in fetched.items():
+            self._start_pair(pair, records)
+        logger.info("Monitor warmed up %d pairs with up to %d bars each.", len(fetched), self.window)
+
+    async def tick(self, close_ms: int) -> List[dict]:
+        """
+        Fetch and evaluate the candles of every pair closing at close_ms.
+        Returns the emitted events.
+        """
+        due = [pair for pair in self._watches if int(bucket_start([close_ms], pair[1])[0]) == close_ms]
+        if not due:
+            return []
+        started = self.clock.perf_counter()
+        fetched = await self._fetch(due, close_ms)
+        fetch_ms = (self.clock.perf_counter() - started) * 1000
+        emitted = []
+        for pair in due:
+            records = fetched.get(pair, np.empty(0, dtype=CANDLE_DTYPE))
+            if pair not in self._strategies:
+                self._start_pair(pair, records)
+                continue
+            eval_started = self.clock.perf_counter()
+            events = self._evaluate(pair, records)
+            done = self.clock.perf_counter()
+            expected = last_closed_open(pair[1], close_ms)
+            if self._bars[pair][-1][0] < expected:
+                logger.warning("No closed %s %s candle at %s yet; it will be picked up next tick.", *pair,
+                               pd.Timestamp(expected, unit='ms'))
+            latency = {
+                'fetch_ms': fetch_ms,
+                'eval_ms': (done - eval_started) * 1000,
+                'fetch_to_signal_ms': (done - started) * 1000,
+                'close_to_signal_ms': self.clock.time_ms() - close_ms,
+            }
+            self._latency[pair].append({'close_ms': close_ms, 'new_bars': len(records), **latency})
+            for event in events:
+                event = {'symbol': pair[0], 'timeframe': pair[1], 'close_time': pd.Timestamp(close_ms, unit='ms'),
+                         **event, **latency}
+                emitted.append(event)
+                self.events.append(event)
+                if self.on_event is not None:
+                    self.on_event(event)
+        self.ticks += 1
+        return emitted
+
+    async def run_async(self, max_ticks: Optional[int] = None) -> None:
+        """
+        Warm up, then evaluate every candle close until stop() (or max_ticks boundaries).
+        """
+        owns_exchange = self.fetcher.async_exchange is None
+        if owns_exchange:
+            self.fetcher.async_exchange = self.fetcher.initialize_async_exchange()
+        self._stopped = False
+        try:
+            await self.warm_up()
+            boundaries = 0
+            while not self._stopped and (max_ticks is None or boundaries < max_ticks):
+                close_ms = self.next_close(self.clock.time_ms() - self.settle_ms)
+                await self.clock.sleep_until(close_ms + self.settle_ms)
+                if self._stopped:
+                    break
+                await self.tick(close_ms)
+                boundaries += 1
+        finally:
+            if owns_exchange:
+                await self.fetcher.async_exchange.close()
+                self.fetcher.async_exchange = None
+
+    def run(self, max_ticks: Optional[int] = None) -> None:
+        asyncio.run(self.run_async(max_ticks))
+
+    def stop(self) -> None:
+        self._stopped = True
+
+    def latency_report(self) -> pd.DataFrame:
+        """
+        Per-pair latency summary (ms): mean fetch time and the distribution
+        of fetch-to-signal and candle-close-to-signal times.
+        """
+        rows = []
+        for (symbol, timeframe), samples in self._latency.items():
+            if not samples:
+                continue
+            fetch_to_signal = np.array([s['fetch_to_signal_ms'] for s in samples])
+            close_to_signal = np.array([s['close_to_signal_ms'] for s in samples])
+            rows.append({
+                'symbol': symbol, 'timeframe': timeframe, 'ticks': len(samples),
+                'fetch_ms_mean': float(np.mean([s['fetch_ms'] for s in samples])),
+                'fetch_to_signal_ms_mean': float(fetch_to_signal.mean()),
+                'fetch_to_signal_ms_p95': float(np.percentile(fetch_to_signal, 95)),
+                'fetch_to_signal_ms_max': float(fetch_to_signal.max()),
+                'close_to_signal_ms_max': float(close_to_signal.max()),
+            })
+        return pd.DataFrame(rows).set_index(['symbol', 'timeframe']) if rows else pd.DataFrame()
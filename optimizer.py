@@ -0,0 +1,193 @@
+# optimizer.py
+import itertools
+import json
+import logging
+import multiprocessing as mp
+import os
+import random
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtester import evaluate_strategy
+
+logger = logging.getLogger(__name__)
+
+# Per-worker state set up by _init_worker().
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+def grid_space(param_ranges: Dict[str, list]) -> List[dict]:
+    """
+    Expand {param: [values, ...]} into every combination.
+    """
+    names = list(param_ranges)
+    return [dict(zip(names, values)) for values in itertools.product(*(param_ranges[name] for name in names))]
+
+
+def random_space(param_ranges: Dict[str, Any], n_samples: int, seed: Optional[int] = None) -> List[dict]:
+    """
+    Draw n_samples random combinations.
+
+    A list of values is sampled uniformly; a (low, high) tuple is sampled as a
+    uniform int when both bounds are ints, otherwise as a uniform float.
+    """
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(n_samples):
+        params = {}
+        for name, spec in param_ranges.items():
+            if isinstance(spec, tuple):
+                low, high = spec
+                if isinstance(low, int) and isinstance(high, int):
+                    params[name] = rng.randint(low, high)
+                else:
+                    params[name] = rng.uniform(low, high)
+            else:
+                params[name] = rng.choice(list(spec))
+        samples.append(params)
+    return samples
+
+
+def params_key(params: dict) -> str:
+    """
+    Stable string key for a parameter combination (used for checkpoints).
+    """
+    return json.dumps(params, sort_keys=True, default=float)
+
+
+class SharedOHLCV:
+    """
+    Places an OHLCV DataFrame in shared memory so worker processes can rebuild
+    it without a pickled copy per task.
+    """
+    def __init__(self, data: pd.DataFrame) -> None:
+        values = np.ascontiguousarray(data.to_numpy(dtype=np.float64))
+        index = np.ascontiguousarray(data.index.values)
+        self._values_shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        self._index_shm = shared_memory.SharedMemory(create=True, size=max(index.nbytes, 1))
+        np.ndarray(values.shape, dtype=values.dtype, buffer=self._values_shm.buf)[...] = values
+        np.ndarray(index.shape, dtype=index.dtype, buffer=self._index_shm.buf)[...] = index
+        self.spec = {
+            'values_name': self._values_shm.name,
+            'index_name': self._index_shm.name,
+            'shape': values.shape,
+            'index_dtype': index.dtype.str,
+            'columns': list(data.columns),
+        }
+
+    @staticmethod
+    def attach(spec: dict):
+        """
+        Attach to shared blocks described by `spec`. Returns (DataFrame, handles);
+        the handles must stay referenced while the frame is in use.
+        """
+        values_shm = shared_memory.SharedMemory(name=spec['values_name'])
+        index_shm = shared_memory.SharedMemory(name=spec['index_name'])
+        values = np.ndarray(spec['shape'], dtype=np.float64, buffer=values_shm.buf)
+        index = np.ndarray((spec['shape'][0],), dtype=np.dtype(spec['index_dtype']), buffer=index_shm.buf)
+        df = pd.DataFrame(values, index=pd.Index(index, name='Timestamp'), columns=spec['columns'], copy=False)
+        return df, (values_shm, index_shm)
+
+    def close(self) -> None:
+        for shm in (self._values_shm, self._index_shm):
+            shm.close()
+            shm.unlink()
+
+
+def _init_worker(spec: dict, strategy_class, base_params: dict, backtest_kwargs: dict) -> None:
+    data, handles = SharedOHLCV.attach(spec)
+    _WORKER_STATE.update(data=data, handles=handles, strategy_class=strategy_class,
+                         base_params=base_params, backtest_kwargs=backtest_kwargs)
+
+
+def _evaluate(params: dict) -> tuple:
+    state = _WORKER_STATE
+    performance = evaluate_strategy(state['strategy_class'], state['data'],
+                                    {**state['base_params'], **params}, **state['backtest_kwargs'])
+    return params, performance
+
+
+def _load_checkpoint(path: str) -> Dict[str, dict]:
+    done = {}
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    done[params_key(row['params'])] = row
+    return done
+
+
+def optimize(strategy_class, data: pd.DataFrame, param_ranges: Dict[str, Any], method: str = 'grid',
+             n_samples: int = 100, base_params: Optional[dict] = None, metric: str = 'sharpe_ratio',
+             n_workers: Optional[int] = None, checkpoint_path: Optional[str] = None,
+             progress: Optional[Callable[[int, int], None]] = None, seed: Optional[int] = None,
+             initial_capital: float = 10000.0, fee_rate: float = 0.001,
+             slippage_rate: float = 0.001) -> pd.DataFrame:
+    """
+    Run a grid or random parameter sweep of strategy_class over data.
+
+    Combinations run on a process pool that reads the OHLCV data from shared
+    memory. Each finished combination is appended to checkpoint_path (JSON
+    lines) when given, and combinations already in that file are skipped, so an
+    interrupted sweep resumes where it stopped. Returns one row per combination
+    with its parameters and run_backtest() metrics, ranked by `metric`.
+    """
+    if method == 'grid':
+        combos = grid_space(param_ranges)
+    elif method == 'random':
+        combos = random_space(param_ranges, n_samples, seed)
+    else:
+        raise ValueError(f"Unknown search method: {method}")
+    base_params = dict(base_params or {})
+    backtest_kwargs = {'initial_capital': initial_capital, 'fee_rate': fee_rate, 'slippage_rate': slippage_rate}
+
+    done = _load_checkpoint(checkpoint_path)
+    pending = [params for params in combos if params_key(params) not in done]
+    total = len(combos)
+    completed = total - len(pending)
+    logger.info("Sweeping %d combinations (%d from checkpoint).", total, completed)
+
+    rows = list(done.values())
+    checkpoint = open(checkpoint_path, 'a') if checkpoint_path else None
+
+    def record(params, performance):
+        nonlocal completed
+        row = {'params': params, 'performance': performance}
+        rows.append(row)
+        if checkpoint:
+            checkpoint.write(json.dumps(row, default=float) + "\n")
+            checkpoint.flush()
+        completed += 1
+        if progress:
+            progress(completed, total)
+        elif completed % max(1, total // 20) == 0:
+            logger.info("Sweep progress: %d/%d", completed, total)
+
+    n_workers = n_workers or os.cpu_count() or 1
+    try:
+        if n_workers == 1 or len(pending) <= 1:
+            for params in pending:
+                performance = evaluate_strategy(strategy_class, data, {**base_params, **params}, **backtest_kwargs)
+                record(params, performance)
+        elif pending:
+            shared = SharedOHLCV(data)
+            try:
+                with mp.Pool(n_workers, initializer=_init_worker,
+                             initargs=(shared.spec, strategy_class, base_params, backtest_kwargs)) as pool:
+                    chunksize = max(1, len(pending) // (n_workers * 16))
+                    for params, performance in pool.imap_unordered(_evaluate, pending, chunksize=chunksize):
+                        record(params, performance)
+            finally:
+                shared.close()
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    results = pd.DataFrame([{**row['params'], **row['performance']} for row in rows])
+    if metric in results.columns:
+        results = results.sort_values(metric, ascending=False, na_position='last').reset_index(drop=True)
+    return results
@@ -1,18 +1,60 @@
 # plot_utils.py
+import numpy as np
+import pandas as pd
 import plotly.graph_objs as go
 
-def create_candlestick_figure(df, title="Candlestick Chart"):
+from profiling import timed
+from trade_log import TradeLog
+
+# Target number of candles drawn for the visible range; larger sets are re-aggregated.
+DEFAULT_MAX_BARS = 2000
+
+def resample_ohlc(df, max_bars=DEFAULT_MAX_BARS, x_range=None):
+    """
+    Aggregate consecutive candles so at most max_bars remain (first open,
+    max high, min low, last close), optionally restricted to x_range.
+    Returns the candle frame and the number of source bars per candle.
+    """
+    if x_range is not None:
+        start, stop = df.index.searchsorted([pd.Timestamp(x_range[0]), pd.Timestamp(x_range[1])])
+        df = df.iloc[max(start - 1, 0):stop + 1]
+    n = len(df)
+    if not max_bars or n <= max_bars:
+        return df, 1
+    step = -(-n // max_bars)
+    starts = np.arange(0, n, step)
+    ends = np.minimum(starts + step, n) - 1
+    candles = pd.DataFrame({
+        'Open': df['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(df['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(df['Low'].to_numpy(), starts),
+        'Close': df['Close'].to_numpy()[ends],
+    }, index=df.index[starts])
+    return candles, step
+
+def candlestick_trace(df, max_bars=DEFAULT_MAX_BARS, x_range=None):
+    """
+    Candlestick trace for df at a level of detail suited to the visible range.
+    """
+    candles, step = resample_ohlc(df, max_bars, x_range)
+    return go.Candlestick(
+        x=candles.index,
+        open=candles['Open'],
+        high=candles['High'],
+        low=candles['Low'],
+        close=candles['Close'],
+        name="Price Data" if step == 1 else f"Price Data ({step} bars/candle)"
+    )
+
+@timed('create_candlestick_figure')
+def create_candlestick_figure(df, title="Candlestick Chart", max_bars=DEFAULT_MAX_BARS):
     """
     Create and return a Plotly candlestick chart with dark-themed layout.
+
+    Long series are drawn at reduced detail (see resample_ohlc); pass
+    max_bars=None to draw every bar.
     """
-    fig = go.Figure(data=[go.Candlestick(
-        x=df.index,
-        open=df['Open'],
-        high=df['High'],
-        low=df['Low'],
-        close=df['Close'],
-        name="Price Data"
-    )])
+    fig = go.Figure(data=[candlestick_trace(df, max_bars)])
     fig.update_layout(
         title=title,
         xaxis_title="Date",
@@ -20,63 +62,70 @@ def create_candlestick_figure(df, title="Candlestick Chart"):
         xaxis_rangeslider_visible=False,
         paper_bgcolor="#2c2f33",
         plot_bgcolor="#2c2f33",
-        font=dict(color="white")
+        font=dict(color="white"),
+        uirevision=title
     )
     return fig
 
+def relayout_x_range(relayout_data):
+    """
+    Extract the zoomed x-range from Plotly relayoutData; None means full range.
+    """
+    if not relayout_data or relayout_data.get('xaxis.autorange'):
+        return None
+    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+        return relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    if 'xaxis.range' in relayout_data:
+        return tuple(relayout_data['xaxis.range'][:2])
+    return None
+
+def update_visible_range(fig, df, relayout_data, max_bars=DEFAULT_MAX_BARS):
+    """
+    Re-aggregate the candlestick trace of fig for the range the user zoomed to,
+    leaving the other traces (trade markers) untouched. The zoom itself is
+    kept by the figure's uirevision.
+    """
+    x_range = relayout_x_range(relayout_data)
+    fig = go.Figure(fig)
+    trace = candlestick_trace(df, max_bars, x_range)
+    for k, existing in enumerate(fig.data):
+        if existing.type == 'candlestick':
+            fig.data[k].update(x=trace.x, open=trace.open, high=trace.high, low=trace.low,
+                               close=trace.close, name=trace.name)
+            break
+    return fig
+
+@timed('add_trade_markers', rows=lambda result, fig, trades, *args, **kwargs: len(trades))
 def add_trade_markers(fig, trades, data):
     """
     Overlay trade markers on the given chart using contrasting colors.
+
+    trades may be a TradeLog, a trade-results DataFrame or a list of trade dicts.
     """
-    long_entry_x, long_entry_y = [], []
-    long_exit_x, long_exit_y = [], []
-    short_entry_x, short_entry_y = [], []
-    short_exit_x, short_exit_y = [], []
-    
-    for trade in trades:
-        trade_type = trade.get('trade_type')
-        if trade_type == 'long':
-            long_entry_x.append(trade.get('entry_time'))
-            long_entry_y.append(trade.get('entry_price'))
-            long_exit_x.append(trade.get('exit_time'))
-            long_exit_y.append(trade.get('exit_price'))
-        elif trade_type == 'short':
-            short_entry_x.append(trade.get('entry_time'))
-            short_entry_y.append(trade.get('entry_price'))
-            short_exit_x.append(trade.get('exit_time'))
-            short_exit_y.append(trade.get('exit_price'))
-    
-    if long_entry_x:
-        fig.add_trace(go.Scatter(
-            x=long_entry_x,
-            y=long_entry_y,
-            mode='markers',
-            marker=dict(color='cyan', symbol='triangle-up', size=12),
-            name='Long Entry'
-        ))
-    if long_exit_x:
-        fig.add_trace(go.Scatter(
-            x=long_exit_x,
-            y=long_exit_y,
-            mode='markers',
-            marker=dict(color='magenta', symbol='triangle-down', size=12),
-            name='Long Exit'
-        ))
-    if short_entry_x:
-        fig.add_trace(go.Scatter(
-            x=short_entry_x,
-            y=short_entry_y,
-            mode='markers',
-            marker=dict(color='orange', symbol='square', size=12),
-            name='Short Entry'
-        ))
-    if short_exit_x:
-        fig.add_trace(go.Scatter(
-            x=short_exit_x,
-            y=short_exit_y,
-            mode='markers',
-            marker=dict(color='dodgerblue', symbol='diamond', size=12),
-            name='Short Exit'
-        ))
-    
+    if isinstance(trades, pd.DataFrame):
+        trade_df = trades
+    else:
+        trade_df = TradeLog.from_records(trades).to_frame()
+    if trade_df.empty:
+        return fig
+
+    is_long = (trade_df['trade_type'] == 'long').to_numpy()
+    is_short = (trade_df['trade_type'] == 'short').to_numpy()
+    markers = [
+        (is_long, 'entry', dict(color='cyan', symbol='triangle-up', size=12), 'Long Entry'),
+        (is_long, 'exit', dict(color='magenta', symbol='triangle-down', size=12), 'Long Exit'),
+        (is_short, 'entry', dict(color='orange', symbol='square', size=12), 'Short Entry'),
+        (is_short, 'exit', dict(color='dodgerblue', symbol='diamond', size=12), 'Short Exit'),
+    ]
+    for mask, leg, marker, name in markers:
+        if mask.any():
+            # WebGL markers stay responsive with many thousands of trades.
+            fig.add_trace(go.Scattergl(
+                x=trade_df[f'{leg}_time'].to_numpy()[mask],
+                y=trade_df[f'{leg}_price'].to_numpy()[mask],
+                mode='markers',
+                marker=marker,
+                name=name
+            ))
+
     return fig
@@ -0,0 +1,183 @@
+# portfolio.py
+import logging
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from backtester import compute_accounting
+from equity import mark_to_market, time_based_metrics
+from trade_log import SIDE_LONG, TradeLog
+
+logger = logging.getLogger(__name__)
+
+# Event kinds, in processing order for events sharing a timestamp: exits free
+# capital before new entries are sized, and a trade that exits on its own
+# entry bar is closed after it is opened.
+_EXIT = 0
+_ENTRY = 1
+_SAME_BAR_EXIT = 2
+
+
+def _symbol_logs(strategy_class, datasets: Union[Mapping[str, pd.DataFrame], Iterable[Tuple[str, pd.DataFrame]]],
+                 strategy_params: dict, symbol_params: Optional[Dict[str, dict]]):
+    """
+    Run the strategy per symbol, keeping only the trade logs and the bar
+    times and closes (for marking open positions) so each frame can be
+    released as soon as it has been processed.
+    """
+    items = datasets.items() if isinstance(datasets, Mapping) else datasets
+    for symbol, data in items:
+        params = {**strategy_params, **(symbol_params or {}).get(symbol, {})}
+        strategy_instance = strategy_class(data, **params)
+        strategy_instance.run()
+        bar_times = data.index.values.astype('datetime64[ns]').view(np.int64)
+        yield symbol, TradeLog.from_records(strategy_instance.trades), (bar_times, _column(data, 'Close'))
+
+
+def _column(data: pd.DataFrame, name: str) -> np.ndarray:
+    return data[name].to_numpy(dtype=np.float64)
+
+
+def _bar_positions(bar_times: np.ndarray, times: np.ndarray) -> np.ndarray:
+    return np.clip(np.searchsorted(bar_times, times), 0, len(bar_times) - 1)
+
+
+def run_portfolio_backtest(strategy_class, datasets, strategy_params: Optional[dict] = None,
+                           symbol_params: Optional[Dict[str, dict]] = None, initial_capital: float = 10000.0,
+                           max_position_fraction: float = 0.1, max_positions: Optional[int] = None,
+                           fee_rate: float = 0.001,
+                           slippage_rate: float = 0.001) -> Tuple[Dict[str, Any], pd.DataFrame, pd.Series]:
+    """
+    Backtest one strategy over many symbols sharing a single capital pool.
+
+    datasets maps symbol -> OHLCV DataFrame (or yields (symbol, DataFrame)
+    pairs, so frames can be loaded lazily). Per-symbol trade logs are merged
+    into one event timeline. Each entry is sized at max_position_fraction of
+    current equity, capped by free cash; entries are skipped when cash runs
+    out or max_positions are already open.
+
+    Returns (performance, trade_df, equity) where equity is the
+    mark-to-market portfolio value at every bar of the merged timeline of all
+    symbols' bars: open positions are valued at each symbol's latest close,
+    as compute_equity_curve() does for one symbol. The drawdown and the
+    time-based metrics are computed from this curve.
+    """
+    symbols, logs, bars = [], [], []
+    for symbol, log, symbol_bars in _symbol_logs(strategy_class, datasets, strategy_params or {}, symbol_params):
+        symbols.append(symbol)
+        logs.append(log)
+        bars.append(symbol_bars)
+    n_trades = sum(len(log) for log in logs)
+    if n_trades == 0:
+        logger.warning("No trades executed by the strategy on any symbol.")
+        return {}, pd.DataFrame(), pd.Series(dtype=np.float64)
+
+    # Columnar view of every candidate trade across symbols.
+    symbol_id = np.concatenate([np.full(len(log), k, dtype=np.int32) for k, log in enumerate(logs)])
+    side = np.concatenate([log.side for log in logs])
+    entry_time = np.concatenate([log.entry_time.view(log.time_dtype).astype('datetime64[ns]') for log in logs])
+    exit_time = np.concatenate([log.exit_time.view(log.time_dtype).astype('datetime64[ns]') for log in logs])
+    entry_price = np.concatenate([log.entry_price for log in logs])
+    exit_price = np.concatenate([log.exit_price for log in logs])
+
+    # Per-unit accounting is vectorized; only capital allocation is sequential.
+    unit = compute_accounting(side, entry_price, exit_price, 0.0, fee_rate, slippage_rate)
+    unit_return = unit['return_pct']
+
+    # Merge the per-symbol streams into one timeline by sorting on (time, kind, symbol).
+    trade_ids = np.arange(n_trades)
+    exit_kind = np.where(exit_time == entry_time, _SAME_BAR_EXIT, _EXIT)
+    event_time = np.concatenate([entry_time, exit_time]).view(np.int64)
+    event_kind = np.concatenate([np.full(n_trades, _ENTRY), exit_kind])
+    event_trade = np.concatenate([trade_ids, trade_ids])
+    order = np.lexsort((symbol_id[event_trade], event_kind, event_time))
+
+    cash = float(initial_capital)
+    committed = 0.0
+    open_count = 0
+    notional = np.zeros(n_trades)
+    taken = np.zeros(n_trades, dtype=bool)
+    for trade, kind in zip(event_trade[order].tolist(), event_kind[order].tolist()):
+        if kind == _ENTRY:
+            equity = cash + committed
+            size = min(max_position_fraction * equity, cash)
+            if size > 0 and (max_positions is None or open_count < max_positions):
+                notional[trade] = size
+                taken[trade] = True
+                cash -= size
+                committed += size
+                open_count += 1
+        elif taken[trade]:
+            size = notional[trade]
+            cash += size * (1 + unit_return[trade])
+            committed -= size
+            open_count -= 1
+
+    curve = _portfolio_curve(bars, symbol_id, taken, side, entry_time, exit_time, notional,
+                             unit['effective_entry'], notional * unit_return, initial_capital)
+    equity = curve['equity'].rename('equity')
+    quantity = np.where(taken, notional / unit['effective_entry'], 0.0)
+    net_profit = notional * unit_return
+    trade_df = pd.DataFrame({
+        'symbol': np.asarray(symbols, dtype=object)[symbol_id],
+        'trade_type': np.where(side == SIDE_LONG, 'long', 'short').astype(object),
+        'entry_time': entry_time,
+        'exit_time': exit_time,
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'quantity': quantity,
+        'notional': notional,
+        'fee': quantity * unit['fee'],
+        'net_profit': net_profit,
+        'return_pct': unit_return,
+    })[taken].sort_values(['entry_time', 'symbol'], kind='stable').reset_index(drop=True)
+
+    equity_values = np.concatenate([[initial_capital], curve['equity'].to_numpy()])
+    running_max = np.maximum.accumulate(equity_values)
+    drawdown = (equity_values - running_max) / running_max
+    returns = trade_df['return_pct']
+    final_capital = cash + committed
+    performance = {
+        'symbols': len(symbols),
+        'total_trades': len(trade_df),
+        'skipped_trades': int(n_trades - taken.sum()),
+        'win_rate': (trade_df['net_profit'] > 0).mean() if len(trade_df) else 0,
+        'total_net_profit': final_capital - initial_capital,
+        'max_drawdown': drawdown.min(),
+        'sharpe_ratio': returns.mean() / returns.std() * np.sqrt(len(returns)) if returns.std() > 0 else 0,
+        'final_capital': final_capital,
+        **time_based_metrics(curve),
+    }
+    logger.info("Portfolio Backtesting Performance: %s", performance)
+    return performance, trade_df, equity
+
+
+def _portfolio_curve(bars, symbol_id: np.ndarray, taken: np.ndarray, side: np.ndarray, entry_time: np.ndarray,
+                     exit_time: np.ndarray, notional: np.ndarray, effective_entry: np.ndarray,
+                     net_profit: np.ndarray, initial_capital: float) -> pd.DataFrame:
+    """
+    Per-bar portfolio equity and open trade count on the union of every
+    symbol's bar times. Each symbol's curve is built on its own bars with
+    mark_to_market() and forward-filled onto the merged timeline, so no
+    joined frame of all symbols is ever built.
+    """
+    timeline = np.unique(np.concatenate([bar_times for bar_times, _ in bars]))
+    equity = np.full(len(timeline), float(initial_capital))
+    open_trades = np.zeros(len(timeline), dtype=np.int64)
+    # Trades are grouped by symbol in symbol order.
+    bounds = np.searchsorted(symbol_id, np.arange(len(bars) + 1))
+    for k, (bar_times, close) in enumerate(bars):
+        trades = np.arange(bounds[k], bounds[k + 1])[taken[bounds[k]:bounds[k + 1]]]
+        if not len(trades):
+            continue
+        units = side[trades] * notional[trades] / effective_entry[trades]
+        symbol_curve = mark_to_market(close, _bar_positions(bar_times, entry_time[trades].view(np.int64)),
+                                      _bar_positions(bar_times, exit_time[trades].view(np.int64)), units,
+                                      effective_entry[trades], net_profit[trades])
+        # Latest bar of this symbol at or before each timeline point.
+        latest = np.searchsorted(bar_times, timeline, side='right') - 1
+        seen = latest >= 0
+        equity[seen] += symbol_curve['equity'][latest[seen]]
+        open_trades[seen] += symbol_curve['open_trades'][latest[seen]]
+    return pd.DataFrame({'equity': equity, 'open_trades': open_trades}, index=pd.to_datetime(timeline))
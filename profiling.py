@@ -0,0 +1,168 @@
+# profiling.py
+import contextlib
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def count_rows(result: Any, *args, **kwargs) -> Optional[int]:
+    """
+    Row count of a stage result: len() of frames, trade logs and lists, the
+    last element of a (performance, frame) style tuple, or the points drawn
+    in a plotly figure.
+    """
+    if isinstance(result, tuple) and result:
+        result = result[-1]
+    if hasattr(result, 'data') and hasattr(result, 'layout'):  # plotly figure
+        return sum(len(trace.x) for trace in result.data if getattr(trace, 'x', None) is not None)
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+class Profiler:
+    """
+    Per-stage wall time, call counts and row counts, with an optional
+    cProfile capture of the outermost stage of each call tree.
+
+    While disabled, instrumented functions cost one attribute check per call.
+    """
+    def __init__(self, enabled: bool = False, cprofile: bool = False, top_n: int = 25) -> None:
+        self.enabled = enabled
+        self.cprofile = cprofile
+        self.top_n = top_n
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._profiles: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self, cprofile: bool = False) -> None:
+        self.enabled = True
+        self.cprofile = cprofile
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._profiles.clear()
+
+    def _entry(self, name: str) -> Dict[str, Any]:
+        # Callers hold self._lock.
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = {'calls': 0, 'total_s': 0.0, 'max_s': 0.0, 'rows': 0, 'last_s': 0.0}
+        return stats
+
+    def record(self, name: str, seconds: float, rows: Optional[int] = None) -> None:
+        with self._lock:
+            stats = self._entry(name)
+            stats['calls'] += 1
+            stats['total_s'] += seconds
+            stats['last_s'] = seconds
+            stats['max_s'] = max(stats['max_s'], seconds)
+            if rows is not None:
+                stats['rows'] += rows
+
+    def merge(self, report: Dict[str, Any]) -> None:
+        """
+        Add the stage stats and call profiles of another profiler's report(),
+        e.g. one returned by a worker process, to this profiler.
+        """
+        with self._lock:
+            for incoming in report.get('stages', []):
+                stats = self._entry(incoming['stage'])
+                stats['calls'] += incoming['calls']
+                stats['total_s'] += incoming['total_s']
+                stats['last_s'] = incoming['last_s']
+                stats['max_s'] = max(stats['max_s'], incoming['max_s'])
+                stats['rows'] += incoming['rows'] or 0
+            self._profiles.update(report.get('profiles', {}))
+
+    @contextlib.contextmanager
+    def _measure(self, name: str):
+        # Only the outermost stage of a thread is cProfiled: profilers cannot nest.
+        depth = getattr(self._local, 'depth', 0)
+        profile = cProfile.Profile() if self.cprofile and depth == 0 else None
+        span = {'rows': None}
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield span
+        finally:
+            if profile is not None:
+                profile.disable()
+            elapsed = time.perf_counter() - start
+            self._local.depth = depth
+            self.record(name, elapsed, span['rows'])
+            if profile is not None:
+                out = io.StringIO()
+                pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(self.top_n)
+                with self._lock:
+                    self._profiles[name] = out.getvalue()
+
+    def stage(self, name: str):
+        """
+        Context manager timing a block; set span['rows'] on the yielded dict
+        to record a row count (ignored while profiling is disabled).
+        """
+        if not self.enabled:
+            return contextlib.nullcontext({'rows': None})
+        return self._measure(name)
+
+    def timed(self, name: Optional[str] = None, rows: Optional[Callable[..., Optional[int]]] = count_rows):
+        """
+        Decorator timing every call of the wrapped function as stage `name`
+        (its qualified name by default); rows(result, *args, **kwargs) gives
+        the row count, or pass rows=None to skip it.
+        """
+        def decorator(func):
+            stage_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self._measure(stage_name) as span:
+                    result = func(*args, **kwargs)
+                    if rows is not None:
+                        span['rows'] = rows(result, *args, **kwargs)
+                    return result
+            return wrapper
+        return decorator
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Structured snapshot: per-stage stats (slowest total first) and captured cProfile output.
+        """
+        with self._lock:
+            stages = [{'stage': name, **stats, 'mean_s': stats['total_s'] / stats['calls']}
+                      for name, stats in self._stats.items()]
+            profiles = dict(self._profiles)
+        stages.sort(key=lambda stats: stats['total_s'], reverse=True)
+        return {'enabled': self.enabled, 'cprofile': self.cprofile, 'stages': stages, 'profiles': profiles}
+
+    def report_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.report()['stages'],
+                            columns=['stage', 'calls', 'total_s', 'mean_s', 'max_s', 'last_s', 'rows'])
+
+
+# Process-wide profiler; BACKTEST_PROFILE=1 enables timing, =cprofile also captures call profiles.
+_mode = os.getenv("BACKTEST_PROFILE", "").lower()
+profiler = Profiler(enabled=_mode in ("1", "true", "cprofile"), cprofile=_mode == "cprofile")
+stage = profiler.stage
+timed = profiler.timed
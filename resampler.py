@@ -0,0 +1,217 @@
+# resampler.py
+import logging
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_store import CANDLE_DTYPE, OHLCV_COLUMNS, CandleStore, records_to_frame, timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+# Exchange weekly candles open on Monday; the Unix epoch was a Thursday.
+_WEEK_ORIGIN_MS = 4 * 24 * 60 * 60 * 1000
+
+
+def bucket_start(timestamps: np.ndarray, timeframe: str) -> np.ndarray:
+    """
+    Open time (ms) of the `timeframe` candle containing each timestamp.
+    Weeks start on Monday and months on the first calendar day (UTC).
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    unit, count = timeframe[-1], int(timeframe[:-1])
+    if unit == 'M':
+        months = timestamps.astype('datetime64[ms]').astype('datetime64[M]').astype(np.int64)
+        months -= months % count
+        return months.astype('datetime64[M]').astype('datetime64[ms]').astype(np.int64)
+    tf_ms = timeframe_to_ms(timeframe)
+    origin = _WEEK_ORIGIN_MS if unit == 'w' else 0
+    return (timestamps - origin) // tf_ms * tf_ms + origin
+
+
+def bucket_end(starts: np.ndarray, timeframe: str) -> np.ndarray:
+    """
+    Close time (ms, exclusive) of the candles opening at `starts`.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    if timeframe[-1] == 'M':
+        months = starts.astype('datetime64[ms]').astype('datetime64[M]') + int(timeframe[:-1])
+        return months.astype('datetime64[ms]').astype(np.int64)
+    return starts + timeframe_to_ms(timeframe)
+
+
+def resample_records(records: np.ndarray, timeframe: str) -> np.ndarray:
+    """
+    Aggregate sorted, deduplicated candles into `timeframe` candles: first
+    Open, max High, min Low, last Close and summed Volume per bucket.
+    Buckets without any source candle are not emitted.
+    """
+    out = np.empty(0, dtype=CANDLE_DTYPE)
+    if len(records) == 0:
+        return out
+    buckets = bucket_start(records['Timestamp'], timeframe)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(records)] - 1
+    out = np.empty(len(starts), dtype=CANDLE_DTYPE)
+    out['Timestamp'] = buckets[starts]
+    out['Open'] = records['Open'][starts]
+    out['High'] = np.maximum.reduceat(records['High'], starts)
+    out['Low'] = np.minimum.reduceat(records['Low'], starts)
+    out['Close'] = records['Close'][ends]
+    out['Volume'] = np.add.reduceat(records['Volume'], starts)
+    return out
+
+
+def resample_frame(df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """
+    resample_records() for an OHLCV DataFrame with a DatetimeIndex.
+    """
+    records = np.empty(len(df), dtype=CANDLE_DTYPE)
+    records['Timestamp'] = df.index.values.astype('datetime64[ms]').astype(np.int64)
+    for col in OHLCV_COLUMNS:
+        records[col] = df[col].to_numpy(dtype=np.float64) if col in df else np.nan
+    return records_to_frame(resample_records(records, timeframe))
+
+
+def align_positions(lower_index: pd.DatetimeIndex, lower_timeframe: str, higher_index: pd.DatetimeIndex,
+                    higher_timeframe: str) -> np.ndarray:
+    """
+    For every lower-timeframe bar, the position of the latest higher-timeframe
+    bar that had closed by the time that lower bar closed (-1 if none), so
+    higher-timeframe values can be used without lookahead.
+    """
+    lower_close = bucket_end(lower_index.values.astype('datetime64[ms]').astype(np.int64), lower_timeframe)
+    higher_close = bucket_end(higher_index.values.astype('datetime64[ms]').astype(np.int64), higher_timeframe)
+    return np.searchsorted(higher_close, lower_close, side='right') - 1
+
+
+def multi_timeframe_view(data: pd.DataFrame, timeframe: str, higher: Dict[str, pd.DataFrame],
+                         columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    data with the columns of each higher-timeframe frame in `higher`
+    ({timeframe: frame}) appended as '<column>_<timeframe>', aligned to the
+    last closed higher bar. Frames of features computed on the higher
+    timeframe (e.g. a 1h rolling range) can be aligned the same way.
+    """
+    view = {}
+    for higher_timeframe, frame in higher.items():
+        positions = align_positions(data.index, timeframe, frame.index, higher_timeframe)
+        valid = positions >= 0
+        for col in (columns or frame.columns):
+            if col not in frame:
+                continue
+            values = frame[col].to_numpy(dtype=np.float64)
+            view[f"{col}_{higher_timeframe}"] = np.where(valid, values[np.maximum(positions, 0)], np.nan)
+    return data.assign(**view) if view else data
+
+
+class Resampler:
+    """
+    Builds higher-timeframe candles from the base (1m) candles in a
+    CandleStore, so any timeframe is served without further exchange calls.
+
+    Derived candles are cached per (symbol, timeframe) in memory (and in
+    cache_store when given). When base partitions change, derived candles
+    are rebuilt from the earliest changed month on: for new bars that is
+    just the last, possibly incomplete, candle onwards, while bars
+    backfilled into a hole also refresh the candles covering it. A series
+    reloaded from cache_store is assumed to have only gained bars at its
+    end since it was saved.
+    """
+    def __init__(self, store: CandleStore, base_timeframe: str = '1m',
+                 cache_store: Optional[CandleStore] = None) -> None:
+        self.store = store
+        self.base_timeframe = base_timeframe
+        self.cache_store = cache_store
+        self._derived: Dict[Tuple[str, str], np.ndarray] = {}
+        # Base partition versions (CandleStore.partition_versions) each derived series was built from.
+        self._built_from: Dict[Tuple[str, str], dict] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, symbol: Optional[str] = None, timeframe: Optional[str] = None) -> None:
+        with self._lock:
+            for key in list(self._derived):
+                if (symbol is None or key[0] == symbol) and (timeframe is None or key[1] == timeframe):
+                    del self._derived[key]
+                    self._built_from.pop(key, None)
+
+    def _refresh(self, symbol: str, timeframe: str) -> np.ndarray:
+        key = (symbol, timeframe)
+        versions = self.store.partition_versions(symbol, self.base_timeframe)
+        if not versions:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        derived = self._derived.get(key)
+        built_from = self._built_from.get(key)
+        if derived is not None and built_from == versions:
+            return derived
+        if derived is None and self.cache_store is not None:
+            derived = self.cache_store.read_records(symbol, timeframe)
+            built_from = None
+        base_first = self.store.first_timestamp(symbol, self.base_timeframe)
+        # Bars backfilled before the cached range invalidate the whole series.
+        if derived is not None and (not len(derived)
+                                    or derived['Timestamp'][0] != bucket_start([base_first], timeframe)[0]):
+            derived = None
+
+        if derived is None:
+            start = None
+        elif built_from is None:
+            # Reloaded from cache_store: rebuild from the last derived candle, which may have been incomplete.
+            start = int(derived['Timestamp'][-1])
+        else:
+            changed = [month for month in versions.keys() | built_from.keys()
+                       if versions.get(month) != built_from.get(month)]
+            month_start = np.datetime64(min(changed), 'M').astype('datetime64[ms]').astype(np.int64)
+            # Rebuild from the derived candle holding the first bar of the earliest changed month.
+            start = min(int(bucket_start([month_start], timeframe)[0]), int(derived['Timestamp'][-1]))
+        kept = np.empty(0, dtype=CANDLE_DTYPE) if start is None else derived[derived['Timestamp'] < start]
+        fresh = resample_records(self.store.read_records(symbol, self.base_timeframe, start), timeframe)
+        derived = np.concatenate([kept, fresh])
+        if self.cache_store is not None and len(fresh):
+            self.cache_store.write(symbol, timeframe, fresh)
+        logger.info("Resampled %d %s %s candles from %s bars.", len(fresh), symbol, timeframe,
+                    self.base_timeframe)
+        self._derived[key] = derived
+        self._built_from[key] = versions
+        return derived
+
+    def read_records(self, symbol: str, timeframe: str, start_ms: Optional[int] = None,
+                     end_ms: Optional[int] = None) -> np.ndarray:
+        """
+        Candles of `timeframe` opening in [start_ms, end_ms]; the last candle
+        is still forming when its base bars are incomplete.
+        """
+        if timeframe == self.base_timeframe:
+            return self.store.read_records(symbol, timeframe, start_ms, end_ms)
+        with self._lock:
+            derived = self._refresh(symbol, timeframe)
+        ts = derived['Timestamp']
+        lo = 0 if start_ms is None else np.searchsorted(ts, start_ms, side='left')
+        hi = len(ts) if end_ms is None else np.searchsorted(ts, end_ms, side='right')
+        return derived[lo:hi]
+
+    def read(self, symbol: str, timeframe: str, start_ms: Optional[int] = None,
+             end_ms: Optional[int] = None) -> pd.DataFrame:
+        return records_to_frame(self.read_records(symbol, timeframe, start_ms, end_ms))
+
+    @staticmethod
+    def _previous_bucket(start_ms: Optional[int], timeframe: str) -> Optional[int]:
+        # The higher candle closed just before start_ms, so the first lower bars are aligned too.
+        if start_ms is None:
+            return None
+        current = bucket_start([start_ms], timeframe)[0]
+        return int(bucket_start([current - 1], timeframe)[0])
+
+    def multi_timeframe(self, symbol: str, timeframe: str, higher_timeframes: Sequence[str],
+                        start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+                        columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        `timeframe` candles for [start_ms, end_ms] with aligned columns from
+        each higher timeframe, e.g. multi_timeframe('BTC/USDT', '5m', ['1h']).
+        """
+        data = self.read(symbol, timeframe, start_ms, end_ms)
+        if data.empty:
+            return data
+        higher = {tf: self.read(symbol, tf, self._previous_bucket(start_ms, tf), end_ms) for tf in higher_timeframes}
+        return multi_timeframe_view(data, timeframe, higher, columns)
@@ -0,0 +1,176 @@
+# result_cache.py
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtester import backtest_strategy
+from feature_cache import dataset_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Bump when cached results change for reasons the code fingerprint cannot see
+# (e.g. a dependency upgrade or a change in a module not hashed below).
+CACHE_VERSION = 1
+
+# Modules every backtest result depends on besides the strategy's own module.
+_ENGINE_MODULES = ('backtester', 'exits', 'feature_cache', 'trade_log')
+
+
+class UncacheableBacktest(ValueError):
+    """
+    Raised by backtest_key() for parameters that cannot be keyed reliably.
+    """
+
+
+@functools.lru_cache(maxsize=None)
+def code_fingerprint(strategy_class) -> str:
+    """
+    Hash of the source of the modules defining the strategy class and its
+    bases, and of the backtesting engine, so results cached on disk are not
+    served after the strategy or backtest logic changes.
+    """
+    modules = {cls.__module__ for cls in strategy_class.__mro__ if cls.__module__ not in ('builtins', 'abc')}
+    digest = hashlib.sha256(str(CACHE_VERSION).encode())
+    for name in sorted(modules | set(_ENGINE_MODULES)):
+        module = sys.modules.get(name)
+        try:
+            source = inspect.getsource(module) if module is not None else name
+        except (OSError, TypeError):
+            logger.warning("No source for %s; cached results only track CACHE_VERSION for it.", name)
+            source = name
+        digest.update(name.encode())
+        digest.update(source.encode())
+    return digest.hexdigest()
+
+
+def _json_param(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise UncacheableBacktest(f"Strategy parameter {value!r} is not JSON-serializable.")
+
+
+def backtest_key(strategy_class, data: pd.DataFrame, strategy_params: dict, initial_capital: float,
+                 fee_rate: float, slippage_rate: float) -> str:
+    """
+    Key for one backtest: dataset content hash, strategy class, the code it
+    runs and all parameters.
+
+    Raises UncacheableBacktest for runtime options (e.g. an intrabar
+    resolver) and other parameters without a stable JSON form, whose repr
+    may hold memory addresses.
+    """
+    runtime = [name for name in getattr(strategy_class, 'runtime_options', ())
+               if strategy_params.get(name) is not None]
+    if runtime:
+        raise UncacheableBacktest(f"Runtime options {runtime} cannot be part of a cache key.")
+    payload = json.dumps({
+        'data': dataset_fingerprint(data),
+        'strategy': f"{strategy_class.__module__}.{strategy_class.__qualname__}",
+        'code': code_fingerprint(strategy_class),
+        'params': strategy_params,
+        'initial_capital': initial_capital,
+        'fee_rate': fee_rate,
+        'slippage_rate': slippage_rate,
+    }, sort_keys=True, default=_json_param)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class BacktestResultCache:
+    """
+    Memoizes backtest_strategy() results in a size-bounded in-memory LRU,
+    optionally backed by an on-disk tier of pickled results that survives
+    restarts and is shared between dashboard processes.
+    """
+    def __init__(self, max_items: int = 128, disk_dir: Optional[str] = None, max_disk_items: int = 1024) -> None:
+        self.max_items = max_items
+        self.disk_dir = disk_dir
+        self.max_disk_items = max_disk_items
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], pd.DataFrame]]" = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def _remember(self, key: str, result: tuple) -> None:
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                return result
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            try:
+                with open(self._disk_path(key), 'rb') as f:
+                    result = pickle.load(f)
+            except Exception as e:
+                logger.warning("Ignoring unreadable cached backtest %s: %s", key, e)
+                return None
+            self._remember(key, result)
+            return result
+        return None
+
+    def put(self, key: str, result: tuple) -> None:
+        self._remember(key, result)
+        if not self.disk_dir:
+            return
+        tmp_path = self._disk_path(key) + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._disk_path(key))
+        self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        paths = [os.path.join(self.disk_dir, name) for name in os.listdir(self.disk_dir) if name.endswith('.pkl')]
+        if len(paths) <= self.max_disk_items:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:len(paths) - self.max_disk_items]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def backtest_strategy(self, strategy_class, data: pd.DataFrame, strategy_params: dict,
+                          initial_capital: float = 10000.0, fee_rate: float = 0.001,
+                          slippage_rate: float = 0.001) -> Tuple[Dict[str, Any], pd.DataFrame]:
+        """
+        Drop-in replacement for backtester.backtest_strategy() that returns a
+        cached result when the same dataset, strategy and parameters were run before.
+        The returned trade DataFrame is shared and must not be modified.
+        Runs with uncacheable parameters are executed without the cache.
+        """
+        try:
+            key = backtest_key(strategy_class, data, strategy_params, initial_capital, fee_rate, slippage_rate)
+        except UncacheableBacktest as e:
+            logger.info("Not caching backtest: %s", e)
+            return backtest_strategy(strategy_class, data, strategy_params, initial_capital, fee_rate, slippage_rate)
+        result = self.get(key)
+        if result is not None:
+            self.hits += 1
+            logger.info("Using cached backtest result %s", key[:12])
+            return dict(result[0]), result[1]
+        self.misses += 1
+        result = backtest_strategy(strategy_class, data, strategy_params, initial_capital, fee_rate, slippage_rate)
+        self.put(key, result)
+        return dict(result[0]), result[1]
@@ -0,0 +1,225 @@
+# robustness.py
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on simulated trade cells (simulations x trades) per batch; the
+# two float64 work buffers reused across batches hold this many cells each.
+_MAX_BATCH_CELLS = 250_000
+
+
+def _returns(trades) -> np.ndarray:
+    if isinstance(trades, pd.DataFrame):
+        return trades['return_pct'].to_numpy(dtype=np.float64) if 'return_pct' in trades else np.empty(0)
+    return np.asarray(trades, dtype=np.float64)
+
+
+def _net_profit(trades) -> np.ndarray:
+    if not isinstance(trades, pd.DataFrame) or 'net_profit' not in trades:
+        raise ValueError("sizing='units' needs a trade-results DataFrame with a net_profit column.")
+    return trades['net_profit'].to_numpy(dtype=np.float64)
+
+
+def _path_metrics(log_equity: np.ndarray, peak: np.ndarray, initial_capital: float) -> Dict[str, np.ndarray]:
+    """
+    Path metrics of the per-trade log growth rows in log_equity (one row per
+    simulation).
+
+    Equity is tracked in log space so the path is one cumsum. Both buffers
+    are overwritten: log_equity holds the cumsum and then the drawdowns,
+    peak the running peaks.
+    """
+    np.cumsum(log_equity, axis=1, out=log_equity)
+    final = log_equity[:, -1].copy()
+    # Drawdowns include the starting equity (log 0) as the first peak.
+    np.maximum.accumulate(log_equity, axis=1, out=peak)
+    np.maximum(peak, 0.0, out=peak)
+    np.subtract(log_equity, peak, out=log_equity)
+    return {
+        'final_capital': initial_capital * np.exp(final),
+        'total_return': np.expm1(final),
+        'max_drawdown': np.expm1(log_equity.min(axis=1)),
+    }
+
+
+def _unit_path_metrics(equity: np.ndarray, peak: np.ndarray, initial_capital: float) -> Dict[str, np.ndarray]:
+    """
+    Path metrics of the per-trade net profit rows in equity (one row per
+    simulation), added to a fixed capital as backtester.compute_accounting
+    does.
+
+    Both buffers are overwritten: equity holds the capital path and then the
+    drawdowns, peak the running peaks.
+    """
+    # Summed in the same order as compute_accounting, so the observed path matches run_backtest exactly.
+    equity[:, 0] += initial_capital
+    np.cumsum(equity, axis=1, out=equity)
+    final = equity[:, -1].copy()
+    np.maximum.accumulate(equity, axis=1, out=peak)
+    np.maximum(peak, initial_capital, out=peak)
+    np.subtract(equity, peak, out=equity)
+    np.divide(equity, peak, out=equity)
+    return {
+        'final_capital': final,
+        'total_return': (final - initial_capital) / initial_capital,
+        'max_drawdown': np.minimum(equity.min(axis=1), 0.0),
+    }
+
+
+def _trade_stats(sample: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Sharpe, win rate and mean of the trade return rows in sample.
+    """
+    n_trades = sample.shape[1]
+    total = sample.sum(axis=1)
+    mean = total / n_trades
+    if n_trades > 1:
+        variance = (np.einsum('ij,ij->i', sample, sample) - total * mean) / (n_trades - 1)
+        std = np.sqrt(np.maximum(variance, 0.0))
+    else:
+        std = np.full(len(sample), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe_ratio = np.where(std > 0, mean / std * np.sqrt(n_trades), 0.0)
+    return {'sharpe_ratio': sharpe_ratio, 'win_rate': np.count_nonzero(sample > 0, axis=1) / n_trades,
+            'mean_return': mean}
+
+
+def path_metrics(trades, initial_capital: float = 10000.0, position_fraction: float = 1.0,
+                 sizing: str = 'compound') -> Dict[str, float]:
+    """
+    The simulated metrics for the observed trade sequence itself. With
+    sizing='units', final capital and max drawdown equal run_backtest's.
+    """
+    returns = _returns(trades)[None, :]
+    if sizing == 'units':
+        path = _net_profit(trades)[None, :].copy()
+        metrics = {**_unit_path_metrics(path, np.empty_like(path), initial_capital), **_trade_stats(returns)}
+    else:
+        log_equity = np.log1p(position_fraction * returns)
+        metrics = {**_path_metrics(log_equity, np.empty_like(log_equity), initial_capital), **_trade_stats(returns)}
+    return {name: float(values[0]) for name, values in metrics.items()}
+
+
+def simulate(trades, n_simulations: int = 10000, method: str = 'bootstrap', initial_capital: float = 10000.0,
+             position_fraction: float = 1.0, seed: Optional[int] = None, sizing: str = 'compound') -> pd.DataFrame:
+    """
+    Per-simulation metrics from resampled trade sequences.
+
+    method='bootstrap' draws each sequence with replacement from the trades;
+    method='shuffle' permutes their order, so final capital, Sharpe and win
+    rate are fixed and only path metrics such as drawdown vary.
+
+    sizing='compound' compounds position_fraction of equity into every
+    trade's return_pct. sizing='units' adds each trade's net_profit (one
+    unit per trade) to the capital, as run_backtest does; it needs a
+    trade-results DataFrame and ignores position_fraction. Simulations are
+    generated as 2-D NumPy batches, never by looping over run_backtest().
+    """
+    returns = _returns(trades)
+    n_trades = len(returns)
+    if n_trades == 0:
+        return pd.DataFrame()
+    if method not in ('bootstrap', 'shuffle'):
+        raise ValueError(f"Unknown resampling method: {method}")
+    if sizing == 'units':
+        steps = _net_profit(trades)
+        path_metrics_of = _unit_path_metrics
+    elif sizing == 'compound':
+        if not 0 < position_fraction or np.any(position_fraction * returns <= -1):
+            raise ValueError("position_fraction must be positive and keep every trade above a total loss.")
+        steps = np.log1p(position_fraction * returns)
+        path_metrics_of = _path_metrics
+    else:
+        raise ValueError(f"Unknown sizing: {sizing}")
+    rng = np.random.default_rng(seed)
+    batch = min(n_simulations, max(1, _MAX_BATCH_CELLS // n_trades))
+    # Two work buffers reused by every batch.
+    work = np.empty((batch, n_trades))
+    spare = np.empty_like(work)
+    parts = []
+    for start in range(0, n_simulations, batch):
+        rows = min(batch, n_simulations - start)
+        path, peak = work[:rows], spare[:rows]
+        if method == 'bootstrap':
+            idx = rng.integers(0, n_trades, size=(rows, n_trades), dtype=np.uint32)
+            # mode='clip' gathers straight into `out`; 'raise' would buffer a copy.
+            stats = _trade_stats(np.take(returns, idx, out=peak, mode='clip'))
+            np.take(steps, idx, out=path, mode='clip')
+        else:
+            # Permuting the per-trade steps themselves skips the index gather.
+            stats = {}
+            rng.permuted(np.broadcast_to(steps, path.shape), axis=1, out=path)
+        parts.append({**path_metrics_of(path, peak, initial_capital), **stats})
+    simulations = pd.DataFrame({name: np.concatenate([part[name] for part in parts]) for name in parts[0]})
+    if method == 'shuffle':
+        observed = path_metrics(trades, initial_capital, position_fraction, sizing)
+        for name in ('sharpe_ratio', 'win_rate', 'mean_return'):
+            simulations[name] = observed[name]
+    return simulations
+
+
+def confidence_intervals(simulations: pd.DataFrame, observed: Optional[Dict[str, float]] = None,
+                         confidence: float = 0.95) -> pd.DataFrame:
+    """
+    Mean, median and the central `confidence` interval of every simulated
+    metric, next to the observed value when given.
+    """
+    tail = (1 - confidence) / 2 * 100
+    values = simulations.to_numpy()
+    lower, median, upper = np.percentile(values, [tail, 50, 100 - tail], axis=0)
+    summary = pd.DataFrame({
+        'observed': [np.nan if observed is None else observed.get(name, np.nan) for name in simulations.columns],
+        'mean': values.mean(axis=0),
+        'std': values.std(axis=0),
+        'lower': lower,
+        'median': median,
+        'upper': upper,
+    }, index=simulations.columns)
+    summary.attrs['confidence'] = confidence
+    return summary
+
+
+def drawdown_distribution(simulations: pd.DataFrame,
+                          percentiles=(50, 75, 90, 95, 99)) -> pd.Series:
+    """
+    Max-drawdown depth not exceeded in p% of simulations, for each p.
+    """
+    # Drawdowns are negative, so the p-th worst-case depth is the (100 - p)th percentile.
+    depths = np.percentile(simulations['max_drawdown'].to_numpy(), [100 - p for p in percentiles])
+    return pd.Series(depths, index=[f"p{p}" for p in percentiles], name='max_drawdown')
+
+
+def monte_carlo(trades, n_simulations: int = 10000, method: str = 'bootstrap', initial_capital: float = 10000.0,
+                position_fraction: float = 1.0, confidence: float = 0.95, seed: Optional[int] = None,
+                sizing: str = 'compound') -> Tuple[pd.DataFrame, pd.Series, Dict[str, float]]:
+    """
+    Robustness report for a trade-results DataFrame (or return_pct array).
+
+    Returns (summary, drawdowns, probabilities): confidence intervals for
+    every metric against the observed trade sequence, the simulated
+    max-drawdown distribution, and the share of simulations ending in a
+    loss or breaching 10/20/50% drawdowns.
+
+    The default sizing='compound' reinvests position_fraction of equity in
+    every trade, so its final capital and drawdown differ from
+    run_backtest's, which adds each trade's per-unit net_profit to a fixed
+    capital. Pass sizing='units' (with run_backtest's trade DataFrame) for
+    an observed row equal to run_backtest's metrics.
+    """
+    simulations = simulate(trades, n_simulations, method, initial_capital, position_fraction, seed, sizing)
+    if simulations.empty:
+        logger.warning("No trades to simulate.")
+        return pd.DataFrame(), pd.Series(dtype=np.float64), {}
+    observed = path_metrics(trades, initial_capital, position_fraction, sizing)
+    max_drawdown = simulations['max_drawdown'].to_numpy()
+    probabilities = {
+        'prob_loss': float((simulations['total_return'].to_numpy() < 0).mean()),
+        'prob_drawdown_10': float((max_drawdown <= -0.10).mean()),
+        'prob_drawdown_20': float((max_drawdown <= -0.20).mean()),
+        'prob_drawdown_50': float((max_drawdown <= -0.50).mean()),
+    }
+    return confidence_intervals(simulations, observed, confidence), drawdown_distribution(simulations), probabilities
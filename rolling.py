@@ -0,0 +1,81 @@
+# rolling.py
+from collections import deque
+
+import numpy as np
+
+
+class RollingWindow:
+    """
+    Fixed-size ring buffer with O(1) amortized rolling max, min and mean.
+
+    Values are written twice into a buffer of 2 * size, so the current window
+    is always available as one contiguous, chronologically ordered slice.
+    """
+    def __init__(self, size: int) -> None:
+        if size <= 0:
+            raise ValueError("RollingWindow size must be positive.")
+        self.size = size
+        self.count = 0
+        self._buffer = np.zeros(2 * size)
+        self._pos = 0
+        self._sum = 0.0
+        self._max = deque()  # (index, value), values decreasing
+        self._min = deque()  # (index, value), values increasing
+
+    def __len__(self) -> int:
+        return min(self.count, self.size)
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.size
+
+    def push(self, value: float) -> None:
+        idx = self.count
+        if self.count >= self.size:
+            self._sum -= self._buffer[self._pos]
+        self._buffer[self._pos] = value
+        self._buffer[self._pos + self.size] = value
+        self._pos = (self._pos + 1) % self.size
+        self._sum += value
+        self.count += 1
+        if self._pos == 0:
+            # Resync once per lap so floating-point drift in the running sum stays bounded.
+            self._sum = float(self._buffer[:self.size].sum())
+
+        oldest = idx - self.size + 1
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((idx, value))
+        if self._max[0][0] < oldest:
+            self._max.popleft()
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((idx, value))
+        if self._min[0][0] < oldest:
+            self._min.popleft()
+
+    def values(self) -> np.ndarray:
+        """
+        Current window, oldest first (a view into the buffer).
+        """
+        if self.count < self.size:
+            return self._buffer[:self.count]
+        return self._buffer[self._pos:self._pos + self.size]
+
+    def max(self) -> float:
+        return self._max[0][1]
+
+    def min(self) -> float:
+        return self._min[0][1]
+
+    def mean(self) -> float:
+        """
+        O(1) running mean; may differ from a fresh sum in the last bits.
+        """
+        return self._sum / len(self)
+
+    def exact_mean(self) -> float:
+        """
+        Mean recomputed from the window with NumPy, identical to a batch mean.
+        """
+        return self.values().mean()
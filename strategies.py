@@ -1,7 +1,16 @@
 # strategies.py
+import numpy as np
 import pandas as pd
 from abc import ABC, abstractmethod
 import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from exits import resolve_exits
+from feature_cache import get_feature
+from profiling import timed
+from resampler import multi_timeframe_view, resample_frame
+from rolling import RollingWindow
+from trade_log import TradeLog
 
 logger = logging.getLogger(__name__)
 
@@ -9,148 +18,300 @@ class Strategy(ABC):
     """
     Abstract base class for trading strategies.
     
-    Each strategy must implement the run() method and populate the 'trades' list.
+    Each strategy must implement the run() method and populate the 'trades' log.
+    Concrete subclasses are discovered by the strategy registry; `label` is
+    their display name and `default_settings` overrides constructor defaults
+    for the dashboard.
     """
-    def __init__(self, data: pd.DataFrame) -> None:
+    label: Optional[str] = None
+    default_settings: Dict[str, Any] = {}
+    # Constructor arguments that are runtime collaborators, not settings.
+    runtime_options = ('intrabar',)
+
+    def __init__(self, data: pd.DataFrame, intrabar=None) -> None:
         self.data = data
-        self.trades = []  # List of trade dictionaries
+        # Optional intrabar.IntrabarResolver deciding same-bar stop/target hits.
+        self.intrabar = intrabar
+        self.trades = TradeLog()  # Columnar trade log; append() also accepts legacy trade dicts
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        # Time every concrete run() as its own profiling stage.
+        if 'run' in cls.__dict__ and not getattr(cls.run, '__isabstractmethod__', False):
+            cls.run = timed(f"{cls.__name__}.run")(cls.run)
+
+    def feature(self, name: str, **params) -> np.ndarray:
+        """
+        Return a precomputed feature array for self.data from the shared feature cache.
+        """
+        return get_feature(self.data, name, **params)
+
+    def required_features(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        (name, params) of the cached features run() reads via feature(), so
+        callers evaluating many windows of one series (walk_forward) can
+        compute them once on the full series and hand each window a slice.
+        """
+        return []
 
     @abstractmethod
-    def run(self) -> list:
+    def run(self) -> TradeLog:
         """
-        Execute the strategy logic and return a list of trades.
+        Execute the strategy logic and return the trade log.
         """
         pass
 
+    def multi_timeframe(self, timeframe: str, higher_timeframes, columns=None) -> pd.DataFrame:
+        """
+        self.data (candles of `timeframe`) with columns of each higher timeframe
+        resampled from it, aligned to the last closed higher candle, e.g.
+        self.multi_timeframe('5m', ['1h'], ['High', 'Low']) adds High_1h, Low_1h.
+        """
+        higher = {tf: resample_frame(self.data, tf) for tf in higher_timeframes}
+        return multi_timeframe_view(self.data, timeframe, higher, columns)
+
+    def on_bar(self, candle: dict) -> list:
+        """
+        Process one new candle incrementally and return the events it produced.
+        Strategies that support live evaluation override this.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support streaming evaluation.")
+
+    def finish_stream(self) -> list:
+        """
+        Close out streaming state at the end of a historical feed.
+        """
+        return []
+
+def iter_candles(data: pd.DataFrame):
+    """
+    Yield the rows of an OHLCV DataFrame as live-style candle dicts.
+    """
+    for row in data.itertuples():
+        yield {'Timestamp': row.Index, 'Open': row.Open, 'High': row.High, 'Low': row.Low,
+               'Close': row.Close, 'Volume': getattr(row, 'Volume', None)}
+
 class WickFillStrategy(Strategy):
     """
     Implements a Wick Fill trading strategy.
     """
+    label = "WickFill Strategy"
+    default_settings = {"range_factor": 3}
+
     def __init__(self, data: pd.DataFrame, wick_threshold: float = 0.5, range_window: int = 20, 
                  range_factor: float = 1.5, risk_reward_ratio: float = 2.0, stop_buffer: float = 0.005,
-                 max_holding_period: int = 10) -> None:
-        super().__init__(data)
+                 max_holding_period: int = 10, intrabar=None) -> None:
+        super().__init__(data, intrabar)
         self.wick_threshold = wick_threshold
         self.range_window = range_window
         self.range_factor = range_factor
         self.risk_reward_ratio = risk_reward_ratio
         self.stop_buffer = stop_buffer
         self.max_holding_period = max_holding_period
+        self.reset_stream()
+
+    def required_features(self) -> List[Tuple[str, Dict[str, Any]]]:
+        window = {'window': self.range_window}
+        return [('rolling_range', window), ('rolling_mean_range', window),
+                ('body', {}), ('upper_wick', {}), ('lower_wick', {})]
 
-    def is_range_bound(self, idx: int) -> bool:
+    def compute_signals(self) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Check if the market is range-bound based on the previous candles.
+        Vectorized signal stage.
+
+        Returns the indices of all candidate signal bars and their side
+        (1 = long, -1 = short), before overlapping trades are filtered out.
         """
-        if idx < self.range_window:
-            return False
-        window = self.data.iloc[idx - self.range_window: idx]
-        overall_range = window['High'].max() - window['Low'].min()
-        avg_range = (window['High'] - window['Low']).mean()
-        return overall_range < self.range_factor * avg_range
+        data = self.data
+        n = len(data)
+        window = self.range_window
+        if n - 1 <= window:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int8)
+
+        # Range check for bar i uses the `window` candles before it; these
+        # arrays come from the shared feature cache and are reused across runs.
+        idx = slice(window, n - 1)
+        window_range = self.feature('rolling_range', window=window)[idx]
+        avg_range = self.feature('rolling_mean_range', window=window)[idx]
+        range_bound = window_range < self.range_factor * avg_range
+
+        body = self.feature('body')[idx]
+        upper_wick = self.feature('upper_wick')[idx]
+        lower_wick = self.feature('lower_wick')[idx]
+        has_body = body != 0
+        safe_body = np.where(has_body, body, 1.0)
+        long_signal = has_body & range_bound & (upper_wick / safe_body >= self.wick_threshold)
+        short_signal = has_body & range_bound & ~long_signal & (lower_wick / safe_body >= self.wick_threshold)
 
-    def run(self) -> list:
+        candidates = np.flatnonzero(long_signal | short_signal)
+        sides = np.where(long_signal[candidates], 1, -1).astype(np.int8)
+        return candidates + window, sides
+
+    def run(self) -> TradeLog:
         """
         Run the WickFill strategy and generate trades.
+
+        Signals are found in one vectorized pass; only the candidate bars are
+        resolved in a batch, then walked once to skip overlapping trades.
         """
-        self.trades = []
-        i = self.range_window  # start once we have enough candles
+        self.trades = TradeLog()
         data = self.data
-        while i < len(data) - 1:
-            candle = data.iloc[i]
-            open_price = candle['Open']
-            close_price = candle['Close']
-            high_price = candle['High']
-            low_price = candle['Low']
-            body = abs(close_price - open_price)
-            if body == 0:
-                i += 1
-                continue
+        candidates, sides = self.compute_signals()
+        if len(candidates) == 0:
+            return self.trades
 
-            trade_triggered = False
-            if not self.is_range_bound(i):
-                i += 1
+        open_price = data['Open'].to_numpy(dtype=np.float64)
+        close_price = data['Close'].to_numpy(dtype=np.float64)
+        high_price = data['High'].to_numpy(dtype=np.float64)
+        low_price = data['Low'].to_numpy(dtype=np.float64)
+
+        # Levels and exits for every candidate are resolved as one batch.
+        is_long = sides == 1
+        entry_idx = candidates + 1
+        entry_price = open_price[entry_idx]
+        stop_loss = np.where(is_long, low_price[candidates] * (1 - self.stop_buffer),
+                             high_price[candidates] * (1 + self.stop_buffer))
+        risk = np.where(is_long, entry_price - stop_loss, stop_loss - entry_price)
+        take_profit = np.where(is_long, entry_price + self.risk_reward_ratio * risk,
+                               entry_price - self.risk_reward_ratio * risk)
+        exit_idx, exit_price, _ = resolve_exits(high_price, low_price, close_price, entry_idx, sides,
+                                                stop_loss, take_profit, self.max_holding_period,
+                                                intrabar=self._intrabar_lookup())
+
+        # Sequential pass: skip candidates that fall inside an open trade.
+        taken = []
+        next_free = self.range_window
+        for k, (i, exit_at) in enumerate(zip(candidates.tolist(), exit_idx.tolist())):
+            if i < next_free:
                 continue
+            taken.append(k)
+            next_free = exit_at + 1
+
+        taken = np.asarray(taken, dtype=np.int64)
+        index_values = data.index.values
+        self.trades = TradeLog.from_arrays(
+            side=sides[taken],
+            entry_time=index_values[entry_idx[taken]],
+            exit_time=index_values[exit_idx[taken]],
+            entry_price=entry_price[taken],
+            exit_price=exit_price[taken],
+            stop_loss=stop_loss[taken],
+            take_profit=take_profit[taken],
+        )
+        return self.trades
+
+    def _intrabar_lookup(self):
+        # Adapts bar positions to the bar open times the resolver works with.
+        if self.intrabar is None:
+            return None
+        index_values = self.data.index.values
 
-            # Long trade signal: if upper wick is unusually long.
-            if (high_price - max(open_price, close_price)) / body >= self.wick_threshold:
-                if i + 1 < len(data):
-                    entry_candle = data.iloc[i+1]
-                    entry_time = data.index[i+1]
-                    entry_price = entry_candle['Open']
-                    stop_loss = low_price * (1 - self.stop_buffer)
-                    risk = entry_price - stop_loss
-                    take_profit = entry_price + self.risk_reward_ratio * risk
-                    exit_found = False
-                    for j in range(i+1, min(i+1+self.max_holding_period, len(data))):
-                        current_candle = data.iloc[j]
-                        if current_candle['Low'] <= stop_loss:
-                            exit_time = data.index[j]
-                            exit_price = stop_loss
-                            exit_found = True
-                            break
-                        elif current_candle['High'] >= take_profit:
-                            exit_time = data.index[j]
-                            exit_price = take_profit
-                            exit_found = True
-                            break
-                    if not exit_found:
-                        exit_time = data.index[i+1+self.max_holding_period-1]
-                        exit_price = data.iloc[i+1+self.max_holding_period-1]['Close']
-                    self.trades.append({
-                        'trade_type': 'long',
-                        'entry_time': entry_time,
-                        'entry_price': entry_price,
-                        'exit_time': exit_time,
-                        'exit_price': exit_price,
-                        'stop_loss': stop_loss,
-                        'take_profit': take_profit,
-                    })
-                    trade_triggered = True
-
-            # Short trade signal: if lower wick is unusually long.
-            if (min(open_price, close_price) - low_price) / body >= self.wick_threshold and not trade_triggered:
-                if i + 1 < len(data):
-                    entry_candle = data.iloc[i+1]
-                    entry_time = data.index[i+1]
-                    entry_price = entry_candle['Open']
-                    stop_loss = high_price * (1 + self.stop_buffer)
-                    risk = stop_loss - entry_price
-                    take_profit = entry_price - self.risk_reward_ratio * risk
-                    exit_found = False
-                    for j in range(i+1, min(i+1+self.max_holding_period, len(data))):
-                        current_candle = data.iloc[j]
-                        if current_candle['High'] >= stop_loss:
-                            exit_time = data.index[j]
-                            exit_price = stop_loss
-                            exit_found = True
-                            break
-                        elif current_candle['Low'] <= take_profit:
-                            exit_time = data.index[j]
-                            exit_price = take_profit
-                            exit_found = True
-                            break
-                    if not exit_found:
-                        exit_time = data.index[i+1+self.max_holding_period-1]
-                        exit_price = data.iloc[i+1+self.max_holding_period-1]['Close']
-                    self.trades.append({
-                        'trade_type': 'short',
-                        'entry_time': entry_time,
-                        'entry_price': entry_price,
-                        'exit_time': exit_time,
-                        'exit_price': exit_price,
-                        'stop_loss': stop_loss,
-                        'take_profit': take_profit,
-                    })
-                    trade_triggered = True
-
-            # Jump ahead after a trade.
-            if trade_triggered:
-                try:
-                    exit_idx = data.index.get_loc(exit_time)
-                except Exception:
-                    exit_idx = i + self.max_holding_period
-                i = exit_idx + 1
+        def lookup(bars, sides, stop_loss, take_profit):
+            bar_starts = index_values[bars].astype('datetime64[ms]').astype(np.int64)
+            return self.intrabar.target_first(bar_starts, sides, stop_loss, take_profit)
+        return lookup
+
+    def reset_stream(self) -> None:
+        """
+        Reset the incremental (on_bar) state.
+        """
+        self.trades = TradeLog()
+        self._bar_index = -1
+        self._next_free = self.range_window
+        self._highs = RollingWindow(self.range_window)
+        self._lows = RollingWindow(self.range_window)
+        self._ranges = RollingWindow(self.range_window)
+        self._pending = None  # (side, signal candle) waiting for the next bar's open
+        self.position = None
+        self._last_candle = None
+
+    def _stream_range_bound(self) -> bool:
+        if not self._highs.full:
+            return False
+        window_range = self._highs.max() - self._lows.min()
+        threshold = self.range_factor * self._ranges.mean()
+        if abs(window_range - threshold) <= 1e-9 * max(abs(window_range), abs(threshold)):
+            # Too close to call with the running mean; use the exact batch mean.
+            threshold = self.range_factor * self._ranges.exact_mean()
+        return window_range < threshold
+
+    def _close_position(self, candle: dict, exit_price: float, reason: str) -> dict:
+        position = self.position
+        trade = {
+            'trade_type': 'long' if position['side'] == 1 else 'short',
+            'entry_time': position['entry_time'],
+            'entry_price': position['entry_price'],
+            'exit_time': candle['Timestamp'],
+            'exit_price': exit_price,
+            'stop_loss': position['stop_loss'],
+            'take_profit': position['take_profit'],
+        }
+        self.trades.append(trade)
+        self.position = None
+        self._next_free = self._bar_index + 1
+        return {'event': 'exit', 'reason': reason, **trade}
+
+    def on_bar(self, candle: dict) -> list:
+        """
+        Evaluate one new candle; produces the same trades as run() over the same bars.
+
+        Returns a list of events: 'signal' (entry on the next bar's open),
+        'entry' and 'exit' (with the completed trade).
+        """
+        events = []
+        self._bar_index += 1
+        t = self._bar_index
+        open_price, high_price = candle['Open'], candle['High']
+        low_price, close_price = candle['Low'], candle['Close']
+
+        if self._pending is not None:
+            side, signal = self._pending
+            self._pending = None
+            entry_price = open_price
+            if side == 1:
+                stop_loss = signal['Low'] * (1 - self.stop_buffer)
+                take_profit = entry_price + self.risk_reward_ratio * (entry_price - stop_loss)
             else:
-                i += 1
+                stop_loss = signal['High'] * (1 + self.stop_buffer)
+                take_profit = entry_price - self.risk_reward_ratio * (stop_loss - entry_price)
+            self.position = {'side': side, 'entry_index': t, 'entry_time': candle['Timestamp'],
+                             'entry_price': entry_price, 'stop_loss': stop_loss, 'take_profit': take_profit}
+            events.append({'event': 'entry', **self.position})
 
-        return self.trades
+        if self.position is not None:
+            position = self.position
+            stop_loss, take_profit = position['stop_loss'], position['take_profit']
+            if position['side'] == 1:
+                stop_hit, target_hit = low_price <= stop_loss, high_price >= take_profit
+            else:
+                stop_hit, target_hit = high_price >= stop_loss, low_price <= take_profit
+            if stop_hit:
+                events.append(self._close_position(candle, stop_loss, 'stop_loss'))
+            elif target_hit:
+                events.append(self._close_position(candle, take_profit, 'take_profit'))
+            elif t >= position['entry_index'] + self.max_holding_period - 1:
+                events.append(self._close_position(candle, close_price, 'time'))
+        elif t >= self._next_free and self._stream_range_bound():
+            body = abs(close_price - open_price)
+            if body != 0:
+                if (high_price - max(open_price, close_price)) / body >= self.wick_threshold:
+                    self._pending = (1, candle)
+                elif (min(open_price, close_price) - low_price) / body >= self.wick_threshold:
+                    self._pending = (-1, candle)
+                if self._pending is not None:
+                    events.append({'event': 'signal', 'side': self._pending[0], 'time': candle['Timestamp']})
+
+        self._highs.push(high_price)
+        self._lows.push(low_price)
+        self._ranges.push(high_price - low_price)
+        self._last_candle = candle
+        return events
+
+    def finish_stream(self) -> list:
+        """
+        Close an open position at the last candle's close, as run() does at the end of the data.
+        """
+        self._pending = None
+        if self.position is None or self._last_candle is None:
+            return []
+        return [self._close_position(self._last_candle, self._last_candle['Close'], 'end_of_data')]
@@ -0,0 +1,116 @@
+# strategy_registry.py
+import importlib
+import inspect
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Modules scanned for Strategy subclasses; STRATEGY_MODULES (comma-separated) adds more.
+DEFAULT_STRATEGY_MODULES = ("strategies",)
+
+
+def _annotation_name(annotation) -> Optional[str]:
+    if annotation is inspect.Parameter.empty:
+        return None
+    return annotation if isinstance(annotation, str) else getattr(annotation, '__name__', str(annotation))
+
+
+def settings_schema(strategy_class) -> Dict[str, Dict[str, Any]]:
+    """
+    Settings schema of a strategy: one entry per keyword argument of its
+    constructor (after data and runtime_options) with its type and default. Class-level
+    default_settings override the constructor defaults.
+    """
+    overrides = getattr(strategy_class, 'default_settings', {})
+    skipped = {'self', 'data', *getattr(strategy_class, 'runtime_options', ())}
+    schema = {}
+    for name, param in inspect.signature(strategy_class.__init__).parameters.items():
+        if name in skipped or param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+        default = overrides.get(name, None if param.default is param.empty else param.default)
+        type_name = _annotation_name(param.annotation)
+        if type_name is None and default is not None:
+            type_name = type(default).__name__
+        schema[name] = {'type': type_name, 'default': default, 'required': param.default is param.empty
+                        and name not in overrides}
+    return schema
+
+
+class StrategyRegistry:
+    """
+    Name -> Strategy subclass lookup, populated on first use by importing the
+    strategy modules and collecting every concrete Strategy subclass.
+    Strategies may also be registered explicitly with register().
+    """
+    def __init__(self, modules: Optional[Sequence[str]] = None) -> None:
+        if modules is None:
+            extra = [name.strip() for name in os.getenv("STRATEGY_MODULES", "").split(",") if name.strip()]
+            modules = list(DEFAULT_STRATEGY_MODULES) + extra
+        self.modules = list(modules)
+        self._strategies: Dict[str, type] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def register(self, strategy_class, name: Optional[str] = None):
+        """
+        Register a strategy class under `name` (its class name by default);
+        usable as a class decorator.
+        """
+        self._strategies[name or strategy_class.__name__] = strategy_class
+        return strategy_class
+
+    def _discover(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            from strategies import Strategy
+            for module_name in self.modules:
+                try:
+                    importlib.import_module(module_name)
+                except ImportError as e:
+                    logger.error("Could not import strategy module %s: %s", module_name, e)
+            pending = list(Strategy.__subclasses__())
+            while pending:
+                cls = pending.pop()
+                pending.extend(cls.__subclasses__())
+                if not inspect.isabstract(cls):
+                    self._strategies.setdefault(cls.__name__, cls)
+            self._loaded = True
+            logger.info("Discovered strategies: %s", ", ".join(sorted(self._strategies)))
+
+    def names(self) -> List[str]:
+        self._discover()
+        return sorted(self._strategies)
+
+    def get(self, name: str):
+        """
+        Strategy class registered under name, or None.
+        """
+        self._discover()
+        return self._strategies.get(name)
+
+    def schema(self, name: str) -> Dict[str, Dict[str, Any]]:
+        strategy_class = self.get(name)
+        return settings_schema(strategy_class) if strategy_class is not None else {}
+
+    def default_settings(self, name: str) -> Dict[str, Any]:
+        """
+        Default constructor keyword arguments for the named strategy.
+        """
+        return {key: field['default'] for key, field in self.schema(name).items() if not field['required']}
+
+    def label(self, name: str) -> str:
+        strategy_class = self.get(name)
+        return getattr(strategy_class, 'label', None) or name
+
+    def options(self) -> List[Dict[str, str]]:
+        """
+        Dropdown options ({'label', 'value'}) for every registered strategy.
+        """
+        return [{'label': self.label(name), 'value': name} for name in self.names()]
+
+
+registry = StrategyRegistry()
@@ -1,12 +1,10 @@
 # strategy_settings.py
+# Strategy settings now come from the strategy registry (constructor defaults
+# plus each class's default_settings); STRATEGY_SETTINGS is kept for existing callers.
+from strategy_registry import registry
 
-STRATEGY_SETTINGS = {
-    "WickFillStrategy": {
-        "wick_threshold": 0.5,
-        "range_window": 20,
-        "range_factor": 3,
-        "risk_reward_ratio": 2.0,
-        "stop_buffer": 0.005,
-        "max_holding_period": 10
-    }
-}
+
+def __getattr__(name):
+    if name == "STRATEGY_SETTINGS":
+        return {strategy: registry.default_settings(strategy) for strategy in registry.names()}
+    raise AttributeError(name)
@@ -0,0 +1,116 @@
+# synthetic.py
+import numpy as np
+import pandas as pd
+
+
+def _to_frame(close: np.ndarray, rng: np.random.Generator, wick_scale: float, start: str, freq: str) -> pd.DataFrame:
+    n = len(close)
+    open_ = np.empty(n)
+    open_[0] = close[0]
+    open_[1:] = close[:-1]
+    body_high = np.maximum(open_, close)
+    body_low = np.minimum(open_, close)
+    high = body_high + rng.exponential(wick_scale, n)
+    low = body_low - rng.exponential(wick_scale, n)
+    index = pd.date_range(start, periods=n, freq=freq, name='Timestamp')
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close,
+                         'Volume': rng.gamma(2.0, 50.0, n)}, index=index)
+
+
+def random_walk(n_bars: int, seed: int = 0, start: str = '2023-01-01', freq: str = 'min') -> pd.DataFrame:
+    """
+    Geometric random walk around 100.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.001, n_bars)))
+    return _to_frame(close, rng, 0.05, start, freq)
+
+
+def range_bound(n_bars: int, seed: int = 0, start: str = '2023-01-01', freq: str = 'min') -> pd.DataFrame:
+    """
+    Mean-reverting (Ornstein-Uhlenbeck) series oscillating around 100.
+    """
+    rng = np.random.default_rng(seed)
+    shocks = rng.normal(0.0, 0.1, n_bars)
+    decay = 1 - 0.05
+    # AR(1) x_t = decay * x_{t-1} + shock_t, vectorized per block as
+    # x_t = decay^t * (x_0 + cumsum(shock_i * decay^-i)); blocks keep decay^-i finite.
+    close = np.empty(n_bars)
+    level = 0.0
+    block = 256
+    powers = decay ** np.arange(1, block + 1)
+    for start_idx in range(0, n_bars, block):
+        chunk = shocks[start_idx:start_idx + block]
+        k = len(chunk)
+        close[start_idx:start_idx + k] = powers[:k] * (level + np.cumsum(chunk / powers[:k]))
+        level = close[start_idx + k - 1]
+    return _to_frame(100.0 + close, rng, 0.08, start, freq)
+
+
+def trending(n_bars: int, seed: int = 0, start: str = '2023-01-01', freq: str = 'min',
+             drift: float = 0.0002) -> pd.DataFrame:
+    """
+    Random walk with a steady upward drift.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(drift, 0.001, n_bars)))
+    return _to_frame(close, rng, 0.05, start, freq)
+
+
+GENERATORS = {
+    'random_walk': random_walk,
+    'range_bound': range_bound,
+    'trending': trending,
+}
+
+
+class FakeExchange:
+    """
+    Offline stand-in for a ccxt exchange serving candles from a DataFrame.
+    """
+    rateLimit = 0
+
+    def __init__(self, data: pd.DataFrame, max_limit: int = 1000) -> None:
+        self.timestamps = data.index.values.astype('datetime64[ms]').astype(np.int64)
+        self.rows = np.column_stack([self.timestamps.astype(np.float64),
+                                     data[['Open', 'High', 'Low', 'Close', 'Volume']].to_numpy()])
+        self.max_limit = max_limit
+        self.calls = 0
+
+    def parse8601(self, text: str) -> int:
+        return int(pd.Timestamp(text).timestamp() * 1000)
+
+    def milliseconds(self) -> int:
+        return int(self.timestamps[-1]) if len(self.timestamps) else 0
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=500, params=None):
+        self.calls += 1
+        start = np.searchsorted(self.timestamps, since) if since is not None else 0
+        return self.rows[start:start + min(limit, self.max_limit)].tolist()
+
+
+class FakeAsyncExchange:
+    """
+    Async stand-in for a ccxt.async_support exchange serving one candle
+    DataFrame per symbol. With a clock (e.g. monitor.SimulatedClock), only
+    candles that have opened by clock.time_ms() are returned, the last of
+    them still forming, as on a live exchange.
+    """
+    rateLimit = 0
+
+    def __init__(self, frames, clock=None, max_limit: int = 1000) -> None:
+        self.exchanges = {symbol: FakeExchange(data, max_limit) for symbol, data in frames.items()}
+        self.clock = clock
+        self.calls = 0
+
+    async def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=500, params=None):
+        self.calls += 1
+        exchange = self.exchanges[symbol]
+        rows = exchange.fetch_ohlcv(symbol, timeframe, since, limit)
+        if self.clock is not None:
+            now = self.clock.time_ms()
+            rows = [row for row in rows if row[0] <= now]
+        return rows
+
+    async def close(self) -> None:
+        pass
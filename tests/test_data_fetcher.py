@@ -0,0 +1,71 @@
+# tests/test_data_fetcher.py
+import numpy as np
+import pandas as pd
+
+from data_fetcher import DataFetcher
+from data_store import CandleStore
+from synthetic import FakeExchange, random_walk
+
+
+def ms(text: str) -> int:
+    return int(pd.Timestamp(text).timestamp() * 1000)
+
+
+def test_sync_fills_hole_between_disjoint_loads(tmp_path):
+    data = random_walk(24 * 120, start='2023-01-01', freq='h')
+    exchange = FakeExchange(data)
+    fetcher = DataFetcher(exchange=exchange, store=CandleStore(str(tmp_path)))
+
+    fetcher.load_range('BTC/USDT', '1h', ms('2023-01-01'), ms('2023-01-05'))
+    fetcher.load_range('BTC/USDT', '1h', ms('2023-03-01'), ms('2023-03-05'))
+    calls = exchange.calls
+    february = fetcher.load_range('BTC/USDT', '1h', ms('2023-02-01'), ms('2023-02-28'))
+
+    expected = data.loc['2023-02-01':'2023-02-28 00:00']
+    assert len(february) == len(expected)
+    np.testing.assert_allclose(february['Close'].to_numpy(), expected['Close'].to_numpy())
+    assert exchange.calls > calls
+
+    # Fully stored ranges are served without requests.
+    calls = exchange.calls
+    assert len(fetcher.load_range('BTC/USDT', '1h', ms('2023-02-10'), ms('2023-02-20'))) == 10 * 24 + 1
+    assert exchange.calls == calls
+
+
+def test_sync_before_first_bar_fetches_only_the_head(tmp_path):
+    data = random_walk(24 * 120, start='2023-01-01', freq='h')
+    exchange = FakeExchange(data)
+    fetcher = DataFetcher(exchange=exchange, store=CandleStore(str(tmp_path)))
+    fetcher.load_range('BTC/USDT', '1h', ms('2023-03-01'), ms('2023-03-05'))
+
+    written = fetcher.sync('BTC/USDT', '1h', ms('2023-02-20'), ms('2023-03-05'))
+    assert written == 9 * 24  # only the head: the closed last bar is not re-fetched
+    assert len(fetcher.store.read('BTC/USDT', '1h', ms('2023-02-20'), ms('2023-03-05'))) == 13 * 24 + 1
+
+
+def test_closed_ranges_and_exchange_gaps_are_served_from_disk(tmp_path):
+    data = random_walk(24 * 60, start='2023-01-01', freq='h')
+    data = data.drop(data.loc['2023-01-10 05:00':'2023-01-10 09:00'].index)  # exchange outage
+    exchange = FakeExchange(data)
+    fetcher = DataFetcher(exchange=exchange, store=CandleStore(str(tmp_path)))
+
+    first = fetcher.load_range('BTC/USDT', '1h', ms('2023-01-05'), ms('2023-01-20 12:30'))
+    assert len(first) == 15 * 24 + 13 - 5
+    calls = exchange.calls
+    again = fetcher.load_range('BTC/USDT', '1h', ms('2023-01-05'), ms('2023-01-20 12:30'))
+    pd.testing.assert_frame_equal(again, first)
+    assert exchange.calls == calls
+
+    # Only the missing stretch after the stored span is requested.
+    fetcher.load_range('BTC/USDT', '1h', ms('2023-01-05'), ms('2023-01-25'))
+    assert exchange.calls == calls + 1
+
+
+def test_forming_last_bar_is_refetched(tmp_path):
+    data = random_walk(24 * 10, start='2023-01-01', freq='h')
+    exchange = FakeExchange(data)  # "now" is the open of the last bar, which is still forming
+    fetcher = DataFetcher(exchange=exchange, store=CandleStore(str(tmp_path)))
+    fetcher.sync('BTC/USDT', '1h', ms('2023-01-01'))
+    calls = exchange.calls
+    assert fetcher.sync('BTC/USDT', '1h', ms('2023-01-01')) == 1
+    assert exchange.calls > calls
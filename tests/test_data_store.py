@@ -0,0 +1,38 @@
+# tests/test_data_store.py
+import multiprocessing as mp
+import os
+
+import numpy as np
+
+from data_store import CANDLE_DTYPE, CandleStore
+
+_HOUR_MS = 60 * 60 * 1000
+_JAN_2023_MS = 1672531200000
+
+
+def _bars(offset: int, count: int) -> np.ndarray:
+    records = np.zeros(count, dtype=CANDLE_DTYPE)
+    records['Timestamp'] = _JAN_2023_MS + (offset + np.arange(count)) * _HOUR_MS
+    records['Close'] = offset + np.arange(count)
+    return records
+
+
+def _write_bars(root: str, offset: int, count: int) -> None:
+    store = CandleStore(root)
+    for k in range(count):
+        store.write('BTC/USDT', '1h', _bars(offset + k, 1))
+
+
+def test_concurrent_writers_to_one_month_keep_every_bar(tmp_path):
+    context = mp.get_context('spawn')
+    workers = [context.Process(target=_write_bars, args=(str(tmp_path), 100 * k, 100)) for k in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert [worker.exitcode for worker in workers] == [0] * 4
+
+    stored = CandleStore(str(tmp_path)).read_records('BTC/USDT', '1h')
+    np.testing.assert_array_equal(stored['Timestamp'], _bars(0, 400)['Timestamp'])
+    np.testing.assert_array_equal(stored['Close'], np.arange(400))
+    assert not [name for name in os.listdir(tmp_path / 'BTC-USDT' / '1h') if name.endswith('.partial')]
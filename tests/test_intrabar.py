@@ -0,0 +1,46 @@
+# tests/test_intrabar.py
+import numpy as np
+import pytest
+
+from intrabar import IntrabarResolver
+from synthetic import random_walk
+
+PANDAS_FREQ = {'1h': 'h', '1w': 'W-MON', '1M': 'MS'}
+
+
+def brute_force_target_first(group, side: int, stop_loss: float, take_profit: float) -> bool:
+    """
+    Scan a bar's 1m candles in order; a candle touching both levels counts as the stop.
+    """
+    for _, candle in group.iterrows():
+        stop_hit = candle['Low'] <= stop_loss if side == 1 else candle['High'] >= stop_loss
+        target_hit = candle['High'] >= take_profit if side == 1 else candle['Low'] <= take_profit
+        if stop_hit or target_hit:
+            return bool(target_hit and not stop_hit)
+    return False
+
+
+@pytest.mark.parametrize('timeframe', sorted(PANDAS_FREQ))
+def test_target_first_matches_brute_force_scan(timeframe):
+    # Starts mid-month and spans February, so 30-day buckets would misplace candles.
+    lower = random_walk(120_000, seed=3, start='2023-01-15 07:13')
+    groups = [(start, group) for start, group in lower.resample(PANDAS_FREQ[timeframe], closed='left', label='left')
+              if len(group)]
+    if timeframe == '1h':
+        groups = groups[::25]
+    rng = np.random.default_rng(0)
+    sides = rng.choice([1, -1], len(groups))
+    low = np.array([group['Low'].min() for _, group in groups])
+    high = np.array([group['High'].max() for _, group in groups])
+    lower_level, upper_level = low + 0.3 * (high - low), low + 0.7 * (high - low)
+    stop_loss = np.where(sides == 1, lower_level, upper_level)
+    take_profit = np.where(sides == 1, upper_level, lower_level)
+    bar_starts = np.array([start.value // 10**6 for start, _ in groups], dtype=np.int64)
+
+    resolver = IntrabarResolver.from_frame(lower, timeframe)
+    result = resolver.target_first(bar_starts, sides, stop_loss, take_profit)
+
+    expected = [brute_force_target_first(group, side, sl, tp)
+                for (_, group), side, sl, tp in zip(groups, sides, stop_loss, take_profit)]
+    assert result.tolist() == expected
+    assert any(expected) and not all(expected)
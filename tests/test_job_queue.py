@@ -0,0 +1,55 @@
+# tests/test_job_queue.py
+import os
+import time
+
+from job_queue import CANCELLED, DONE, FAILED, JobQueue, report_progress
+
+
+def _pid() -> int:
+    return os.getpid()
+
+
+def _sleep(seconds: float) -> float:
+    report_progress(0.5, "sleeping")
+    time.sleep(seconds)
+    return seconds
+
+
+def _fail() -> None:
+    raise ValueError("boom")
+
+
+def test_workers_are_kept_between_jobs_and_replaced_on_cancel():
+    queue = JobQueue(max_workers=1)
+    try:
+        first = queue.submit(_pid)
+        assert queue.wait(first, timeout=60) == DONE
+        second = queue.submit(_pid)
+        assert queue.wait(second, timeout=60) == DONE
+        assert queue.result(first) == queue.result(second)
+
+        failed = queue.submit(_fail)
+        assert queue.wait(failed, timeout=60) == FAILED
+        assert 'ValueError: boom' in queue.status(failed)['error']
+
+        slow = queue.submit(_sleep, 60)
+        while queue.status(slow)['progress'] < 0.5:
+            time.sleep(0.05)
+        assert queue.cancel(slow)
+        assert queue.wait(slow, timeout=60) == CANCELLED
+        after = queue.submit(_pid)
+        assert queue.wait(after, timeout=60) == DONE
+        assert queue.result(after) != queue.result(first)
+    finally:
+        queue.shutdown()
+
+
+def test_duplicate_keys_share_a_job():
+    queue = JobQueue(max_workers=1)
+    try:
+        job_id = queue.submit(_sleep, 0.2, key='same')
+        assert queue.submit(_sleep, 0.2, key='same') == job_id
+        assert queue.wait(job_id, timeout=60) == DONE
+        assert queue.submit(_sleep, 0.0, key='same') != job_id
+    finally:
+        queue.shutdown()
@@ -0,0 +1,89 @@
+# tests/test_monitor.py
+import asyncio
+import logging
+
+import pandas as pd
+
+from data_fetcher import DataFetcher
+from monitor import LiveMonitor, SimulatedClock
+from strategies import WickFillStrategy
+from synthetic import FakeAsyncExchange, range_bound
+from trade_log import TradeLog
+
+SYMBOL = 'BTC/USDT'
+SETTINGS = {'range_factor': 3}
+WINDOW = 200
+
+
+def _ms(timestamp) -> int:
+    return int(pd.Timestamp(timestamp).value // 10 ** 6)
+
+
+def _monitor(data: pd.DataFrame, clock: SimulatedClock, exchange_clock=None, **kwargs) -> LiveMonitor:
+    fetcher = DataFetcher(async_exchange=FakeAsyncExchange({SYMBOL: data}, exchange_clock or clock))
+    return LiveMonitor(fetcher, [{'symbol': SYMBOL, 'timeframe': '1m', 'params': SETTINGS}], clock=clock,
+                       window=WINDOW, settle_ms=0, **kwargs)
+
+
+def test_warm_up_loads_the_last_closed_bars():
+    data = range_bound(1000, seed=7)
+    # Mid-way through bar 500: bars 300..499 have closed, bar 500 is still forming.
+    clock = SimulatedClock(_ms(data.index[500]) + 30_000)
+    monitor = _monitor(data, clock)
+    asyncio.run(monitor.warm_up())
+    pd.testing.assert_frame_equal(monitor.window_frame(SYMBOL, '1m'), data.iloc[300:500], check_freq=False,
+                                  check_index_type=False)
+    assert not monitor.events
+    [(_, _, _, strategy)] = monitor._strategies[(SYMBOL, '1m')]
+    assert strategy._bar_index == WINDOW - 1
+
+
+def test_late_bar_is_picked_up_next_tick(caplog):
+    data = range_bound(1000, seed=7)
+    clock = SimulatedClock(_ms(data.index[500]) + 30_000)
+    # The exchange publishes each bar one minute late.
+    exchange_clock = SimulatedClock(clock.time_ms())
+    monitor = _monitor(data, clock, exchange_clock)
+    exchange_clock.now_ms -= 60_000
+
+    async def ticks():
+        await monitor.warm_up()
+        exchange_clock.now_ms = _ms(data.index[500]) - 1
+        with caplog.at_level(logging.WARNING, logger='monitor'):
+            await monitor.tick(_ms(data.index[501]))
+        exchange_clock.now_ms = _ms(data.index[502])
+        await monitor.tick(_ms(data.index[502]))
+    asyncio.run(ticks())
+
+    assert "it will be picked up next tick" in caplog.text
+    assert [sample['new_bars'] for sample in monitor._latency[(SYMBOL, '1m')]] == [0, 2]
+    pd.testing.assert_frame_equal(monitor.window_frame(SYMBOL, '1m'), data.iloc[302:502], check_freq=False,
+                                  check_index_type=False)
+    [(_, _, _, strategy)] = monitor._strategies[(SYMBOL, '1m')]
+    assert strategy._bar_index == WINDOW + 1
+
+
+def test_events_match_batch_run():
+    data = range_bound(3000, seed=7)
+    start, ticks = 1000, 1500
+    clock = SimulatedClock(_ms(data.index[start]) + 30_000)
+    monitor = _monitor(data, clock, history=10 * ticks)
+    monitor.run(max_ticks=ticks)
+    assert monitor.ticks == ticks
+
+    # The live strategy saw bars start - WINDOW .. start + ticks - 1; run() over the same window.
+    window = data.iloc[start - WINDOW:start + ticks]
+    trades = TradeLog.from_records(WickFillStrategy(window, **SETTINGS).run()).to_frame()
+    live = trades[trades['entry_time'] >= data.index[start]]
+    entries = [event for event in monitor.events if event['event'] == 'entry']
+    # Exits of positions opened during warm-up have no entry event.
+    exits = [event for event in monitor.events
+             if event['event'] == 'exit' and event['entry_time'] >= data.index[start]]
+    assert len(entries) > 5
+    assert [(e['entry_time'], e['side'], e['entry_price']) for e in entries] == \
+        list(zip(live['entry_time'], live['side'], live['entry_price']))
+    # run() closes a position still open at the end of the data; the monitor keeps it open.
+    [(_, _, _, strategy)] = monitor._strategies[(SYMBOL, '1m')]
+    closed = live if strategy.position is None else live.iloc[:-1]
+    assert [(e['entry_time'], e['exit_time'], e['exit_price']) for e in exits] == \
+        list(zip(closed['entry_time'], closed['exit_time'], closed['exit_price']))
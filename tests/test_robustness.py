@@ -0,0 +1,57 @@
+# tests/test_robustness.py
+import numpy as np
+import pytest
+
+from backtester import compute_metrics, run_backtest
+from robustness import monte_carlo, path_metrics, simulate
+from strategies import WickFillStrategy
+from synthetic import range_bound
+
+
+@pytest.fixture(scope='module')
+def backtest():
+    strategy = WickFillStrategy(range_bound(5000, seed=7), range_factor=3)
+    strategy.run()
+    return run_backtest(strategy, initial_capital=1000.0)
+
+
+def test_unit_sizing_observed_row_matches_run_backtest(backtest):
+    performance, trade_df = backtest
+    observed = path_metrics(trade_df, initial_capital=1000.0, sizing='units')
+    assert observed['final_capital'] == performance['final_capital']
+    assert observed['max_drawdown'] == performance['max_drawdown']
+    assert observed['win_rate'] == performance['win_rate']
+    assert observed['sharpe_ratio'] == pytest.approx(performance['sharpe_ratio'], rel=1e-12)
+
+    summary, _, _ = monte_carlo(trade_df, n_simulations=100, initial_capital=1000.0, seed=0, sizing='units')
+    assert summary.loc['final_capital', 'observed'] == performance['final_capital']
+    assert summary.loc['max_drawdown', 'observed'] == performance['max_drawdown']
+
+
+def test_unit_sizing_bootstrap_matches_compute_metrics(backtest):
+    _, trade_df = backtest
+    n_simulations, seed = 50, 3
+    simulations = simulate(trade_df, n_simulations, initial_capital=1000.0, seed=seed, sizing='units')
+    # One batch: the same draws simulate() makes.
+    idx = np.random.default_rng(seed).integers(0, len(trade_df), size=(n_simulations, len(trade_df)),
+                                               dtype=np.uint32)
+    net_profit = trade_df['net_profit'].to_numpy()
+    return_pct = trade_df['return_pct'].to_numpy()
+    for row, draw in zip(simulations.itertuples(), idx):
+        capital = np.cumsum(np.concatenate([[1000.0], net_profit[draw]]))[1:]
+        expected = compute_metrics(net_profit[draw], return_pct[draw], capital, 1000.0)
+        assert row.final_capital == pytest.approx(expected['final_capital'], rel=1e-12)
+        assert row.max_drawdown == pytest.approx(expected['max_drawdown'], rel=1e-12, abs=1e-15)
+
+
+def test_unit_sizing_shuffle_keeps_final_capital(backtest):
+    performance, trade_df = backtest
+    simulations = simulate(trade_df, 20, method='shuffle', initial_capital=1000.0, seed=1, sizing='units')
+    np.testing.assert_allclose(simulations['final_capital'], performance['final_capital'], rtol=1e-12)
+    assert (simulations['max_drawdown'] <= 0).all()
+
+
+def test_unit_sizing_needs_net_profit(backtest):
+    _, trade_df = backtest
+    with pytest.raises(ValueError):
+        simulate(trade_df['return_pct'].to_numpy(), 10, sizing='units')
@@ -0,0 +1,109 @@
+# tests/test_strategies.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategies import WickFillStrategy, iter_candles
+from synthetic import GENERATORS
+from trade_log import TradeLog
+
+SETTINGS = [
+    {'range_factor': 3},
+    {'range_factor': 4, 'risk_reward_ratio': 1.0, 'stop_buffer': 0.0},
+    {'range_window': 10, 'range_factor': 2.5, 'wick_threshold': 0.3, 'max_holding_period': 5},
+]
+
+
+def reference_trades(data: pd.DataFrame, wick_threshold: float = 0.5, range_window: int = 20,
+                     range_factor: float = 1.5, risk_reward_ratio: float = 2.0, stop_buffer: float = 0.005,
+                     max_holding_period: int = 10) -> list:
+    """
+    The original bar-by-bar WickFillStrategy loop, with time exits past the
+    last candle clamped to it.
+    """
+    trades = []
+    n = len(data)
+    i = range_window
+    while i < n - 1:
+        candle = data.iloc[i]
+        body = abs(candle['Close'] - candle['Open'])
+        window = data.iloc[i - range_window:i]
+        range_bound = (window['High'].max() - window['Low'].min()
+                       < range_factor * (window['High'] - window['Low']).mean())
+        if body == 0 or not range_bound:
+            i += 1
+            continue
+        if (candle['High'] - max(candle['Open'], candle['Close'])) / body >= wick_threshold:
+            side = 1
+        elif (min(candle['Open'], candle['Close']) - candle['Low']) / body >= wick_threshold:
+            side = -1
+        else:
+            i += 1
+            continue
+        entry_price = data.iloc[i + 1]['Open']
+        if side == 1:
+            stop_loss = candle['Low'] * (1 - stop_buffer)
+            take_profit = entry_price + risk_reward_ratio * (entry_price - stop_loss)
+        else:
+            stop_loss = candle['High'] * (1 + stop_buffer)
+            take_profit = entry_price - risk_reward_ratio * (stop_loss - entry_price)
+        exit_at, exit_price = min(i + max_holding_period, n - 1), None
+        for j in range(i + 1, min(i + 1 + max_holding_period, n)):
+            bar = data.iloc[j]
+            stop_hit = bar['Low'] <= stop_loss if side == 1 else bar['High'] >= stop_loss
+            target_hit = bar['High'] >= take_profit if side == 1 else bar['Low'] <= take_profit
+            if stop_hit or target_hit:
+                exit_at, exit_price = j, stop_loss if stop_hit else take_profit
+                break
+        if exit_price is None:
+            exit_price = data.iloc[exit_at]['Close']
+        trades.append({'trade_type': 'long' if side == 1 else 'short', 'entry_time': data.index[i + 1],
+                       'entry_price': entry_price, 'exit_time': data.index[exit_at], 'exit_price': exit_price,
+                       'stop_loss': stop_loss, 'take_profit': take_profit})
+        i = exit_at + 1
+    return trades
+
+
+def assert_same_trades(actual, expected) -> None:
+    actual, expected = (TradeLog.from_records(log).to_frame().astype({'entry_time': 'datetime64[ns]',
+                                                                      'exit_time': 'datetime64[ns]'})
+                        for log in (actual, expected))
+    assert len(actual) > 0
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-12)
+
+
+@pytest.mark.parametrize('settings', SETTINGS)
+@pytest.mark.parametrize('generator', sorted(GENERATORS))
+def test_vectorized_run_matches_reference_loop(generator, settings):
+    data = GENERATORS[generator](3000, seed=7)
+    strategy = WickFillStrategy(data, **settings)
+    assert_same_trades(strategy.run(), reference_trades(data, **settings))
+
+
+def stream_trades(data: pd.DataFrame, **settings) -> TradeLog:
+    strategy = WickFillStrategy(data, **settings)
+    for candle in iter_candles(data):
+        strategy.on_bar(candle)
+    strategy.finish_stream()
+    return strategy.trades
+
+
+@pytest.mark.parametrize('generator', sorted(GENERATORS))
+def test_streaming_matches_run(generator):
+    data = GENERATORS[generator](3000, seed=11)
+    assert_same_trades(stream_trades(data, range_factor=3), WickFillStrategy(data, range_factor=3).run())
+
+
+def test_stream_range_bound_uses_exact_mean_on_ties():
+    # Window range 2 == range_factor * mean range exactly, so run() sees no
+    # range-bound bar; a running sum one ulp high must not flip the decision.
+    index = pd.date_range('2023-01-01', periods=4, freq='min', name='Timestamp')
+    low = np.array([100.0, 101.0, 100.0, 101.0])
+    data = pd.DataFrame({'Open': low + 0.5, 'High': low + 1.0, 'Low': low, 'Close': low + 0.5,
+                         'Volume': 1.0}, index=index)
+    strategy = WickFillStrategy(data, range_window=4, range_factor=2)
+    for candle in iter_candles(data):
+        strategy.on_bar(candle)
+    strategy._ranges._sum = np.nextafter(strategy._ranges._sum, np.inf)
+    assert strategy._ranges.mean() != strategy._ranges.exact_mean()
+    assert not strategy._stream_range_bound()
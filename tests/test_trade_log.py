@@ -0,0 +1,27 @@
+# tests/test_trade_log.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from trade_log import TradeLog
+
+
+def _log(n: int = 5) -> TradeLog:
+    times = pd.date_range('2023-01-01', periods=2 * n, freq='h').values
+    return TradeLog.from_arrays(side=np.where(np.arange(n) % 2, -1, 1), entry_time=times[0::2],
+                                exit_time=times[1::2], entry_price=100.0 + np.arange(n),
+                                exit_price=101.0 + np.arange(n), stop_loss=99.0 + np.arange(n),
+                                take_profit=102.0 + np.arange(n))
+
+
+@pytest.mark.parametrize('item', [slice(None, None, -1), slice(None, None, 2), slice(3, 0, -2),
+                                  slice(-2, None), slice(4, 1), slice(None, None, -3)])
+def test_slices_match_list_slicing(item):
+    log = _log()
+    view = log[item]
+    expected = log.to_records()[item]
+    assert len(view) == len(expected)
+    assert view.to_records() == expected
+    assert len(view.to_frame()) == len(expected)
+    np.testing.assert_array_equal(view.to_frame()['entry_price'].to_numpy(),
+                                  [trade['entry_price'] for trade in expected])
@@ -0,0 +1,209 @@
+# trade_log.py
+import logging
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SIDE_LONG = 1
+SIDE_SHORT = -1
+SIDE_NAMES = {SIDE_LONG: 'long', SIDE_SHORT: 'short'}
+SIDE_CODES = {name: code for code, name in SIDE_NAMES.items()}
+
+# Column name -> storage dtype. Times are int64 ticks of TradeLog.time_dtype.
+TRADE_FIELDS = {
+    'side': np.int8,
+    'entry_time': np.int64,
+    'exit_time': np.int64,
+    'entry_price': np.float64,
+    'exit_price': np.float64,
+    'stop_loss': np.float64,
+    'take_profit': np.float64,
+}
+
+
+def _to_ticks(values, time_dtype: np.dtype) -> np.ndarray:
+    """
+    Convert timestamps (datetime64 array, DatetimeIndex, Timestamps or ints) to int64 ticks.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        return values.astype(time_dtype).view(np.int64)
+    if values.dtype.kind in 'iu':
+        return values.astype(np.int64)
+    return pd.to_datetime(values).values.astype(time_dtype).view(np.int64)
+
+
+class TradeLog:
+    """
+    Columnar trade log backed by typed NumPy arrays.
+
+    Holds int8 sides (1 long, -1 short), int64 entry/exit times and float64
+    prices, stop-loss and take-profit levels. Iterating yields legacy trade
+    dicts, so code written against the old list-of-dicts keeps working.
+    """
+    def __init__(self, capacity: int = 0, time_dtype: str = 'datetime64[ns]') -> None:
+        self.time_dtype = np.dtype(time_dtype)
+        self._size = 0
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in TRADE_FIELDS.items()}
+
+    @classmethod
+    def from_arrays(cls, side, entry_time, exit_time, entry_price, exit_price, stop_loss=None,
+                    take_profit=None, time_dtype: Optional[str] = None) -> "TradeLog":
+        """
+        Build a log from column arrays; arrays already of the storage dtype are not copied.
+        Times may be datetime64 arrays/indexes or int64 ticks of time_dtype.
+        """
+        if time_dtype is None:
+            time_dtype = np.asarray(entry_time).dtype if np.asarray(entry_time).dtype.kind == 'M' else 'datetime64[ns]'
+        log = cls(time_dtype=time_dtype)
+        n = len(side)
+        nan = np.full(n, np.nan)
+        log._columns = {
+            'side': np.asarray(side, dtype=np.int8),
+            'entry_time': _to_ticks(entry_time, log.time_dtype),
+            'exit_time': _to_ticks(exit_time, log.time_dtype),
+            'entry_price': np.asarray(entry_price, dtype=np.float64),
+            'exit_price': np.asarray(exit_price, dtype=np.float64),
+            'stop_loss': nan if stop_loss is None else np.asarray(stop_loss, dtype=np.float64),
+            'take_profit': nan if take_profit is None else np.asarray(take_profit, dtype=np.float64),
+        }
+        log._size = n
+        return log
+
+    @classmethod
+    def from_records(cls, trades) -> "TradeLog":
+        """
+        Build a log from legacy trade dicts (or a trade-results DataFrame);
+        trades with an unknown trade_type are dropped.
+        """
+        if isinstance(trades, TradeLog):
+            return trades
+        if isinstance(trades, pd.DataFrame):
+            if trades.empty:
+                return cls()
+            trades = trades[trades['trade_type'].isin(list(SIDE_CODES))]
+            return cls.from_arrays(
+                side=trades['trade_type'].map(SIDE_CODES).to_numpy(dtype=np.int8),
+                entry_time=trades['entry_time'].to_numpy(),
+                exit_time=trades['exit_time'].to_numpy(),
+                entry_price=trades['entry_price'],
+                exit_price=trades['exit_price'],
+                stop_loss=trades['stop_loss'] if 'stop_loss' in trades else None,
+                take_profit=trades['take_profit'] if 'take_profit' in trades else None,
+            )
+        trades = [trade for trade in trades if trade.get('trade_type') in SIDE_CODES]
+        entry_times = pd.to_datetime([trade.get('entry_time') for trade in trades])
+        return cls.from_arrays(
+            side=[SIDE_CODES[trade['trade_type']] for trade in trades],
+            entry_time=entry_times,
+            exit_time=pd.to_datetime([trade.get('exit_time') for trade in trades]),
+            entry_price=[trade.get('entry_price') for trade in trades],
+            exit_price=[trade.get('exit_price') for trade in trades],
+            stop_loss=[np.nan if trade.get('stop_loss') is None else trade['stop_loss'] for trade in trades],
+            take_profit=[np.nan if trade.get('take_profit') is None else trade['take_profit'] for trade in trades],
+            time_dtype=entry_times.values.dtype if len(trades) else None,
+        )
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        # Column access: log.side, log.entry_price, ... (views, no copy).
+        columns = self.__dict__.get('_columns')
+        if columns is not None and name in columns:
+            return columns[name][:self._size]
+        raise AttributeError(name)
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        capacity = len(self._columns['side'])
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, 2 * capacity, 64)
+        for name, values in self._columns.items():
+            grown = np.empty(new_capacity, dtype=values.dtype)
+            grown[:self._size] = values[:self._size]
+            self._columns[name] = grown
+
+    def append(self, trade: Optional[dict] = None, **fields) -> None:
+        """
+        Append one trade, given as a legacy trade dict or as keyword fields
+        (trade_type or side, entry_time, entry_price, exit_time, exit_price, ...).
+        """
+        if trade is not None:
+            fields = {**trade, **fields}
+        side = fields.get('side', SIDE_CODES.get(fields.get('trade_type')))
+        if side not in SIDE_NAMES:
+            logger.warning("Ignoring trade with unknown side: %s", fields)
+            return
+        self._reserve(1)
+        k = self._size
+        columns = self._columns
+        columns['side'][k] = side
+        columns['entry_time'][k] = _to_ticks([fields.get('entry_time')], self.time_dtype)[0]
+        columns['exit_time'][k] = _to_ticks([fields.get('exit_time')], self.time_dtype)[0]
+        for name in ('entry_price', 'exit_price', 'stop_loss', 'take_profit'):
+            value = fields.get(name)
+            columns[name][k] = np.nan if value is None else value
+        self._size += 1
+
+    def _record(self, k: int) -> dict:
+        side = int(self._columns['side'][k])
+        return {
+            'trade_type': SIDE_NAMES[side],
+            'entry_time': pd.Timestamp(self._columns['entry_time'][k:k + 1].view(self.time_dtype)[0]),
+            'entry_price': self._columns['entry_price'][k],
+            'exit_time': pd.Timestamp(self._columns['exit_time'][k:k + 1].view(self.time_dtype)[0]),
+            'exit_price': self._columns['exit_price'][k],
+            'stop_loss': self._columns['stop_loss'][k],
+            'take_profit': self._columns['take_profit'][k],
+        }
+
+    def __getitem__(self, item):
+        """
+        log[k] returns a legacy trade dict; log[a:b] returns a TradeLog sharing memory.
+        """
+        if isinstance(item, slice):
+            view = TradeLog(time_dtype=self.time_dtype)
+            view._columns = {name: values[:self._size][item] for name, values in self._columns.items()}
+            view._size = len(view._columns['side'])
+            return view
+        if item < 0:
+            item += self._size
+        if not 0 <= item < self._size:
+            raise IndexError("TradeLog index out of range")
+        return self._record(item)
+
+    def __iter__(self) -> Iterator[dict]:
+        return (self._record(k) for k in range(self._size))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, TradeLog):
+            other = other.to_records()
+        return self.to_records() == other
+
+    def to_records(self) -> list:
+        """
+        Legacy list-of-dicts view of the log.
+        """
+        return list(self)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        DataFrame over the log's arrays; numeric and time columns are not copied.
+        """
+        columns = {name: values[:self._size] for name, values in self._columns.items()}
+        return pd.DataFrame({
+            'trade_type': pd.Categorical.from_codes((columns['side'] == SIDE_LONG).view(np.int8),
+                                                    categories=['short', 'long']),
+            'side': columns['side'],
+            'entry_time': columns['entry_time'].view(self.time_dtype),
+            'entry_price': columns['entry_price'],
+            'exit_time': columns['exit_time'].view(self.time_dtype),
+            'exit_price': columns['exit_price'],
+            'stop_loss': columns['stop_loss'],
+            'take_profit': columns['take_profit'],
+        }, copy=False)
@@ -0,0 +1,207 @@
+# walk_forward.py
+import logging
+import multiprocessing as mp
+import os
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtester import evaluate_strategy
+from feature_cache import default_cache, get_feature
+from optimizer import SharedOHLCV, grid_space, params_key, random_space
+
+logger = logging.getLogger(__name__)
+
+# Per-worker state set up by _init_worker().
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+def walk_forward_folds(n_bars: int, in_sample: int, out_of_sample: int, step: Optional[int] = None,
+                       anchored: bool = False) -> List[Tuple[slice, slice]]:
+    """
+    Split n_bars into (in-sample, out-of-sample) positional slices.
+
+    Each fold's out-of-sample window directly follows its in-sample window;
+    folds advance by `step` bars (out_of_sample by default). With anchored=True
+    every in-sample window starts at bar 0.
+    """
+    step = step or out_of_sample
+    folds = []
+    start = 0
+    while start + in_sample + out_of_sample <= n_bars:
+        is_start = 0 if anchored else start
+        is_end = start + in_sample
+        folds.append((slice(is_start, is_end), slice(is_end, is_end + out_of_sample)))
+        start += step
+    return folds
+
+
+def full_series_features(strategy_class, data: pd.DataFrame, base_params: dict,
+                         combos: List[dict]) -> Dict[tuple, np.ndarray]:
+    """
+    Every feature the parameter combinations need, computed once on the full
+    series: {(name, sorted params): array}.
+    """
+    features = {}
+    for params in combos:
+        strategy = strategy_class(data, **{**base_params, **params})
+        for name, feature_params in strategy.required_features():
+            key = (name, tuple(sorted(feature_params.items())))
+            if key not in features:
+                features[key] = get_feature(data, name, **feature_params)
+    return features
+
+
+class SharedFeatures:
+    """
+    Full-series feature arrays in one shared-memory block (one row per
+    feature), set up next to SharedOHLCV so workers can slice them per fold.
+    """
+    def __init__(self, features: Dict[tuple, np.ndarray], n_bars: int) -> None:
+        keys = list(features)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(len(keys) * n_bars * 8, 1))
+        block = np.ndarray((len(keys), n_bars), dtype=np.float64, buffer=self._shm.buf)
+        for row, key in enumerate(keys):
+            block[row] = features[key]
+        self.spec = {'name': self._shm.name, 'shape': block.shape, 'keys': keys}
+
+    @staticmethod
+    def attach(spec: dict):
+        """
+        Returns ({key: read-only row}, handle); the handle must stay referenced
+        while the arrays are in use.
+        """
+        shm = shared_memory.SharedMemory(name=spec['name'])
+        block = np.ndarray(spec['shape'], dtype=np.float64, buffer=shm.buf)
+        block.setflags(write=False)
+        return dict(zip(spec['keys'], block)), shm
+
+    def close(self) -> None:
+        self._shm.close()
+        self._shm.unlink()
+
+
+def _fold_data(state: dict, bounds: Tuple[int, int]) -> pd.DataFrame:
+    # One frame object per window, so its fingerprint and cached features are
+    # reused by every parameter combination evaluated on it. Its features are
+    # slices of the full-series arrays: trailing windows at the fold start
+    # see the bars before the fold, as they would in a full-series run.
+    frames = state.setdefault('frames', {})
+    if bounds not in frames:
+        start, stop = bounds
+        frame = state['data'].iloc[start:stop]
+        for (name, params), values in state['features'].items():
+            default_cache.put(frame, name, values[start:stop], **dict(params))
+        frames[bounds] = frame
+    return frames[bounds]
+
+
+def _evaluate_task(state: dict, task: tuple) -> tuple:
+    fold, bounds, params = task
+    performance = evaluate_strategy(state['strategy_class'], _fold_data(state, bounds),
+                                    {**state['base_params'], **params}, **state['backtest_kwargs'])
+    return fold, params, performance
+
+
+def _init_worker(spec: dict, features_spec: dict, strategy_class, base_params: dict,
+                 backtest_kwargs: dict) -> None:
+    data, handles = SharedOHLCV.attach(spec)
+    features, features_handle = SharedFeatures.attach(features_spec)
+    _WORKER_STATE.update(data=data, handles=(*handles, features_handle), features=features,
+                         strategy_class=strategy_class, base_params=base_params,
+                         backtest_kwargs=backtest_kwargs, frames={})
+
+
+def _worker_evaluate(task: tuple) -> tuple:
+    return _evaluate_task(_WORKER_STATE, task)
+
+
+def _score(performance: dict, metric: str) -> float:
+    value = performance.get(metric)
+    return -np.inf if value is None or np.isnan(value) else value
+
+
+def walk_forward(strategy_class, data: pd.DataFrame, param_ranges: Dict[str, Any], in_sample: int,
+                 out_of_sample: int, step: Optional[int] = None, anchored: bool = False, method: str = 'grid',
+                 n_samples: int = 100, base_params: Optional[dict] = None, metric: str = 'sharpe_ratio',
+                 n_workers: Optional[int] = None, seed: Optional[int] = None, initial_capital: float = 10000.0,
+                 fee_rate: float = 0.001, slippage_rate: float = 0.001) -> pd.DataFrame:
+    """
+    Walk-forward optimization of strategy_class over data.
+
+    For every fold the parameter space is searched on the in-sample window,
+    the best combination by `metric` is kept, and it is scored on the
+    following out-of-sample window. All (fold, combination) evaluations run on
+    one process pool over a shared-memory copy of the data. The features the
+    combinations read (Strategy.required_features) are computed once on the
+    full series, shared next to the data, and sliced per window. Returns one row per fold with its windows,
+    chosen parameters, in-sample score and out-of-sample metrics (oos_*).
+    """
+    folds = walk_forward_folds(len(data), in_sample, out_of_sample, step, anchored)
+    if not folds:
+        logger.warning("Not enough data for a single walk-forward fold.")
+        return pd.DataFrame()
+    if method == 'grid':
+        combos = grid_space(param_ranges)
+    elif method == 'random':
+        combos = random_space(param_ranges, n_samples, seed)
+    else:
+        raise ValueError(f"Unknown search method: {method}")
+    base_params = dict(base_params or {})
+    backtest_kwargs = {'initial_capital': initial_capital, 'fee_rate': fee_rate, 'slippage_rate': slippage_rate}
+
+    in_sample_tasks = [(k, (is_slice.start, is_slice.stop), params)
+                       for k, (is_slice, _) in enumerate(folds) for params in combos]
+    n_workers = n_workers or os.cpu_count() or 1
+    logger.info("Walk-forward: %d folds x %d combinations on %d workers.", len(folds), len(combos), n_workers)
+
+    best = {}
+
+    def run_tasks(tasks, run):
+        for fold, params, performance in run(tasks):
+            # Highest score wins; ties go to the smallest params_key so the
+            # result does not depend on completion order.
+            rank = (-_score(performance, metric), params_key(params))
+            if fold not in best or rank < best[fold][2]:
+                best[fold] = (params, performance, rank)
+
+    features = full_series_features(strategy_class, data, base_params, combos)
+    if n_workers == 1:
+        state = {'data': data, 'features': features, 'strategy_class': strategy_class,
+                 'base_params': base_params, 'backtest_kwargs': backtest_kwargs, 'frames': {}}
+        run_tasks(in_sample_tasks, lambda tasks: (_evaluate_task(state, task) for task in tasks))
+        oos_results = [_evaluate_task(state, (k, (oos.start, oos.stop), best[k][0]))
+                       for k, (_, oos) in enumerate(folds)]
+    else:
+        shared = SharedOHLCV(data)
+        shared_features = SharedFeatures(features, len(data))
+        try:
+            with mp.Pool(n_workers, initializer=_init_worker,
+                         initargs=(shared.spec, shared_features.spec, strategy_class, base_params,
+                                   backtest_kwargs)) as pool:
+                chunksize = max(1, len(in_sample_tasks) // (n_workers * 16))
+                run_tasks(in_sample_tasks,
+                          lambda tasks: pool.imap_unordered(_worker_evaluate, tasks, chunksize=chunksize))
+                oos_tasks = [(k, (oos.start, oos.stop), best[k][0]) for k, (_, oos) in enumerate(folds)]
+                oos_results = pool.map(_worker_evaluate, oos_tasks)
+        finally:
+            shared.close()
+            shared_features.close()
+
+    index = data.index
+    rows = []
+    for fold, params, oos_performance in sorted(oos_results, key=lambda result: result[0]):
+        is_slice, oos_slice = folds[fold]
+        rows.append({
+            'fold': fold,
+            'in_sample_start': index[is_slice.start],
+            'in_sample_end': index[is_slice.stop - 1],
+            'out_of_sample_start': index[oos_slice.start],
+            'out_of_sample_end': index[oos_slice.stop - 1],
+            **params,
+            f'in_sample_{metric}': best[fold][1].get(metric, np.nan),
+            **{f'oos_{name}': value for name, value in oos_performance.items()},
+        })
+    return pd.DataFrame(rows)